@@ -1,13 +1,94 @@
+import time
+_MODULE_START = time.perf_counter()
+_MODULE_START_WALL = time.time()
+
+import argparse
+import logging
+import queue
+import threading
 import tkinter as tk
+from contextlib import contextmanager
 from tkinter import filedialog, messagebox
-from PIL import Image, ImageTk
-import tensorflow as tf
-import numpy as np
+from PIL import ImageTk
 import os
+# TensorFlow is imported lazily by the inference backends, on the loader thread
+import metrics
+from corrections import DEFAULT_CORRECTIONS_DIR, CorrectionStore, start_refit
+from gallery import DEFAULT_THUMBNAIL_DIR, GalleryWindow
+from inference import BACKENDS, top_predictions
+from inference_worker import InferenceWorker
+from model_registry import MODELS_DIR, ModelHandle, ModelWatcher, load_version
+from prediction_cache import PredictionCache
+from preprocessing import MODEL_INPUT_SIZE, decode_image
+
+_IMPORTS_DONE = time.perf_counter()
+
+logger = logging.getLogger('waste_classifier')
+
+
+class StartupProfiler:
+    """Collects the startup timing breakdown printed by --profile-startup"""
+    
+    def __init__(self, enabled=False):
+        self.enabled = enabled
+        self.stages = [('imports', _IMPORTS_DONE - _MODULE_START)]
+        self.milestones = []
+        self._lock = threading.Lock()
+    
+    @contextmanager
+    def stage(self, name):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            with self._lock:
+                self.stages.append((name, time.perf_counter() - start))
+    
+    def milestone(self, name):
+        """Record the time elapsed since the app module started importing"""
+        with self._lock:
+            self.milestones.append((name, time.perf_counter() - _MODULE_START))
+    
+    def report(self):
+        if not self.enabled:
+            return
+        print("\nStartup profile:")
+        interpreter = self._interpreter_start()
+        if interpreter is None:
+            print(f"  {'interpreter start':<24}unavailable (pip install psutil)")
+        else:
+            print(f"  {'interpreter start':<24}{interpreter * 1000:>9.1f} ms")
+        for name, seconds in self.stages:
+            print(f"  {name:<24}{seconds * 1000:>9.1f} ms")
+        for name, seconds in self.milestones:
+            print(f"  {name + ' after':<24}{seconds * 1000:>9.1f} ms")
+    
+    @staticmethod
+    def _interpreter_start():
+        """Seconds from process creation to the first line of this module"""
+        try:
+            import psutil
+        except ImportError:
+            return None
+        return _MODULE_START_WALL - psutil.Process().create_time()
+
 
 class WasteClassifierApp:
-    def __init__(self, root):
+    def __init__(self, root, backend='keras', model_path=None, profiler=None,
+                 cache_size=1024, cache_db=None, cascade=False, thumbnail_dir=DEFAULT_THUMBNAIL_DIR,
+                 corrections_dir=DEFAULT_CORRECTIONS_DIR, refit_after=10):
         self.root = root
+        self.backend_name = backend
+        self.model_path = model_path
+        self.cascade = cascade
+        self.cache_size = cache_size
+        self.cache_db = cache_db
+        self.thumbnail_dir = thumbnail_dir
+        self.corrections = CorrectionStore(corrections_dir)
+        self.refit_after = refit_after
+        self.refit_process = None
+        self.refit_lock = threading.Lock()
+        self.profiler = profiler or StartupProfiler()
         self.root.title("AI Waste Classifier")
         
         # Get screen dimensions and set window to 90% of screen size
@@ -24,12 +105,19 @@ class WasteClassifierApp:
         self.root.configure(bg='#1a1a2e')
         self.root.state('zoomed')  # Maximize window on Windows
         
-        self.model = None
-        self.class_names = []
+        self.handle = None
+        self.watcher = None
+        self.worker = None
+        self.gallery = None
+        self.pending_request = None
         self.current_image = None
         self.current_image_path = None
+        self.last_prediction = None
+        self.model_queue = queue.Queue()
         
-        self.setup_ui()
+        with self.profiler.stage('ui build'):
+            self.setup_ui()
+        self.root.after(0, self.profiler.milestone, 'window shown')
         self.load_model()
     
     def setup_ui(self):
@@ -193,7 +281,7 @@ class WasteClassifierApp:
         
         self.classify_btn = tk.Button(
             button_frame,
-            text="🔍  Classify Waste",
+            text="⏳  Loading Model...",
             command=self.classify_image,
             font=('Segoe UI', 13, 'bold'),
             bg='#555555',
@@ -226,6 +314,42 @@ class WasteClassifierApp:
         )
         self.clear_btn.pack(side=tk.LEFT, padx=10)
         
+        self.gallery_btn = tk.Button(
+            button_frame,
+            text="🖼️  Gallery",
+            command=self.open_gallery,
+            font=('Segoe UI', 13, 'bold'),
+            bg='#555555',
+            fg='#999999',
+            activebackground='#5a189a',
+            activeforeground='white',
+            padx=30,
+            pady=15,
+            cursor='hand2',
+            state=tk.DISABLED,
+            relief=tk.FLAT,
+            borderwidth=0
+        )
+        self.gallery_btn.pack(side=tk.LEFT, padx=10)
+        
+        self.correct_btn = tk.Button(
+            button_frame,
+            text="✏️  Correct Label",
+            command=self.show_correction_menu,
+            font=('Segoe UI', 13, 'bold'),
+            bg='#555555',
+            fg='#999999',
+            activebackground='#d48a00',
+            activeforeground='white',
+            padx=30,
+            pady=15,
+            cursor='hand2',
+            state=tk.DISABLED,
+            relief=tk.FLAT,
+            borderwidth=0
+        )
+        self.correct_btn.pack(side=tk.LEFT, padx=10)
+        
         # Footer
         footer_frame = tk.Frame(content_frame, bg='#1a1a2e')
         footer_frame.pack(pady=15)
@@ -240,32 +364,85 @@ class WasteClassifierApp:
         footer_label.pack()
     
     def load_model(self):
-        """Load the trained model and class names"""
-        model_path = 'waste_classifier_model.h5'
-        class_names_path = 'class_names.txt'
+        """Load the trained model and class names on a background thread"""
+        threading.Thread(target=self._load_model_in_background, name='model-loader', daemon=True).start()
+        self.root.after(50, self.check_model_loaded)
+    
+    def _load_model_in_background(self):
+        """Runs on the loader thread, so it must not touch any Tk widgets"""
+        try:
+            if not self.backend_name.startswith('tflite'):
+                with self.profiler.stage('tensorflow import'):
+                    import tensorflow  # noqa: F401
+            
+            with self.profiler.stage('model deserialization'):
+                loaded = load_version(self.backend_name, model_path=self.model_path, cascade=self.cascade)
+            handle = ModelHandle(loaded)
+            
+            # Re-classifying the same image is served from the cache
+            cache = None
+            if self.cache_size > 0:
+                cache = PredictionCache(loaded.fingerprint, self.cache_size, self.cache_db)
+                handle.add_listener(lambda new, old: cache.reset(new.fingerprint))
+            
+            # Run inference off the Tk thread and trace the graph up front
+            with self.profiler.stage('first inference'):
+                worker = InferenceWorker(handle, cache)
+                worker.warm_up()
+                worker.warmed_up.wait()
+            if worker.warm_up_error is not None:
+                worker.stop()
+                raise worker.warm_up_error
+            
+            self.model_queue.put((handle, worker, None))
+        except Exception as e:
+            self.model_queue.put((None, None, e))
+    
+    def check_model_loaded(self):
+        """Poll the loader thread and enable classification once it's done"""
+        try:
+            handle, worker, error = self.model_queue.get_nowait()
+        except queue.Empty:
+            self.root.after(50, self.check_model_loaded)
+            return
         
-        if not os.path.exists(model_path):
+        if isinstance(error, FileNotFoundError):
             messagebox.showerror(
                 "Model Not Found",
-                f"Model file '{model_path}' not found!\n\n"
+                f"{error}\n\n"
                 "Please train the model first using:\n"
                 "python model/train_simple.py"
             )
             self.root.destroy()
             return
-        
-        try:
-            self.model = tf.keras.models.load_model(model_path)
-            
-            if os.path.exists(class_names_path):
-                with open(class_names_path, 'r') as f:
-                    self.class_names = [line.strip() for line in f.readlines()]
-            else:
-                self.class_names = ['biodegradable', 'non_biodegradable']
-            
-        except Exception as e:
-            messagebox.showerror("Error", f"Failed to load model:\n{str(e)}")
+        if error is not None:
+            messagebox.showerror("Error", f"Failed to load model:\n{str(error)}")
             self.root.destroy()
+            return
+        
+        self.handle = handle
+        self.worker = worker
+        # Newly published versions are swapped in without restarting the app,
+        # including the first one published while running the legacy model
+        if self.model_path is None:
+            self.watcher = ModelWatcher(handle, self.backend_name, cascade=self.cascade)
+        else:
+            logger.info("Using --model %s: versions published to %s are not hot-swapped in",
+                        self.model_path, MODELS_DIR)
+        self.classify_btn.config(text="🔍  Classify Waste")
+        self.gallery_btn.config(state=tk.NORMAL, bg='#7b2cbf', fg='white')
+        self.update_classify_button()
+        self.root.after(50, self.poll_results)
+        
+        self.profiler.milestone('model ready')
+        self.profiler.report()
+    
+    def update_classify_button(self):
+        """Classify is only available with both an image and a ready model"""
+        if self.current_image is not None and self.worker is not None:
+            self.classify_btn.config(state=tk.NORMAL, bg='#00ff88', fg='#1a1a2e')
+        else:
+            self.classify_btn.config(state=tk.DISABLED, bg='#555555', fg='#999999')
     
     def select_image(self):
         """Open file dialog to select an image"""
@@ -278,46 +455,48 @@ class WasteClassifierApp:
         )
         
         if file_path:
-            try:
-                # Load and display image
-                image = Image.open(file_path)
-                self.current_image = image
-                self.current_image_path = file_path
-                
-                # Resize for display - much larger size
-                display_image = image.copy()
-                # Calculate size to fit nicely (max 700x500)
-                max_width = 700
-                max_height = 500
-                
-                # Get original dimensions
-                orig_width, orig_height = display_image.size
-                
-                # Calculate scaling to fit within max dimensions while maintaining aspect ratio
-                scale = min(max_width / orig_width, max_height / orig_height)
-                new_width = int(orig_width * scale)
-                new_height = int(orig_height * scale)
-                
-                display_image = display_image.resize((new_width, new_height), Image.Resampling.LANCZOS)
-                photo = ImageTk.PhotoImage(display_image)
-                
-                # Remove width/height constraints when showing image
-                self.image_label.configure(image=photo, text="", width=0, height=0)
-                self.image_label.image = photo
-                
-                # Show file path
-                filename = os.path.basename(file_path)
-                self.path_label.config(text=f"📄 {filename}")
-                
-                # Enable classify button with proper colors
-                self.classify_btn.config(state=tk.NORMAL, bg='#00ff88', fg='#1a1a2e')
-                
-                # Reset results
-                self.result_label.config(text="Awaiting Classification...", fg='#ffffff')
-                self.confidence_label.config(text="Confidence: -")
-                
-            except Exception as e:
-                messagebox.showerror("Error", f"Failed to load image:\n{str(e)}")
+            self.open_image(file_path)
+    
+    def open_image(self, file_path):
+        """Show an image file in the main view, ready to classify"""
+        try:
+            # Decode once at reduced resolution: display thumbnail + model input
+            model_size = self.handle.current.backend.input_size if self.handle else MODEL_INPUT_SIZE
+            decoded = decode_image(file_path, model_size=model_size)
+            # A result for the previous image is no longer wanted
+            self.cancel_pending()
+            self.current_image = decoded.model_array
+            self.current_image_path = file_path
+            self.set_last_prediction(None)
+            
+            photo = ImageTk.PhotoImage(decoded.display)
+            
+            # Remove width/height constraints when showing image
+            self.image_label.configure(image=photo, text="", width=0, height=0)
+            self.image_label.image = photo
+            
+            # Show file path
+            filename = os.path.basename(file_path)
+            self.path_label.config(text=f"📄 {filename}")
+            
+            # Enable classify button with proper colors once the model is ready
+            self.update_classify_button()
+            
+            # Reset results
+            self.result_label.config(text="Awaiting Classification...", fg='#ffffff')
+            self.confidence_label.config(text="Confidence: -")
+            
+        except Exception as e:
+            messagebox.showerror("Error", f"Failed to load image:\n{str(e)}")
+    
+    def open_gallery(self):
+        """Open the multi-image gallery, or bring it to the front"""
+        if self.worker is None:
+            return
+        if self.gallery is None:
+            self.gallery = GalleryWindow(self, self.thumbnail_dir)
+        else:
+            self.gallery.window.lift()
     
     def classify_image(self):
         """Classify the selected image"""
@@ -325,66 +504,78 @@ class WasteClassifierApp:
             messagebox.showwarning("No Image", "Please select an image first!")
             return
         
-        if self.model is None:
+        if self.worker is None:
             messagebox.showwarning("No Model", "Model not loaded!")
             return
         
-        try:
-            # Show processing status
-            self.result_label.config(text="🔄 Processing...", fg='#00ff88')
-            self.root.update()
-            
-            # Preprocess image
-            img = self.current_image.resize((224, 224))
-            img_array = np.array(img)
-            
-            # Handle grayscale images
-            if len(img_array.shape) == 2:
-                img_array = np.stack([img_array] * 3, axis=-1)
-            elif img_array.shape[2] == 4:
-                img_array = img_array[:, :, :3]
-            
-            img_array = np.expand_dims(img_array, axis=0)
-            
-            # Predict
-            predictions = self.model.predict(img_array, verbose=0)
-            predicted_class = np.argmax(predictions[0])
-            confidence = predictions[0][predicted_class] * 100
-            
-            # Debug: Print predictions
-            print(f"Predictions: {predictions[0]}")
-            print(f"Predicted class index: {predicted_class}")
-            print(f"Class name: {self.class_names[predicted_class]}")
-            print(f"Confidence: {confidence:.2f}%")
-            
-            # Display results
-            class_name = self.class_names[predicted_class].replace('_', ' ').upper()
-            
-            # Color code and emoji based on classification
-            is_biodegradable = 'biodegradable' in self.class_names[predicted_class].lower() and 'non' not in self.class_names[predicted_class].lower()
-            
-            if is_biodegradable:
-                color = '#00ff88'  # Green
-                emoji = '🌱'
-                description = "Can decompose naturally"
+        # Submitting replaces any request still in flight
+        self.pending_request = self.worker.submit(self.current_image, self.current_image_path)
+        self.set_last_prediction(None)
+        self.result_label.config(text="🔄 Processing...", fg='#00ff88')
+        self.confidence_label.config(text="Confidence: -")
+    
+    def poll_results(self):
+        """Pick up finished predictions from the worker thread"""
+        result = self.worker.poll()
+        if result is not None and result[0] == self.pending_request:
+            self.pending_request = None
+            _, prediction, error = result
+            if error is not None:
+                self.result_label.config(text="Awaiting Classification...", fg='#ffffff')
+                messagebox.showerror("Error", f"Classification failed:\n{str(error)}")
             else:
-                color = '#ff6b6b'  # Red
-                emoji = '♻️'
-                description = "Cannot decompose naturally • Requires proper disposal"
-            
-            self.result_label.config(
-                text=f"{emoji}  {class_name}",
-                fg=color
-            )
-            self.confidence_label.config(
-                text=f"Confidence: {confidence:.1f}% • {description}"
-            )
-            
-        except Exception as e:
-            messagebox.showerror("Error", f"Classification failed:\n{str(e)}")
+                self.show_prediction(prediction)
+        self.root.after(50, self.poll_results)
+    
+    def cancel_pending(self):
+        """Drop the in-flight classification, if any"""
+        if self.worker is not None and self.pending_request is not None:
+            self.worker.cancel()
+        self.pending_request = None
+    
+    def show_prediction(self, prediction):
+        """Display the result of a finished classification"""
+        label, confidence = top_predictions(prediction.probabilities, prediction.class_names)[0]
+        confidence *= 100
+        
+        # Lazy %-formatting: nothing is rendered unless DEBUG is enabled
+        logger.debug("Model version: %s", prediction.version)
+        logger.debug("Predictions: %s", prediction.probabilities[0])
+        logger.debug("Class name: %s, confidence: %.2f%%", label, confidence)
+        if self.worker.cache is not None and logger.isEnabledFor(logging.DEBUG):
+            logger.debug("Prediction cache: %s", self.worker.cache.stats())
+        if self.cascade and logger.isEnabledFor(logging.DEBUG):
+            logger.debug("Cascade: %s", self.handle.current.backend.stats())
+        
+        self.set_last_prediction((label, prediction.version))
+        
+        # Display results
+        class_name = label.replace('_', ' ').upper()
+        
+        # Color code and emoji based on classification
+        is_biodegradable = 'biodegradable' in label.lower() and 'non' not in label.lower()
+        
+        if is_biodegradable:
+            color = '#00ff88'  # Green
+            emoji = '🌱'
+            description = "Can decompose naturally"
+        else:
+            color = '#ff6b6b'  # Red
+            emoji = '♻️'
+            description = "Cannot decompose naturally • Requires proper disposal"
+        
+        self.result_label.config(
+            text=f"{emoji}  {class_name}",
+            fg=color
+        )
+        self.confidence_label.config(
+            text=f"Confidence: {confidence:.1f}% • {description}"
+                 + (f" • model {prediction.version}" if prediction.version else "")
+        )
     
     def clear_image(self):
         """Clear the current image and results"""
+        self.cancel_pending()
         self.current_image = None
         self.current_image_path = None
         # Restore width/height for empty state
@@ -397,12 +588,99 @@ class WasteClassifierApp:
         self.path_label.config(text="")
         self.result_label.config(text="Awaiting Classification...", fg='#ffffff')
         self.confidence_label.config(text="Confidence: -")
-        self.classify_btn.config(state=tk.DISABLED, bg='#555555')
+        self.set_last_prediction(None)
+        self.update_classify_button()
+    
+    def set_last_prediction(self, prediction):
+        """Remember (label, version) of the shown result; corrections need one"""
+        self.last_prediction = prediction
+        if prediction is not None:
+            self.correct_btn.config(state=tk.NORMAL, bg='#f4a261', fg='#1a1a2e')
+        else:
+            self.correct_btn.config(state=tk.DISABLED, bg='#555555', fg='#999999')
+    
+    def show_correction_menu(self):
+        """Pop up the model's classes under the button"""
+        if self.last_prediction is None or self.current_image_path is None:
+            return
+        predicted = self.last_prediction[0]
+        menu = tk.Menu(self.root, tearoff=0)
+        for name in self.handle.current.class_names:
+            menu.add_command(
+                label=name.replace('_', ' ') + ("  (predicted)" if name == predicted else ""),
+                command=lambda name=name: self.correct_label(name)
+            )
+        x = self.correct_btn.winfo_rootx()
+        y = self.correct_btn.winfo_rooty() + self.correct_btn.winfo_height()
+        try:
+            menu.tk_popup(x, y)
+        finally:
+            menu.grab_release()
+    
+    def correct_label(self, label):
+        """Record a correction without blocking the Tk thread"""
+        predicted, version = self.last_prediction
+        path = self.current_image_path
+        threading.Thread(
+            target=self._save_correction, args=(path, label, predicted, version),
+            name='correction-writer', daemon=True
+        ).start()
+        self.path_label.config(text=f"📄 {os.path.basename(path)} • ✏️ corrected to {label.replace('_', ' ')}")
+    
+    def _save_correction(self, path, label, predicted, version):
+        """Runs on a writer thread, so it must not touch any Tk widgets"""
+        try:
+            self.corrections.add(path, label, predicted=predicted, model_version=version)
+        except OSError as e:
+            logger.error("Failed to save correction for %s: %s", path, e)
+            return
+        logger.info("Corrected %s: %s -> %s", path, predicted, label)
+        
+        # Only published versions can be refit; a hot swap picks up the result
+        if self.refit_after <= 0 or version is None:
+            return
+        with self.refit_lock:
+            if self.refit_process is not None and self.refit_process.poll() is None:
+                return
+            if self.corrections.pending() >= self.refit_after:
+                logger.info("Starting background head refit (log: %s)", self.corrections.directory)
+                self.refit_process = start_refit(self.corrections.directory, MODELS_DIR)
 
 def main():
-    root = tk.Tk()
-    app = WasteClassifierApp(root)
+    parser = argparse.ArgumentParser(description="AI Waste Classifier")
+    parser.add_argument('--backend', choices=BACKENDS, default='keras',
+                        help="Inference backend (TFLite variants need: python model/train_simple.py --export-tflite)")
+    parser.add_argument('--model', default=None,
+                        help="Path to a trained Keras model (default: the published version in models/)")
+    parser.add_argument('--cascade', action='store_true',
+                        help="Try the fast first-stage model first (needs: python model/train_simple.py --cascade)")
+    parser.add_argument('--profile-startup', action='store_true',
+                        help="Print a startup timing breakdown once the model is ready")
+    parser.add_argument('--cache-size', type=int, default=1024,
+                        help="Predictions kept in the in-memory cache (0 disables caching)")
+    parser.add_argument('--cache-db', default=None,
+                        help="SQLite file that persists cached predictions across restarts")
+    parser.add_argument('--thumbnail-cache', default=DEFAULT_THUMBNAIL_DIR,
+                        help="Directory for gallery thumbnails, reused while the image file is unchanged")
+    parser.add_argument('--corrections-dir', default=DEFAULT_CORRECTIONS_DIR,
+                        help="Where 'Correct Label' stores corrected images and the corrections log")
+    parser.add_argument('--refit-after', type=int, default=10,
+                        help="Refit the classification head in the background after this many new corrections (0 disables)")
+    metrics.add_arguments(parser)
+    args = parser.parse_args()
+    exporter = metrics.configure(args)
+
+    profiler = StartupProfiler(enabled=args.profile_startup)
+    with profiler.stage('tk init'):
+        root = tk.Tk()
+    app = WasteClassifierApp(root, backend=args.backend, model_path=args.model, profiler=profiler,
+                             cache_size=args.cache_size, cache_db=args.cache_db, cascade=args.cascade,
+                             thumbnail_dir=args.thumbnail_cache, corrections_dir=args.corrections_dir,
+                             refit_after=args.refit_after)
     root.mainloop()
+    
+    if exporter is not None:
+        exporter.stop()
 
 if __name__ == "__main__":
     main()
@@ -0,0 +1,90 @@
+"""
+Training epoch time with augmentation inside the model vs in tf.data.
+
+Trains a few epochs per configuration and reports the mean epoch time
+(first epoch excluded as warm-up) and the speedup over the old setup, where
+the augmentation layers run inside the model step:
+
+    model                 in-model augmentation layers (the old default)
+    pipeline              parallel tf.data augmentation stage
+    pipeline+mixed        ... with mixed precision (bfloat16 on CPU)
+    pipeline+xla          ... with an XLA-compiled training step
+    pipeline+mixed+xla    both
+
+    python benchmarks/augment_bench.py --epochs 4
+    python benchmarks/augment_bench.py --configs model pipeline --data-dir big_dataset/
+"""
+
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+
+from common import REPO_ROOT
+
+TRAIN_SCRIPT = os.path.join(REPO_ROOT, 'model', 'train_simple.py')
+
+CONFIGS = {
+    'model': ['--augmentation', 'model'],
+    'pipeline': [],
+    'pipeline+mixed': ['--mixed-precision'],
+    'pipeline+xla': ['--xla'],
+    'pipeline+mixed+xla': ['--mixed-precision', '--xla'],
+}
+
+
+def run(name, args, directory):
+    log_path = os.path.join(directory, f"throughput_{name}.json")
+    command = [
+        sys.executable, TRAIN_SCRIPT,
+        '--data-dir', args.data_dir, '--epochs', str(args.epochs),
+        '--batch-size', str(args.batch_size),
+        '--save-path', os.path.join(directory, f"model_{name}.h5"),
+        '--throughput-log', log_path,
+    ] + CONFIGS[name]
+    if args.shards:
+        command += ['--shards', args.shards]
+    subprocess.run(command, check=True, stdout=subprocess.DEVNULL if args.quiet else None)
+
+    with open(log_path) as f:
+        log = json.load(f)
+    epochs = log['epochs'][1:] or log['epochs']
+    return {
+        'config': name,
+        'epoch_s': sum(e['seconds'] for e in epochs) / len(epochs),
+        'samples_per_sec': sum(e['samples_per_sec'] for e in epochs) / len(epochs),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Epoch time: in-model vs tf.data augmentation, mixed precision, XLA")
+    parser.add_argument('--configs', nargs='+', choices=list(CONFIGS), default=list(CONFIGS))
+    parser.add_argument('--data-dir', default=os.path.join(REPO_ROOT, 'dataset'))
+    parser.add_argument('--shards', default=None, help="Train from TFRecord shards in this directory")
+    parser.add_argument('--epochs', type=int, default=4)
+    parser.add_argument('--batch-size', type=int, default=32)
+    parser.add_argument('--quiet', action='store_true', help="Hide training output")
+    parser.add_argument('--output', help="Write results as JSON")
+    args = parser.parse_args()
+
+    # Early stopping can't trigger in a few epochs, so every run does the same work
+    results = []
+    with tempfile.TemporaryDirectory() as directory:
+        for name in args.configs:
+            results.append(run(name, args, directory))
+
+    baseline = next((r for r in results if r['config'] == 'model'), results[0])
+    print(f"\n{'config':<22}{'epoch s':>9}{'samples/s':>11}{'speedup':>9}")
+    for r in results:
+        r['speedup'] = baseline['epoch_s'] / r['epoch_s']
+        print(f"{r['config']:<22}{r['epoch_s']:>9.2f}{r['samples_per_sec']:>11.1f}{r['speedup']:>9.2f}x")
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
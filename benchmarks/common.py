@@ -0,0 +1,55 @@
+"""
+Helpers shared by the benchmark scripts.
+Importing this module puts the repo root and model/ on sys.path so the
+scripts can be run directly: python benchmarks/<script>.py
+"""
+
+import os
+import sys
+import numpy as np
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+for _path in (REPO_ROOT, os.path.join(REPO_ROOT, 'model')):
+    if _path not in sys.path:
+        sys.path.insert(0, _path)
+
+
+def current_rss_mb():
+    """Resident set size of this process in MB, or None if unavailable"""
+    try:
+        import psutil
+        return psutil.Process().memory_info().rss / 1e6
+    except ImportError:
+        pass
+    try:
+        with open('/proc/self/status') as f:
+            for line in f:
+                if line.startswith('VmRSS:'):
+                    return int(line.split()[1]) / 1e3
+    except OSError:
+        pass
+    return None
+
+
+def peak_rss_mb():
+    """Peak resident set size of this process in MB, or None if unavailable"""
+    try:
+        import resource
+    except ImportError:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux reports KB, macOS reports bytes
+    return peak / 1e6 if sys.platform == 'darwin' else peak / 1e3
+
+
+def latency_summary(seconds):
+    """p50/p95/p99/mean in milliseconds for a list of durations"""
+    ms = np.asarray(seconds) * 1000
+    if not len(ms):
+        return {}
+    return {
+        'p50_ms': round(float(np.percentile(ms, 50)), 3),
+        'p95_ms': round(float(np.percentile(ms, 95)), 3),
+        'p99_ms': round(float(np.percentile(ms, 99)), 3),
+        'mean_ms': round(float(ms.mean()), 3),
+    }
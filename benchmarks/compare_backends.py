@@ -0,0 +1,177 @@
+"""
+Compare inference backends on the validation split.
+
+Each backend runs in its own subprocess so memory numbers are not polluted
+by another backend (or by TensorFlow being imported when TFLite alone
+would do). Reports load time, first-call (tracing) time, latency,
+throughput, peak RSS, graph op count and accuracy relative to the Keras
+model, then recommends the fastest backend whose accuracy is within the
+tolerance.
+
+    python model/train_simple.py --export-tflite
+    python benchmarks/compare_backends.py --tolerance 0.01
+"""
+
+import argparse
+import json
+import os
+import subprocess
+import sys
+import time
+
+from common import REPO_ROOT, current_rss_mb, latency_summary, peak_rss_mb
+
+
+def path_size_mb(path):
+    """Size of a model file, or of every file under a SavedModel directory"""
+    if os.path.isdir(path):
+        return sum(
+            os.path.getsize(os.path.join(dirpath, name))
+            for dirpath, _, names in os.walk(path) for name in names
+        ) / 1e6
+    return os.path.getsize(path) / 1e6
+
+
+def graph_op_count(backend):
+    """
+    Number of ops in the traced per-image graph, including the bodies of
+    nested functions. Only meaningful for TensorFlow graph backends.
+    """
+    import tensorflow as tf
+
+    if backend.name == 'keras':
+        shape = backend.model.input_shape[1:]
+        fn = tf.function(lambda x: backend.model(x, training=False))
+        concrete = fn.get_concrete_function(tf.TensorSpec([1, *shape], tf.float32))
+    elif backend.name == 'savedmodel':
+        # `serve` was saved with a fixed [None, H, W, 3] uint8 signature
+        concrete = backend.module.serve.get_concrete_function()
+    else:
+        return None
+    graph_def = concrete.graph.as_graph_def()
+    return len(graph_def.node) + sum(len(f.node_def) for f in graph_def.library.function)
+
+
+def run_worker(args):
+    """Benchmark a single backend and print a JSON result line"""
+    import numpy as np
+    from dataset_files import list_image_files, split_files
+
+    paths, labels, _ = list_image_files(args.data_dir)
+    _, (val_paths, val_labels) = split_files(paths, labels)
+    if not val_paths:
+        raise SystemExit("Validation split is empty")
+
+    rss_start = current_rss_mb()
+    t0 = time.perf_counter()
+    from inference import load_backend
+    from preprocessing import load_and_preprocess
+    backend = load_backend(args.worker, args.model)
+    load_s = time.perf_counter() - t0
+    rss_loaded = current_rss_mb()
+
+    images = np.stack([load_and_preprocess(p, backend.input_size) for p in val_paths])
+
+    t0 = time.perf_counter()
+    backend.predict(images[:1])
+    first_call_ms = (time.perf_counter() - t0) * 1000
+
+    latencies = []
+    for i in range(args.runs):
+        t0 = time.perf_counter()
+        backend.predict(images[i % len(images)][None])
+        latencies.append(time.perf_counter() - t0)
+
+    t0 = time.perf_counter()
+    probabilities = np.concatenate([
+        backend.predict(images[i:i + args.batch_size])
+        for i in range(0, len(images), args.batch_size)
+    ])
+    batch_s = time.perf_counter() - t0
+    predicted = probabilities.argmax(axis=1)
+
+    print(json.dumps({
+        'backend': args.worker,
+        'model_file': backend.model_path,
+        'model_size_mb': round(path_size_mb(backend.model_path), 2),
+        'load_s': round(load_s, 3),
+        'first_call_ms': round(first_call_ms, 2),
+        'latency': latency_summary(latencies),
+        'throughput_img_s': round(len(images) / batch_s, 1),
+        'load_rss_mb': round(rss_loaded - rss_start, 1) if rss_start and rss_loaded else None,
+        'peak_rss_mb': peak_rss_mb(),
+        'graph_ops': graph_op_count(backend),
+        'accuracy': float((predicted == val_labels).mean()),
+        'predictions': predicted.tolist(),
+    }))
+
+
+def compare(args):
+    results = []
+    for name in args.backends:
+        print(f"Benchmarking {name}...", file=sys.stderr)
+        proc = subprocess.run(
+            [sys.executable, os.path.abspath(__file__), '--worker', name,
+             '--model', args.model, '--data-dir', args.data_dir,
+             '--runs', str(args.runs), '--batch-size', str(args.batch_size)],
+            capture_output=True, text=True, cwd=os.getcwd()
+        )
+        if proc.returncode != 0:
+            print(f"  {name} failed:\n{proc.stderr.strip()}", file=sys.stderr)
+            continue
+        results.append(json.loads(proc.stdout.strip().splitlines()[-1]))
+
+    reference = next((r for r in results if r['backend'] == 'keras'), None)
+    for r in results:
+        if reference:
+            r['accuracy_delta'] = r['accuracy'] - reference['accuracy']
+            agree = sum(a == b for a, b in zip(r['predictions'], reference['predictions']))
+            r['agreement'] = agree / len(reference['predictions'])
+        r.pop('predictions')
+
+    print(f"\n{'backend':<16}{'size MB':>9}{'load s':>8}{'1st ms':>9}{'p50 ms':>9}"
+          f"{'p95 ms':>9}{'img/s':>9}{'RSS MB':>9}{'ops':>7}{'acc':>8}{'Δacc':>8}")
+    for r in results:
+        print(f"{r['backend']:<16}{r['model_size_mb']:>9}{r['load_s']:>8}{r['first_call_ms']:>9}"
+              f"{r['latency']['p50_ms']:>9}{r['latency']['p95_ms']:>9}{r['throughput_img_s']:>9}"
+              f"{r['peak_rss_mb'] or 0:>9.0f}{r['graph_ops'] or '-':>7}{r['accuracy']:>8.2%}{r.get('accuracy_delta', 0):>+8.2%}")
+
+    eligible = [r for r in results if r.get('accuracy_delta', 0) >= -args.tolerance]
+    if eligible:
+        best = min(eligible, key=lambda r: r['latency']['p50_ms'])
+        print(f"\nRecommended backend (within {args.tolerance:.1%} accuracy): {best['backend']}")
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(results, f, indent=2)
+        print(f"Results written to {args.output}")
+
+
+def main():
+    from inference import BACKENDS
+    from model_registry import resolve_artifacts
+
+    _, default_model, _ = resolve_artifacts()
+    parser = argparse.ArgumentParser(description="Compare Keras, SavedModel and TFLite inference backends")
+    # knn needs an embedding index rather than model exports; request it explicitly
+    parser.add_argument('--backends', nargs='+', choices=BACKENDS,
+                        default=[b for b in BACKENDS if b != 'knn'])
+    parser.add_argument('--model', default=default_model,
+                        help="Keras model to compare (default: the published version in models/)")
+    parser.add_argument('--data-dir', default=os.path.join(REPO_ROOT, 'dataset'))
+    parser.add_argument('--runs', type=int, default=50, help="Single-image latency samples")
+    parser.add_argument('--batch-size', type=int, default=32)
+    parser.add_argument('--tolerance', type=float, default=0.01,
+                        help="Maximum accuracy drop vs Keras for the recommendation")
+    parser.add_argument('--output', help="Write results as JSON")
+    parser.add_argument('--worker', help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.worker:
+        run_worker(args)
+    else:
+        compare(args)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,111 @@
+"""
+Compare the legacy full-resolution decode path against
+preprocessing.decode_image (reduced-scale JPEG decode).
+
+Each path runs in its own subprocess so peak RSS is measured separately.
+
+    python benchmarks/decode_bench.py                      # dataset/ images
+    python benchmarks/decode_bench.py --synthetic 24 --count 10   # 24 MP JPEGs
+"""
+
+import argparse
+import glob
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+
+from common import REPO_ROOT, latency_summary, peak_rss_mb
+
+
+def legacy_path(path):
+    """The original select_image + classify_image decode"""
+    from PIL import Image
+    from preprocessing import DISPLAY_SIZE, display_size_for, preprocess_image
+
+    image = Image.open(path)
+    display = image.copy()
+    display = display.resize(display_size_for(display.size, DISPLAY_SIZE), Image.Resampling.LANCZOS)
+    model_array = preprocess_image(image)
+    return display, model_array, image
+
+
+def reduced_path(path):
+    from preprocessing import decode_image
+    return decode_image(path)
+
+
+def make_synthetic(directory, megapixels, count):
+    """Write `count` smooth-gradient JPEGs of roughly `megapixels` MP"""
+    import numpy as np
+    from PIL import Image
+
+    width = int((megapixels * 1e6 * 3 / 2) ** 0.5)
+    height = int(width * 2 / 3)
+    rng = np.random.default_rng(0)
+    x = np.linspace(0, 255, width, dtype=np.float32)
+    y = np.linspace(0, 255, height, dtype=np.float32)[:, None]
+    paths = []
+    for i in range(count):
+        noise = rng.normal(0, 8, (height, width, 1)).astype(np.float32)
+        pixels = np.stack([x + 0 * y, y + 0 * x, (x + y) / 2], axis=-1) + noise
+        path = os.path.join(directory, f"synthetic_{i}.jpg")
+        Image.fromarray(np.clip(pixels, 0, 255).astype(np.uint8)).save(path, quality=90)
+        paths.append(path)
+    return paths
+
+
+def run_worker(mode, paths, repeats):
+    fn = legacy_path if mode == 'legacy' else reduced_path
+    timings = []
+    for _ in range(repeats):
+        for path in paths:
+            t0 = time.perf_counter()
+            result = fn(path)
+            timings.append(time.perf_counter() - t0)
+            # The GUI keeps the result alive until the next image is chosen
+            del result
+    print(json.dumps({'mode': mode, 'latency': latency_summary(timings), 'peak_rss_mb': peak_rss_mb()}))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark image decode paths")
+    parser.add_argument('--images', default=os.path.join(REPO_ROOT, 'dataset', '**', '*.jpg'),
+                        help="Glob of images to decode")
+    parser.add_argument('--synthetic', type=float, default=None,
+                        help="Generate synthetic JPEGs of this many megapixels instead")
+    parser.add_argument('--count', type=int, default=5, help="Synthetic images to generate")
+    parser.add_argument('--repeats', type=int, default=3)
+    parser.add_argument('--worker', choices=['legacy', 'reduced'], help=argparse.SUPPRESS)
+    parser.add_argument('--paths', nargs='*', help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.worker:
+        run_worker(args.worker, args.paths, args.repeats)
+        return
+
+    with tempfile.TemporaryDirectory() as tmp:
+        if args.synthetic:
+            paths = make_synthetic(tmp, args.synthetic, args.count)
+        else:
+            paths = sorted(glob.glob(args.images, recursive=True))
+        if not paths:
+            raise SystemExit("No images to benchmark")
+
+        print(f"Decoding {len(paths)} images x {args.repeats} repeats")
+        for mode in ('legacy', 'reduced'):
+            proc = subprocess.run(
+                [sys.executable, os.path.abspath(__file__), '--worker', mode,
+                 '--repeats', str(args.repeats), '--paths', *paths],
+                capture_output=True, text=True, check=True
+            )
+            result = json.loads(proc.stdout.strip().splitlines()[-1])
+            latency = result['latency']
+            print(f"  {mode:<8} p50 {latency['p50_ms']:>8.1f} ms  p95 {latency['p95_ms']:>8.1f} ms  "
+                  f"peak RSS {result['peak_rss_mb'] or 0:>7.1f} MB")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,99 @@
+"""
+Query latency of the embedding index against its size.
+
+Builds synthetic indexes of clustered random unit vectors (MobileNetV2's
+1280-d embeddings by default) and compares the exact scan with the k-means
+IVF partition, reporting latency and IVF recall of the exact top-k.
+
+    python benchmarks/index_bench.py --sizes 10000 100000 1000000 --nprobe 8
+"""
+
+import argparse
+import json
+import tempfile
+import time
+
+import numpy as np
+
+from common import latency_summary
+from embedding_index import EmbeddingIndex
+
+
+def synthetic_embeddings(count, dim, num_clusters=64, seed=0):
+    """Unit vectors scattered around random cluster centres, like real class structure"""
+    rng = np.random.default_rng(seed)
+    centres = rng.standard_normal((num_clusters, dim)).astype(np.float32)
+    labels = rng.integers(0, num_clusters, count)
+    vectors = centres[labels] + 0.5 * rng.standard_normal((count, dim)).astype(np.float32)
+    return vectors, labels
+
+
+def time_queries(index, queries, k, nprobe):
+    latencies, rows = [], []
+    for query in queries:
+        start = time.perf_counter()
+        _, top = index.search(query, k, nprobe)
+        latencies.append(time.perf_counter() - start)
+        rows.append(set(top[0].tolist()))
+    return latencies, rows
+
+
+def run_size(count, args):
+    vectors, labels = synthetic_embeddings(count + args.queries, args.dim)
+    queries = vectors[count:]
+    with tempfile.TemporaryDirectory() as directory:
+        index = EmbeddingIndex.create(directory, args.dim)
+        index.dense_limit_mb = args.dense_limit_mb
+        start = time.perf_counter()
+        for i in range(0, count, 65536):
+            index.add(vectors[i:min(i + 65536, count)], [f"c{label}" for label in labels[i:min(i + 65536, count)]])
+        append_s = time.perf_counter() - start
+
+        exact_latencies, exact_rows = time_queries(index, queries, args.k, args.nprobe)
+
+        start = time.perf_counter()
+        n_lists = index.build_ivf(min(args.lists, max(1, count // 39)))
+        build_s = time.perf_counter() - start
+        ivf_latencies, ivf_rows = time_queries(index, queries, args.k, args.nprobe)
+
+    recall = np.mean([len(a & b) / len(a) for a, b in zip(exact_rows, ivf_rows)])
+    return {
+        'rows': count,
+        'index_mb': round(count * args.dim * 2 / 1e6, 1),
+        'append_s': round(append_s, 2),
+        'exact': latency_summary(exact_latencies),
+        'ivf_lists': n_lists,
+        'ivf_build_s': round(build_s, 2),
+        'ivf': latency_summary(ivf_latencies),
+        'ivf_recall': round(float(recall), 4),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Embedding index query latency vs size")
+    parser.add_argument('--sizes', type=int, nargs='+', default=[10_000, 100_000, 300_000])
+    parser.add_argument('--dim', type=int, default=1280)
+    parser.add_argument('--queries', type=int, default=100)
+    parser.add_argument('--k', type=int, default=5)
+    parser.add_argument('--lists', type=int, default=256)
+    parser.add_argument('--nprobe', type=int, default=8)
+    parser.add_argument('--dense-limit-mb', type=int, default=512,
+                        help="Keep a float32 copy in RAM below this size (0: always scan the memory map)")
+    parser.add_argument('--output', help="Write results as JSON")
+    args = parser.parse_args()
+
+    results = []
+    print(f"{'rows':>9}{'MB':>8}{'exact p50':>11}{'ivf p50':>9}{'recall':>8}")
+    for count in args.sizes:
+        result = run_size(count, args)
+        print(f"{count:>9}{result['index_mb']:>8}{result['exact']['p50_ms']:>11}"
+              f"{result['ivf']['p50_ms']:>9}{result['ivf_recall']:>8}")
+        results.append(result)
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,175 @@
+"""
+Model loading: per-process memory and load time, .h5 vs memory-mapped TFLite.
+
+Starts N processes per loader at once, the way several classifiers share one
+box, and reports for each loader:
+
+    cold load   first load in a fresh process: library imports plus reading
+                the model, with the model file evicted from the page cache
+                first where the OS allows it (posix_fadvise)
+    warm load   loading the same model again in that process
+    RSS         resident memory per process, shared pages counted in full
+    PSS / USS   proportional and private memory (Linux); weights shared
+                through the page cache are split across processes in PSS
+                and absent from USS
+    total PSS   what the N processes really cost together
+
+    python model/export.py --tflite --model models/<version>/waste_classifier_model.h5
+    python benchmarks/load_bench.py --processes 4
+"""
+
+import argparse
+import gc
+import json
+import os
+import subprocess
+import sys
+import time
+
+from common import REPO_ROOT, current_rss_mb
+
+LOADERS = ('keras', 'savedmodel', 'tflite-float16', 'tflite-int8')
+
+
+def memory_mb():
+    """{'rss_mb', 'pss_mb', 'uss_mb'} of this process; PSS/USS only on Linux"""
+    result = {'rss_mb': current_rss_mb(), 'pss_mb': None, 'uss_mb': None}
+    try:
+        with open('/proc/self/smaps_rollup') as f:
+            fields = {line.split(':')[0]: int(line.split()[1]) for line in f if line.endswith('kB\n')}
+    except OSError:
+        return result
+    result['rss_mb'] = fields['Rss'] / 1e3
+    result['pss_mb'] = fields['Pss'] / 1e3
+    result['uss_mb'] = (fields['Private_Clean'] + fields['Private_Dirty']) / 1e3
+    return result
+
+
+def evict(path):
+    """Drop a file's clean pages from the page cache, where supported"""
+    if not hasattr(os, 'posix_fadvise') or not os.path.isfile(path):
+        return False
+    fd = os.open(path, os.O_RDONLY)
+    try:
+        os.posix_fadvise(fd, 0, 0, os.POSIX_FADV_DONTNEED)
+    finally:
+        os.close(fd)
+    return True
+
+
+def run_worker(args):
+    """Load, predict, report ready, then measure memory once every process is loaded"""
+    import numpy as np
+    from inference import load_backend
+
+    start = time.perf_counter()
+    backend = load_backend(args.worker, args.model)
+    cold_load = time.perf_counter() - start
+
+    width, height = backend.input_size
+    batch = np.random.default_rng(0).integers(0, 256, size=(1, height, width, 3), dtype=np.uint8)
+    start = time.perf_counter()
+    backend.predict(batch)
+    first_predict = time.perf_counter() - start
+
+    # Memory is measured while all N processes hold the model
+    print('ready', flush=True)
+    sys.stdin.readline()
+    memory = memory_mb()
+
+    del backend
+    gc.collect()
+    start = time.perf_counter()
+    load_backend(args.worker, args.model)
+    warm_load = time.perf_counter() - start
+
+    print(json.dumps(dict(memory, cold_load_s=cold_load, warm_load_s=warm_load,
+                          first_predict_ms=1000 * first_predict)), flush=True)
+
+
+def run_loader(loader, args, model_path):
+    """Start --processes workers together and collect their results"""
+    from inference import savedmodel_path, tflite_path
+
+    artifact = {
+        'keras': model_path,
+        'savedmodel': savedmodel_path(model_path),
+    }.get(loader) or tflite_path(model_path, loader.split('-', 1)[1])
+    if not os.path.exists(artifact):
+        print(f"Skipping {loader}: {artifact} not found", file=sys.stderr)
+        return None
+    evicted = args.cold and evict(artifact)
+
+    env = dict(os.environ, CUDA_VISIBLE_DEVICES='')
+    command = [sys.executable, os.path.abspath(__file__), '--worker', loader, '--model', model_path]
+    print(f"Loading {loader} in {args.processes} processes...", file=sys.stderr)
+    workers = [
+        subprocess.Popen(command, stdin=subprocess.PIPE, stdout=subprocess.PIPE, text=True, env=env, cwd=REPO_ROOT)
+        for _ in range(args.processes)
+    ]
+    for worker in workers:
+        if worker.stdout.readline().strip() != 'ready':
+            for other in workers:
+                other.kill()
+            raise SystemExit(f"{loader} worker failed to load the model")
+    results = []
+    for worker in workers:
+        worker.stdin.write('\n')
+        worker.stdin.flush()
+    for worker in workers:
+        results.append(json.loads(worker.stdout.readline()))
+        worker.wait()
+
+    def mean(key):
+        values = [r[key] for r in results if r[key] is not None]
+        return sum(values) / len(values) if values else None
+
+    summary = {key: mean(key) for key in results[0]}
+    summary['total_pss_mb'] = sum(r['pss_mb'] for r in results) if summary['pss_mb'] is not None else None
+    summary.update(loader=loader, processes=args.processes, evicted=evicted,
+                   size_mb=os.path.getsize(artifact) / 1e6 if os.path.isfile(artifact) else None)
+    return summary
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Per-process memory and load time of model loaders")
+    parser.add_argument('--loaders', nargs='+', choices=LOADERS, default=['keras', 'tflite-int8'])
+    parser.add_argument('--model', default=None,
+                        help="Keras model the exports sit next to (default: the published version)")
+    parser.add_argument('--processes', type=int, default=4, help="Processes loading the model at once")
+    parser.add_argument('--no-cold', dest='cold', action='store_false',
+                        help="Don't evict the model file from the page cache before the first load")
+    parser.add_argument('--output', help="Write results as JSON")
+    parser.add_argument('--worker', help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.worker:
+        run_worker(args)
+        return
+
+    from model_registry import resolve_artifacts
+
+    model_path = os.path.abspath(args.model or resolve_artifacts()[1])
+    results = [r for r in (run_loader(loader, args, model_path) for loader in args.loaders) if r]
+    if not results:
+        raise SystemExit("No model artifacts found. Export TFLite models with: python model/export.py --tflite")
+
+    def cell(value, fmt):
+        return format(value, fmt) if value is not None else '-'
+
+    print(f"\n{'loader':<16}{'MB':>7}{'cold s':>9}{'warm s':>9}{'1st ms':>9}"
+          f"{'RSS MB':>9}{'PSS MB':>9}{'USS MB':>9}{'total PSS':>11}")
+    for r in results:
+        print(f"{r['loader']:<16}{cell(r['size_mb'], '7.1f')}{r['cold_load_s']:>9.3f}{r['warm_load_s']:>9.3f}"
+              f"{r['first_predict_ms']:>9.1f}{cell(r['rss_mb'], '9.1f')}{cell(r['pss_mb'], '9.1f')}"
+              f"{cell(r['uss_mb'], '9.1f')}{cell(r['total_pss_mb'], '11.1f')}")
+    print(f"({args.processes} processes per loader; page cache "
+          f"{'evicted' if any(r['evicted'] for r in results) else 'not evicted'} before cold loads)")
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,107 @@
+"""
+Load generator for serve.py.
+
+Sends images from dataset/ to /classify over keep-alive connections at
+several concurrency levels and reports throughput and tail latency.
+
+    python serve.py --port 8080 &
+    python benchmarks/load_test.py --port 8080 --concurrency 1 4 16 64
+"""
+
+import argparse
+import asyncio
+import glob
+import itertools
+import json
+import os
+import time
+
+from common import REPO_ROOT, latency_summary
+
+
+async def _request(reader, writer, host, body):
+    writer.write(
+        f"POST /classify HTTP/1.1\r\nHost: {host}\r\nContent-Type: application/octet-stream\r\n"
+        f"Content-Length: {len(body)}\r\n\r\n".encode('latin-1') + body
+    )
+    await writer.drain()
+
+    status = int((await reader.readline()).split()[1])
+    length = 0
+    while True:
+        line = await reader.readline()
+        if line in (b'\r\n', b''):
+            break
+        name, value = line.decode('latin-1').split(':', 1)
+        if name.strip().lower() == 'content-length':
+            length = int(value)
+    await reader.readexactly(length)
+    return status
+
+
+async def run_level(host, port, images, concurrency, total_requests):
+    counter = itertools.count()
+    latencies, statuses = [], {}
+
+    async def client():
+        reader, writer = await asyncio.open_connection(host, port)
+        try:
+            while (i := next(counter)) < total_requests:
+                body = images[i % len(images)]
+                t0 = time.perf_counter()
+                status = await _request(reader, writer, host, body)
+                elapsed = time.perf_counter() - t0
+                statuses[status] = statuses.get(status, 0) + 1
+                if status == 200:
+                    latencies.append(elapsed)
+        finally:
+            writer.close()
+
+    start = time.perf_counter()
+    await asyncio.gather(*(client() for _ in range(concurrency)))
+    wall = time.perf_counter() - start
+    return {
+        'concurrency': concurrency,
+        'requests': total_requests,
+        'throughput_rps': round(len(latencies) / wall, 1),
+        'statuses': statuses,
+        'latency': latency_summary(latencies),
+    }
+
+
+async def main_async(args):
+    paths = sorted(glob.glob(os.path.join(args.images, '**', '*.jpg'), recursive=True))
+    if not paths:
+        raise SystemExit(f"No .jpg images under {args.images}")
+    images = []
+    for path in paths:
+        with open(path, 'rb') as f:
+            images.append(f.read())
+
+    results = []
+    print(f"{'conc':>5}{'req/s':>9}{'p50 ms':>9}{'p95 ms':>9}{'p99 ms':>9}  statuses")
+    for concurrency in args.concurrency:
+        result = await run_level(args.host, args.port, images, concurrency, args.requests)
+        latency = result['latency']
+        print(f"{concurrency:>5}{result['throughput_rps']:>9}{latency.get('p50_ms', 0):>9}"
+              f"{latency.get('p95_ms', 0):>9}{latency.get('p99_ms', 0):>9}  {result['statuses']}")
+        results.append(result)
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(results, f, indent=2)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Load test the inference server")
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8080)
+    parser.add_argument('--images', default=os.path.join(REPO_ROOT, 'dataset'))
+    parser.add_argument('--concurrency', type=int, nargs='+', default=[1, 4, 16, 64])
+    parser.add_argument('--requests', type=int, default=500, help="Requests per concurrency level")
+    parser.add_argument('--output', help="Write results as JSON")
+    asyncio.run(main_async(parser.parse_args()))
+
+
+if __name__ == "__main__":
+    main()
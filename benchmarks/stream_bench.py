@@ -0,0 +1,102 @@
+"""
+Throughput of the video classifier with and without frame deduplication.
+
+Builds a synthetic conveyor video from dataset images, holding each image for
+--hold frames with a little sensor noise so consecutive frames are near but
+not exactly identical, then runs classify_stream over it once per
+--dedup-distance value and reports effective frames/sec and skipped fraction.
+
+    python benchmarks/stream_bench.py --hold 30 --images 20
+    python benchmarks/stream_bench.py --video conveyor.mp4 --dedup-distance -1 4 8
+"""
+
+import argparse
+import glob
+import json
+import os
+import tempfile
+
+import numpy as np
+
+from common import REPO_ROOT
+
+
+class NullWriter:
+    def write(self, rows):
+        pass
+
+    def close(self):
+        pass
+
+
+def make_video(path, image_paths, hold, size=(640, 480), fps=30, seed=0):
+    import cv2
+
+    rng = np.random.default_rng(seed)
+    writer = cv2.VideoWriter(path, cv2.VideoWriter_fourcc(*'mp4v'), fps, size)
+    for image_path in image_paths:
+        frame = cv2.resize(cv2.imread(image_path), size, interpolation=cv2.INTER_AREA)
+        for _ in range(hold):
+            noise = rng.normal(0, 2, frame.shape)
+            writer.write(np.clip(frame + noise, 0, 255).astype(np.uint8))
+    writer.release()
+    return len(image_paths) * hold
+
+
+def run(video, loaded, dedup_distance, args):
+    from classify_stream import classify_stream, open_source
+
+    capture, live = open_source(video)
+    try:
+        stats = classify_stream(loaded.backend, loaded.class_names, capture, live, NullWriter(),
+                                args.batch_size, args.every, dedup_distance, args.workers)
+    finally:
+        capture.release()
+    summary = stats.summary()
+    summary['dedup_distance'] = dedup_distance
+    return summary
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Video classification throughput with frame deduplication")
+    parser.add_argument('--video', help="Use this video instead of a synthetic one")
+    parser.add_argument('--data-dir', default=os.path.join(REPO_ROOT, 'dataset'))
+    parser.add_argument('--images', type=int, default=20, help="Distinct scenes in the synthetic video")
+    parser.add_argument('--hold', type=int, default=30, help="Frames each scene is held for")
+    parser.add_argument('--dedup-distance', type=int, nargs='+', default=[-1, 4],
+                        help="Values to compare (-1 disables deduplication)")
+    parser.add_argument('--every', type=int, default=1)
+    parser.add_argument('--batch-size', type=int, default=8)
+    parser.add_argument('--workers', type=int, default=2)
+    parser.add_argument('--backend', default='keras')
+    parser.add_argument('--model', default=None)
+    parser.add_argument('--output', help="Write results as JSON")
+    args = parser.parse_args()
+
+    from model_registry import MODELS_DIR, load_version
+    loaded = load_version(args.backend, MODELS_DIR, model_path=args.model)
+
+    with tempfile.TemporaryDirectory() as directory:
+        video = args.video
+        if video is None:
+            image_paths = sorted(glob.glob(os.path.join(args.data_dir, '*', '*.jpg')))[:args.images]
+            if not image_paths:
+                raise SystemExit(f"No .jpg images under {args.data_dir}")
+            video = os.path.join(directory, 'synthetic.mp4')
+            frames = make_video(video, image_paths, args.hold)
+            print(f"Synthetic video: {len(image_paths)} scenes x {args.hold} frames = {frames} frames")
+
+        results = [run(video, loaded, distance, args) for distance in args.dedup_distance]
+
+    print(f"\n{'dedup':>6}{'frames':>8}{'classified':>12}{'skipped':>9}{'fps':>8}")
+    for r in results:
+        print(f"{r['dedup_distance']:>6}{r['frames_read']:>8}{r['frames_classified']:>12}"
+              f"{r['skipped_fraction']:>9.1%}{r['effective_fps']:>8.1f}")
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,306 @@
+"""
+Performance regression suite for inference and training.
+
+Runs offline against dataset/ (or a generated synthetic image set) and
+measures, each stage in a fresh subprocess so load times are cold and peak
+RSS belongs to that stage alone:
+
+  inference  cold model load (TensorFlow import + deserialization), first
+             prediction, single-image latency p50/p99 through the GUI's
+             classify path (InferenceWorker submit -> poll), throughput at
+             batch sizes 1-128 and peak RSS
+  training   samples/sec of model/train_simple.py's train() (first epoch
+             excluded as warm-up) and peak RSS
+
+Results are written as JSON. If a baseline exists it is compared metric by
+metric and the run exits non-zero when any metric is worse by more than
+--threshold (relative):
+
+    python benchmarks/suite.py --save-baseline          # record on a quiet machine
+    python benchmarks/suite.py                          # later: compare, fail on regression
+    python benchmarks/suite.py --synthetic 512 --skip-training --threshold 0.2
+
+Baselines only compare like with like: a baseline recorded with different
+settings (data, backend, batch sizes, epochs) is rejected.
+"""
+
+import argparse
+import json
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+
+from common import REPO_ROOT, latency_summary, peak_rss_mb
+
+DEFAULT_BASELINE = os.path.join(REPO_ROOT, 'benchmarks', 'baseline.json')
+BATCH_SIZES = [1, 2, 4, 8, 16, 32, 64, 128]
+CLASSES = ('biodegradable', 'non_biodegradable')
+
+
+def make_synthetic_dataset(directory, count, size=(640, 480), seed=0):
+    """
+    Write `count` JPEGs split across the two classes. Each class has its own
+    colour palette so a model can actually learn something from the images.
+    """
+    import numpy as np
+    from PIL import Image
+
+    rng = np.random.default_rng(seed)
+    width, height = size
+    for label, name in enumerate(CLASSES):
+        os.makedirs(os.path.join(directory, name), exist_ok=True)
+    for i in range(count):
+        label = i % len(CLASSES)
+        base = np.array([60, 160, 70] if label == 0 else [90, 110, 190], dtype=np.float32)
+        pixels = np.empty((height, width, 3), dtype=np.float32)
+        pixels[:] = base + rng.normal(0, 25, 3)
+        for _ in range(rng.integers(3, 8)):
+            x0, y0 = rng.integers(0, width - 40), rng.integers(0, height - 40)
+            x1, y1 = x0 + rng.integers(20, width // 2), y0 + rng.integers(20, height // 2)
+            pixels[y0:y1, x0:x1] = base[::-1] + rng.normal(0, 40, 3)
+        pixels += rng.normal(0, 8, pixels.shape)
+        path = os.path.join(directory, CLASSES[label], f"synthetic_{i:05d}.jpg")
+        Image.fromarray(np.clip(pixels, 0, 255).astype(np.uint8)).save(path, quality=90)
+    return directory
+
+
+def metric(value, unit, better):
+    return {'value': round(float(value), 4), 'unit': unit, 'better': better}
+
+
+def run_inference(args):
+    """Cold load, classify-path latency and batch throughput for one backend"""
+    start = time.perf_counter()
+    if not args.backend.startswith('tflite'):
+        import tensorflow  # noqa: F401
+    import numpy as np
+    from dataset_files import list_image_files
+    from inference import predict_batch
+    from inference_worker import InferenceWorker
+    from model_registry import ModelHandle, load_version
+    from preprocessing import decode_image
+
+    loaded = load_version(args.backend, model_path=args.model)
+    cold_load_s = time.perf_counter() - start
+    size = loaded.backend.input_size
+
+    paths, _, _ = list_image_files(args.data_dir)
+    if not paths:
+        raise SystemExit(f"No images under {args.data_dir}")
+    # Decoded the way select_image does, so classify sees the same arrays
+    images = [decode_image(path, display_size=None, model_size=size).model_array
+              for path in paths[:max(args.batch_sizes)]]
+
+    start = time.perf_counter()
+    predict_batch(loaded.backend, images[0][None])
+    first_predict_ms = (time.perf_counter() - start) * 1000
+
+    # The GUI path: submit to the worker thread, poll for the result
+    worker = InferenceWorker(ModelHandle(loaded))
+    latencies = []
+    for i in range(args.warmup + args.runs):
+        start = time.perf_counter()
+        request_id = worker.submit(images[i % len(images)])
+        while True:
+            result = worker.poll()
+            if result is not None and result[0] == request_id:
+                break
+            time.sleep(0.0001)
+        if result[2] is not None:
+            raise result[2]
+        if i >= args.warmup:
+            latencies.append(time.perf_counter() - start)
+    worker.stop()
+    latency = latency_summary(latencies)
+
+    metrics = {
+        'cold_load_s': metric(cold_load_s, 's', 'lower'),
+        'first_predict_ms': metric(first_predict_ms, 'ms', 'lower'),
+        'latency_p50_ms': metric(latency['p50_ms'], 'ms', 'lower'),
+        'latency_p99_ms': metric(latency['p99_ms'], 'ms', 'lower'),
+    }
+    for batch_size in args.batch_sizes:
+        batch = np.stack([images[i % len(images)] for i in range(batch_size)])
+        predict_batch(loaded.backend, batch)
+        # Repeat until at least --min-seconds of work so small batches aren't pure noise
+        calls, start = 0, time.perf_counter()
+        while calls < 3 or time.perf_counter() - start < args.min_seconds:
+            predict_batch(loaded.backend, batch)
+            calls += 1
+        images_per_s = calls * batch_size / (time.perf_counter() - start)
+        metrics[f'throughput_b{batch_size}_img_s'] = metric(images_per_s, 'img/s', 'higher')
+    metrics['inference_peak_rss_mb'] = metric(peak_rss_mb() or 0, 'MB', 'lower')
+    return metrics, {'model_version': loaded.version, 'model_path': loaded.backend.model_path}
+
+
+def run_training(args):
+    """Samples/sec of a short train() run"""
+    import tensorflow as tf
+    from train_simple import train
+
+    tf.keras.utils.set_random_seed(args.seed)
+    with tempfile.TemporaryDirectory() as directory:
+        log_path = os.path.join(directory, 'throughput.json')
+        train(args.data_dir, epochs=args.epochs, save_path=os.path.join(directory, 'model.h5'),
+              batch_size=args.train_batch_size, throughput_log=log_path)
+        with open(log_path) as f:
+            epochs = json.load(f)['epochs']
+    measured = epochs[1:] or epochs
+    return {
+        'train_samples_per_s': metric(sum(e['samples_per_sec'] for e in measured) / len(measured),
+                                      'samples/s', 'higher'),
+        'train_peak_rss_mb': metric(peak_rss_mb() or 0, 'MB', 'lower'),
+    }, {}
+
+
+def run_stage(stage, args, data_dir):
+    """Run one stage in a fresh interpreter and return (metrics, info)"""
+    command = [sys.executable, os.path.abspath(__file__), '--worker', stage, '--data-dir', data_dir,
+               '--backend', args.backend, '--runs', str(args.runs), '--warmup', str(args.warmup),
+               '--min-seconds', str(args.min_seconds), '--epochs', str(args.epochs),
+               '--train-batch-size', str(args.train_batch_size), '--seed', str(args.seed),
+               '--batch-sizes', *map(str, args.batch_sizes)]
+    if args.model:
+        command += ['--model', args.model]
+    env = dict(os.environ)
+    if not args.gpu:
+        env['CUDA_VISIBLE_DEVICES'] = ''
+    print(f"Running {stage} benchmarks...", file=sys.stderr)
+    proc = subprocess.run(command, capture_output=True, text=True, env=env)
+    if proc.returncode != 0:
+        raise SystemExit(f"{stage} benchmark failed:\n{proc.stderr.strip()}")
+    result = json.loads(proc.stdout.strip().splitlines()[-1])
+    return result['metrics'], result['info']
+
+
+def compare(results, baseline, threshold, overrides):
+    """Return (rows, regressions) comparing every metric present in both runs"""
+    rows, regressions = [], []
+    for name, current in results['metrics'].items():
+        previous = baseline['metrics'].get(name)
+        if previous is None or not previous['value']:
+            rows.append((name, None, current['value'], None, 'new'))
+            continue
+        change = (current['value'] - previous['value']) / previous['value']
+        worse = change if current['better'] == 'lower' else -change
+        limit = overrides.get(name, threshold)
+        status = 'REGRESSED' if worse > limit else ('improved' if worse < -limit else 'ok')
+        if status == 'REGRESSED':
+            regressions.append(name)
+        rows.append((name, previous['value'], current['value'], change, status))
+    return rows, regressions
+
+
+def print_report(results, rows=None):
+    print(f"\n{'metric':<28}{'baseline':>12}{'current':>12}{'change':>9}  status")
+    for name, current in results['metrics'].items():
+        row = next((r for r in rows or [] if r[0] == name), None)
+        if row is None:
+            print(f"{name:<28}{'-':>12}{current['value']:>12}{'':>9}  {current['unit']}")
+            continue
+        _, previous, value, change, status = row
+        print(f"{name:<28}{previous if previous is not None else '-':>12}{value:>12}"
+              f"{f'{change:+.1%}' if change is not None else '':>9}  {status}")
+
+
+def parse_overrides(values):
+    overrides = {}
+    for value in values:
+        name, _, limit = value.partition('=')
+        overrides[name] = float(limit)
+    return overrides
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Inference and training benchmark suite with regression check")
+    parser.add_argument('--data-dir', default=os.path.join(REPO_ROOT, 'dataset'))
+    parser.add_argument('--synthetic', type=int, default=None,
+                        help="Benchmark a generated set of this many images instead of --data-dir")
+    parser.add_argument('--backend', default='keras')
+    parser.add_argument('--model', default=None,
+                        help="Keras model to benchmark (default: the published version in models/)")
+    parser.add_argument('--runs', type=int, default=100, help="Single-image latency samples")
+    parser.add_argument('--warmup', type=int, default=10, help="Latency samples discarded first")
+    parser.add_argument('--batch-sizes', type=int, nargs='+', default=BATCH_SIZES)
+    parser.add_argument('--min-seconds', type=float, default=1.0, help="Minimum timed work per batch size")
+    parser.add_argument('--epochs', type=int, default=3, help="Training epochs (the first is warm-up)")
+    parser.add_argument('--train-batch-size', type=int, default=8)
+    parser.add_argument('--skip-training', action='store_true')
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--gpu', action='store_true', help="Allow the GPU (default: CPU only, for stable numbers)")
+    parser.add_argument('--output', default='benchmark_results.json', help="Where to write this run's results")
+    parser.add_argument('--baseline', default=DEFAULT_BASELINE, help="Baseline to compare against, if it exists")
+    parser.add_argument('--save-baseline', action='store_true', help="Write this run as the new baseline")
+    parser.add_argument('--threshold', type=float, default=0.10,
+                        help="Relative change in the worse direction that counts as a regression")
+    parser.add_argument('--metric-threshold', action='append', default=[], metavar='NAME=FRACTION',
+                        help="Per-metric threshold, e.g. cold_load_s=0.3 (repeatable)")
+    parser.add_argument('--worker', choices=['inference', 'training'], help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.worker:
+        metrics, info = (run_inference if args.worker == 'inference' else run_training)(args)
+        print(json.dumps({'metrics': metrics, 'info': info}))
+        return 0
+
+    config = {
+        'data': f"synthetic:{args.synthetic}:seed={args.seed}" if args.synthetic else os.path.relpath(args.data_dir, REPO_ROOT),
+        'backend': args.backend,
+        'model': args.model,
+        'batch_sizes': args.batch_sizes,
+        'epochs': None if args.skip_training else args.epochs,
+        'train_batch_size': args.train_batch_size,
+        'gpu': args.gpu,
+    }
+    results = {'config': config, 'metrics': {}, 'info': {
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'cpus': os.cpu_count(),
+        'timestamp': time.strftime('%Y-%m-%dT%H:%M:%S'),
+    }}
+
+    with tempfile.TemporaryDirectory() as directory:
+        data_dir = args.data_dir
+        if args.synthetic:
+            data_dir = make_synthetic_dataset(os.path.join(directory, 'synthetic'), args.synthetic, seed=args.seed)
+        stages = ['inference'] + ([] if args.skip_training else ['training'])
+        for stage in stages:
+            metrics, info = run_stage(stage, args, data_dir)
+            results['metrics'].update(metrics)
+            results['info'].update(info)
+
+    with open(args.output, 'w') as f:
+        json.dump(results, f, indent=2)
+
+    if args.save_baseline:
+        with open(args.baseline, 'w') as f:
+            json.dump(results, f, indent=2)
+        print_report(results)
+        print(f"\nBaseline written to {args.baseline}")
+        return 0
+
+    if not os.path.exists(args.baseline):
+        print_report(results)
+        print(f"\nNo baseline at {args.baseline}; record one with --save-baseline")
+        return 0
+
+    with open(args.baseline) as f:
+        baseline = json.load(f)
+    if baseline.get('config') != config:
+        print(f"Baseline settings {baseline.get('config')} don't match this run's {config}", file=sys.stderr)
+        return 2
+
+    rows, regressions = compare(results, baseline, args.threshold, parse_overrides(args.metric_threshold))
+    print_report(results, rows)
+    if regressions:
+        print(f"\n{len(regressions)} metric(s) regressed by more than the threshold: {', '.join(regressions)}")
+        return 1
+    print("\nNo regressions")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
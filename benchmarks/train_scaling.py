@@ -0,0 +1,78 @@
+"""
+Training throughput scaling with the number of local workers.
+
+Runs a short multi-worker training for each worker count and reports
+samples/sec and scaling efficiency relative to one worker
+(throughput_N / (N * throughput_1)). The first epoch is excluded as warm-up.
+
+    python benchmarks/train_scaling.py --workers 1 2 4 8 16 --epochs 3
+"""
+
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+
+from common import REPO_ROOT
+
+TRAIN_SCRIPT = os.path.join(REPO_ROOT, 'model', 'train_simple.py')
+
+
+def run(num_workers, args, directory):
+    log_path = os.path.join(directory, f"throughput_{num_workers}.json")
+    command = [
+        sys.executable, TRAIN_SCRIPT,
+        '--data-dir', args.data_dir, '--epochs', str(args.epochs),
+        '--batch-size', str(args.batch_size), '--workers', str(num_workers),
+        '--save-path', os.path.join(directory, f"model_{num_workers}.h5"),
+        '--throughput-log', log_path,
+    ]
+    if args.shards:
+        command += ['--shards', args.shards]
+    subprocess.run(command, check=True, stdout=subprocess.DEVNULL if args.quiet else None)
+
+    with open(log_path) as f:
+        log = json.load(f)
+    epochs = log['epochs'][1:] or log['epochs']
+    return {
+        'workers': num_workers,
+        'global_batch_size': log['global_batch_size'],
+        'samples_per_sec': sum(e['samples_per_sec'] for e in epochs) / len(epochs),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Measure multi-worker training scaling")
+    parser.add_argument('--workers', type=int, nargs='+', default=[1, 2, 4, 8])
+    parser.add_argument('--data-dir', default=os.path.join(REPO_ROOT, 'dataset'))
+    parser.add_argument('--shards', default=None, help="Train from TFRecord shards in this directory")
+    parser.add_argument('--epochs', type=int, default=3)
+    parser.add_argument('--batch-size', type=int, default=8, help="Per-worker batch size")
+    parser.add_argument('--quiet', action='store_true', help="Hide training output")
+    parser.add_argument('--output', help="Write results as JSON")
+    args = parser.parse_args()
+
+    # Early stopping can't trigger in a few epochs, so every run does the same work
+    results = []
+    with tempfile.TemporaryDirectory() as directory:
+        for num_workers in sorted(set(args.workers)):
+            results.append(run(num_workers, args, directory))
+
+    baseline = next((r for r in results if r['workers'] == 1), results[0])
+    per_worker = baseline['samples_per_sec'] / baseline['workers']
+    print(f"\n{'workers':>8}{'batch':>7}{'samples/s':>11}{'speedup':>9}{'efficiency':>12}")
+    for r in results:
+        r['speedup'] = r['samples_per_sec'] / baseline['samples_per_sec']
+        r['efficiency'] = r['samples_per_sec'] / (r['workers'] * per_worker)
+        print(f"{r['workers']:>8}{r['global_batch_size']:>7}{r['samples_per_sec']:>11.1f}"
+              f"{r['speedup']:>9.2f}{r['efficiency']:>12.1%}")
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,259 @@
+"""
+Headless batch classifier.
+
+Classifies every image in a set of directories, globs or files and streams
+label + confidence to a CSV or JSONL file. Images are decoded on a thread
+pool while the previous batch is running through the model, and an
+interrupted run resumes from whatever is already in the output file.
+
+Usage:
+    python classify_batch.py dataset/ -o results.csv
+    python classify_batch.py "photos/*.jpg" -o results.jsonl --batch-size 64
+"""
+
+import argparse
+import csv
+import glob
+import json
+import os
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+
+import numpy as np
+
+from inference import BACKENDS, CLASS_NAMES_PATH, predict_batch, top_predictions
+import metrics
+from metrics import METRICS
+from model_registry import MODELS_DIR, load_version
+from prediction_cache import PredictionCache, image_key
+from preprocessing import IMAGE_EXTENSIONS, MODEL_INPUT_SIZE, preprocess_bytes
+
+CSV_FIELDS = ['path', 'label', 'confidence', 'error']
+
+
+def collect_image_paths(inputs):
+    """Expand directories, globs and file names into a sorted, unique list"""
+    paths = []
+    for item in inputs:
+        if os.path.isdir(item):
+            for dirpath, _, filenames in os.walk(item):
+                for name in filenames:
+                    if name.lower().endswith(IMAGE_EXTENSIONS):
+                        paths.append(os.path.join(dirpath, name))
+        elif os.path.isfile(item):
+            paths.append(item)
+        else:
+            paths.extend(p for p in glob.glob(item, recursive=True) if os.path.isfile(p))
+
+    return sorted(set(os.path.normpath(p) for p in paths))
+
+
+def output_format(output_path, fmt=None):
+    """Pick csv or jsonl from the explicit flag or the file extension"""
+    if fmt:
+        return fmt
+    return 'jsonl' if output_path.lower().endswith(('.jsonl', '.json')) else 'csv'
+
+
+def read_completed(output_path, fmt):
+    """
+    Return the set of paths already present in the output file.
+    A partially written trailing line (from a crash) is truncated away
+    so new rows can be appended cleanly.
+    """
+    if not os.path.exists(output_path):
+        return set()
+
+    with open(output_path, 'rb+') as f:
+        data = f.read()
+        end = data.rfind(b'\n') + 1
+        if end != len(data):
+            f.truncate(end)
+
+    completed = set()
+    with open(output_path, 'r', newline='', encoding='utf-8') as f:
+        if fmt == 'csv':
+            for row in csv.DictReader(f):
+                completed.add(row['path'])
+        else:
+            for line in f:
+                try:
+                    completed.add(json.loads(line)['path'])
+                except (ValueError, KeyError):
+                    continue
+    return completed
+
+
+class ResultWriter:
+    """Append-only CSV/JSONL writer that flushes after every batch"""
+
+    def __init__(self, output_path, fmt, fields=CSV_FIELDS):
+        self.fmt = fmt
+        is_new = not os.path.exists(output_path) or os.path.getsize(output_path) == 0
+        self.file = open(output_path, 'a', newline='', encoding='utf-8')
+        if fmt == 'csv':
+            self.writer = csv.DictWriter(self.file, fieldnames=fields)
+            if is_new:
+                self.writer.writeheader()
+
+    def write(self, rows):
+        for row in rows:
+            if self.fmt == 'csv':
+                self.writer.writerow(row)
+            else:
+                self.file.write(json.dumps(row) + '\n')
+        self.file.flush()
+        os.fsync(self.file.fileno())
+
+    def close(self):
+        self.file.close()
+
+
+def _decode(path, cache=None, size=MODEL_INPUT_SIZE):
+    """
+    Read and decode one image, returning (path, key, array, cached, error).
+    On a cache hit the image is not decoded and `cached` holds the
+    probabilities.
+    """
+    try:
+        with METRICS.timer('file_read'):
+            with open(path, 'rb') as f:
+                data = f.read()
+        key = image_key(data) if cache is not None else None
+        if key is not None:
+            cached = cache.get(key)
+            if cached is not None:
+                return path, key, None, cached, None
+        return path, key, preprocess_bytes(data, size), None, None
+    except Exception as e:
+        return path, None, None, None, str(e)
+
+
+def iter_decoded_batches(paths, batch_size, executor, prefetch_batches=2, cache=None,
+                         size=MODEL_INPUT_SIZE):
+    """
+    Yield lists of decoded images, keeping up to `prefetch_batches` batches
+    of decode work queued on the executor ahead of the consumer.
+    """
+    decode = partial(_decode, cache=cache, size=size)
+    chunks = [paths[i:i + batch_size] for i in range(0, len(paths), batch_size)]
+    pending = []
+    for chunk in chunks:
+        pending.append([executor.submit(decode, p) for p in chunk])
+        if len(pending) > prefetch_batches:
+            yield [future.result() for future in pending.pop(0)]
+    for futures in pending:
+        yield [future.result() for future in futures]
+
+
+def classify_paths(model, class_names, paths, writer, batch_size=32, workers=None, cache=None):
+    """Classify paths batch by batch, streaming rows to the writer"""
+    workers = workers or min(32, (os.cpu_count() or 1) + 4)
+    done = 0
+    start = time.perf_counter()
+
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        for decoded in iter_decoded_batches(paths, batch_size, executor, cache=cache, size=model.input_size):
+            rows = []
+            results = {}
+
+            hits = [(path, cached) for path, _, _, cached, _ in decoded if cached is not None]
+            if hits:
+                predictions = np.stack([cached for _, cached in hits])
+                results.update(zip(
+                    (path for path, _ in hits),
+                    top_predictions(predictions, class_names)
+                ))
+
+            misses = [(path, key, array) for path, key, array, _, _ in decoded if array is not None]
+            if misses:
+                batch = np.stack([array for _, _, array in misses])
+                predictions = predict_batch(model, batch)
+                results.update(zip(
+                    (path for path, _, _ in misses),
+                    top_predictions(predictions, class_names)
+                ))
+                if cache is not None:
+                    cache.put_many(zip((key for _, key, _ in misses), predictions))
+
+            for path, _, _, _, error in decoded:
+                if error is None:
+                    label, confidence = results[path]
+                    rows.append({'path': path, 'label': label,
+                                 'confidence': round(confidence, 6), 'error': ''})
+                else:
+                    rows.append({'path': path, 'label': '', 'confidence': '', 'error': error})
+
+            writer.write(rows)
+            done += len(rows)
+            elapsed = time.perf_counter() - start
+            print(f"\r  {done}/{len(paths)} images ({done / elapsed:.1f} img/s)", end='', file=sys.stderr)
+
+    print(file=sys.stderr)
+    return done
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Classify a batch of waste images without the GUI")
+    parser.add_argument('inputs', nargs='+', help="Image files, directories or glob patterns")
+    parser.add_argument('-o', '--output', required=True, help="Output .csv or .jsonl file")
+    parser.add_argument('--format', choices=['csv', 'jsonl'], help="Override the output format")
+    parser.add_argument('--batch-size', type=int, default=32, help="Images per predict call")
+    parser.add_argument('--workers', type=int, default=None, help="Image decode threads")
+    parser.add_argument('--model', default=None,
+                        help="Path to a trained Keras model (default: the published version in --models-dir)")
+    parser.add_argument('--backend', choices=BACKENDS, default='keras', help="Inference backend")
+    parser.add_argument('--class-names', default=CLASS_NAMES_PATH, help="Path to class_names.txt for --model")
+    parser.add_argument('--models-dir', default=MODELS_DIR, help="Directory of published model versions")
+    parser.add_argument('--cascade', action='store_true',
+                        help="Run the fast first-stage model and use the full model only when it is unsure")
+    parser.add_argument('--no-resume', action='store_true', help="Overwrite the output instead of resuming")
+    parser.add_argument('--cache-db', default=None,
+                        help="SQLite prediction cache shared across runs (keyed by image bytes + model)")
+    parser.add_argument('--cache-size', type=int, default=4096, help="In-memory cache entries")
+    metrics.add_arguments(parser)
+    args = parser.parse_args(argv)
+    exporter = metrics.configure(args)
+
+    fmt = output_format(args.output, args.format)
+    paths = collect_image_paths(args.inputs)
+    if not paths:
+        print("No images found.", file=sys.stderr)
+        return 1
+
+    if args.no_resume and os.path.exists(args.output):
+        os.remove(args.output)
+    completed = read_completed(args.output, fmt)
+    todo = [p for p in paths if p not in completed]
+    print(f"Found {len(paths)} images, {len(completed)} already classified, {len(todo)} to go.", file=sys.stderr)
+    if not todo:
+        return 0
+
+    # A batch run is short-lived: it uses whichever version is current at start
+    loaded = load_version(args.backend, args.models_dir, model_path=args.model,
+                          class_names_path=args.class_names, cascade=args.cascade)
+    print(f"Using model {loaded.version or loaded.backend.model_path}", file=sys.stderr)
+
+    cache = None
+    if args.cache_db:
+        cache = PredictionCache(loaded.fingerprint, args.cache_size, args.cache_db)
+
+    writer = ResultWriter(args.output, fmt)
+    try:
+        classify_paths(loaded.backend, loaded.class_names, todo, writer, args.batch_size, args.workers, cache)
+    finally:
+        writer.close()
+        if args.cascade:
+            print(f"Cascade: {loaded.backend.stats()}", file=sys.stderr)
+        if cache is not None:
+            print(f"Prediction cache: {cache.stats()}", file=sys.stderr)
+            cache.close()
+        if exporter is not None:
+            exporter.stop()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
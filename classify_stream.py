@@ -0,0 +1,253 @@
+"""
+Video and camera-stream classifier.
+
+Reads a video file, a camera index or a stream URL with OpenCV, samples
+frames and classifies only the ones that show a changed scene: each sampled
+frame gets a 64-bit difference hash (dHash), and frames within
+--dedup-distance bits of the last classified frame are skipped.
+
+Decode, preprocessing and inference run as overlapping pipeline stages:
+
+    reader thread   -> grabs and hashes frames, drops near-duplicates
+    preprocess pool -> converts and resizes kept frames (order preserved)
+    main thread     -> batches ready frames through the model, writes the log
+
+Each classified frame is appended to a timestamped CSV or JSONL log. Files
+are read in full; for live sources the reader never waits on the model and
+drops frames instead, so results don't fall behind real time.
+
+    python classify_stream.py conveyor.mp4 -o conveyor.jsonl --every 2
+    python classify_stream.py 0 -o camera.csv                # first camera
+    python classify_stream.py rtsp://10.0.0.5/stream -o belt.jsonl
+"""
+
+import argparse
+import queue
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+from PIL import Image
+
+import metrics
+from classify_batch import ResultWriter, output_format
+from inference import BACKENDS, CLASS_NAMES_PATH, predict_batch, top_predictions
+from metrics import METRICS
+from model_registry import MODELS_DIR, load_version
+from preprocessing import preprocess_image
+
+LOG_FIELDS = ['frame', 'timestamp_ms', 'wall_time', 'label', 'confidence']
+
+_END = object()
+
+
+def dhash(frame, hash_size=8):
+    """64-bit difference hash of a BGR frame: sign of horizontal gradients on a 9x8 thumbnail"""
+    import cv2
+
+    gray = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
+    small = cv2.resize(gray, (hash_size + 1, hash_size), interpolation=cv2.INTER_AREA)
+    bits = (small[:, 1:] > small[:, :-1]).flatten()
+    return int.from_bytes(np.packbits(bits).tobytes(), 'big')
+
+
+def hamming(a, b):
+    return bin(a ^ b).count('1')
+
+
+def open_source(source):
+    """Return (capture, live). Digits select a camera; URLs and cameras are live."""
+    import cv2
+
+    live = source.isdigit() or '://' in source
+    capture = cv2.VideoCapture(int(source) if source.isdigit() else source)
+    if not capture.isOpened():
+        raise SystemExit(f"Could not open video source '{source}'")
+    return capture, live
+
+
+class StreamStats:
+    """Frame counters shared by the pipeline stages"""
+
+    def __init__(self):
+        self.read = 0
+        self.sampled = 0
+        self.duplicates = 0
+        self.dropped = 0
+        self.classified = 0
+        self.start = time.perf_counter()
+
+    def summary(self):
+        elapsed = time.perf_counter() - self.start
+        return {
+            'frames_read': self.read,
+            'frames_sampled': self.sampled,
+            'frames_classified': self.classified,
+            'duplicates_skipped': self.duplicates,
+            'dropped_live': self.dropped,
+            'skipped_fraction': (self.sampled - self.classified) / self.sampled if self.sampled else 0.0,
+            'effective_fps': self.read / elapsed if elapsed else 0.0,
+            'seconds': elapsed,
+        }
+
+
+def preprocess_frame(frame, size):
+    """BGR frame -> model array, through the same resize as every other entry point"""
+    with METRICS.timer('decode'):
+        image = Image.fromarray(frame[:, :, ::-1])
+    return preprocess_image(image, size)
+
+
+def read_frames(capture, live, stats, out_queue, executor, size, every=1, dedup_distance=4, stop=None):
+    """
+    Reader stage: sample every `every`-th frame, skip near-duplicates and
+    queue (frame, timestamp_ms, wall_time, future) for the inference stage.
+    """
+    import cv2
+
+    last_hash = None
+    try:
+        while stop is None or not stop.is_set():
+            with METRICS.timer('file_read'):
+                ok = capture.grab()
+            if not ok:
+                break
+            index = stats.read
+            stats.read += 1
+            if index % every:
+                continue
+            ok, frame = capture.retrieve()
+            if not ok:
+                break
+            stats.sampled += 1
+
+            frame_hash = dhash(frame)
+            if last_hash is not None and hamming(frame_hash, last_hash) <= dedup_distance:
+                stats.duplicates += 1
+                continue
+
+            item = (index, capture.get(cv2.CAP_PROP_POS_MSEC), time.time(),
+                    executor.submit(preprocess_frame, frame, size))
+            if live:
+                try:
+                    out_queue.put_nowait(item)
+                except queue.Full:
+                    # Model is behind: drop this frame, and compare later ones against it again
+                    stats.dropped += 1
+                    continue
+            else:
+                out_queue.put(item)
+            last_hash = frame_hash
+    finally:
+        out_queue.put(_END)
+
+
+def classify_stream(model, class_names, capture, live, writer, batch_size=8, every=1,
+                    dedup_distance=4, workers=2, queue_size=32, stop=None):
+    """
+    Run the pipeline until the source ends or `stop` is set; returns
+    StreamStats. The reader thread has stopped touching `capture` by the
+    time this returns or raises, so the caller may release it.
+    """
+    stats = StreamStats()
+    frames = queue.Queue(maxsize=queue_size)
+    if stop is None:
+        stop = threading.Event()
+    with ThreadPoolExecutor(max_workers=workers, thread_name_prefix='preprocess') as executor:
+        reader = threading.Thread(
+            target=read_frames, name='frame-reader', daemon=True,
+            args=(capture, live, stats, frames, executor, model.input_size, every, dedup_distance, stop),
+        )
+        reader.start()
+
+        try:
+            done = False
+            while not done:
+                # Block for one frame, then take whatever else is already waiting
+                batch = [frames.get()]
+                while len(batch) < batch_size and batch[-1] is not _END:
+                    try:
+                        batch.append(frames.get_nowait())
+                    except queue.Empty:
+                        break
+                if batch[-1] is _END:
+                    batch.pop()
+                    done = True
+                if not batch:
+                    continue
+
+                images = np.stack([future.result() for *_, future in batch])
+                results = top_predictions(predict_batch(model, images), class_names)
+                writer.write([
+                    {'frame': index, 'timestamp_ms': round(timestamp_ms, 1),
+                     'wall_time': round(wall_time, 3), 'label': label, 'confidence': round(confidence, 6)}
+                    for (index, timestamp_ms, wall_time, _), (label, confidence) in zip(batch, results)
+                ])
+                stats.classified += len(batch)
+                summary = stats.summary()
+                print(f"\r  {stats.read} frames, {stats.classified} classified "
+                      f"({summary['skipped_fraction']:.0%} skipped, {summary['effective_fps']:.1f} fps)",
+                      end='', file=sys.stderr)
+        finally:
+            # Also on Ctrl+C or a failed batch: the reader may be blocked on a
+            # full queue, so keep draining it until the thread has exited
+            stop.set()
+            while reader.is_alive():
+                try:
+                    frames.get_nowait()
+                except queue.Empty:
+                    reader.join(0.05)
+    print(file=sys.stderr)
+    return stats
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Classify frames from a video file or camera stream")
+    parser.add_argument('source', help="Video file, camera index (0, 1, ...) or stream URL")
+    parser.add_argument('-o', '--output', required=True, help="Classification log (.csv or .jsonl)")
+    parser.add_argument('--format', choices=['csv', 'jsonl'], help="Override the output format")
+    parser.add_argument('--every', type=int, default=1, help="Sample every Nth frame")
+    parser.add_argument('--dedup-distance', type=int, default=4,
+                        help="Skip frames whose dHash differs from the last classified frame by at most this many bits (-1 disables)")
+    parser.add_argument('--batch-size', type=int, default=8, help="Max frames per predict call")
+    parser.add_argument('--workers', type=int, default=2, help="Frame preprocessing threads")
+    parser.add_argument('--model', default=None,
+                        help="Path to a trained Keras model (default: the published version in --models-dir)")
+    parser.add_argument('--backend', choices=BACKENDS, default='keras', help="Inference backend")
+    parser.add_argument('--class-names', default=CLASS_NAMES_PATH, help="Path to class_names.txt for --model")
+    parser.add_argument('--models-dir', default=MODELS_DIR, help="Directory of published model versions")
+    parser.add_argument('--cascade', action='store_true',
+                        help="Run the fast first-stage model and use the full model only when it is unsure")
+    metrics.add_arguments(parser)
+    args = parser.parse_args(argv)
+    exporter = metrics.configure(args)
+
+    loaded = load_version(args.backend, args.models_dir, model_path=args.model,
+                          class_names_path=args.class_names, cascade=args.cascade)
+    print(f"Using model {loaded.version or loaded.backend.model_path}", file=sys.stderr)
+
+    capture, live = open_source(args.source)
+    writer = ResultWriter(args.output, output_format(args.output, args.format), LOG_FIELDS)
+    try:
+        stats = classify_stream(loaded.backend, loaded.class_names, capture, live, writer,
+                                args.batch_size, max(1, args.every), args.dedup_distance, args.workers)
+    except KeyboardInterrupt:
+        return 130
+    finally:
+        capture.release()
+        writer.close()
+        if exporter is not None:
+            exporter.stop()
+
+    summary = stats.summary()
+    dropped = f", {summary['dropped_live']} dropped" if summary['dropped_live'] else ''
+    print(f"{summary['frames_read']} frames read, {summary['frames_sampled']} sampled, "
+          f"{summary['frames_classified']} classified ({summary['skipped_fraction']:.1%} skipped{dropped}), "
+          f"{summary['effective_fps']:.1f} frames/sec", file=sys.stderr)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
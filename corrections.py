@@ -0,0 +1,103 @@
+"""
+Operator label corrections and the background head refit they trigger.
+
+When the GUI gets an image wrong, "Correct Label" records it here instead
+of someone copying files into dataset/ and retraining from scratch:
+
+    corrections/images/<content hash>.<ext>   copy of the corrected image
+    corrections/corrections.jsonl             one JSON record per correction
+    corrections/refit_state.json              how far model/refit_head.py got
+
+The log is append-only; an image corrected twice keeps its latest label.
+Once enough new corrections pile up, `start_refit` launches
+model/refit_head.py as a separate low-priority process. It refits only the
+classification head on cached backbone features and publishes a new model
+version only if validation accuracy holds, which running apps then pick
+up through their ModelWatcher. Nothing here runs on the Tk thread for
+longer than it takes to copy one file.
+"""
+
+import json
+import os
+import shutil
+import subprocess
+import sys
+import threading
+import time
+from model.artifacts import DATA_DIR, FEATURE_CACHE_DIR, MODELS_DIR, locate
+from model.refit_head import CORRECTIONS_FILE, read_state
+from prediction_cache import image_key
+
+DEFAULT_CORRECTIONS_DIR = 'corrections'
+IMAGES_DIR = 'images'
+REFIT_LOG = 'refit.log'
+
+REFIT_SCRIPT = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'model', 'refit_head.py')
+
+
+class CorrectionStore:
+    """Append-only log of corrected labels with content-addressed image copies"""
+
+    def __init__(self, directory=DEFAULT_CORRECTIONS_DIR):
+        self.directory = directory
+        self._lock = threading.Lock()
+
+    def add(self, path, label, predicted=None, model_version=None):
+        """Copy the image into the store and append a correction record"""
+        with open(path, 'rb') as f:
+            key = image_key(f.read())
+        image = f"{IMAGES_DIR}/{key}{os.path.splitext(path)[1].lower()}"
+        image_path = os.path.join(self.directory, image)
+        # Created on the first correction, not on every app start
+        os.makedirs(os.path.dirname(image_path), exist_ok=True)
+        if not os.path.exists(image_path):
+            tmp_path = f"{image_path}.tmp"
+            shutil.copyfile(path, tmp_path)
+            os.replace(tmp_path, image_path)
+
+        record = {
+            'time': time.strftime('%Y-%m-%dT%H:%M:%S'),
+            'image': image,
+            'label': label,
+            'predicted': predicted,
+            'source': os.path.abspath(path),
+            'model_version': model_version,
+        }
+        with self._lock, open(os.path.join(self.directory, CORRECTIONS_FILE), 'a', encoding='utf-8') as f:
+            f.write(json.dumps(record) + '\n')
+            f.flush()
+            os.fsync(f.fileno())
+        return record
+
+    def count(self):
+        try:
+            with open(os.path.join(self.directory, CORRECTIONS_FILE), encoding='utf-8') as f:
+                return sum(1 for line in f if line.strip())
+        except FileNotFoundError:
+            return 0
+
+    def pending(self):
+        """Corrections the refit job hasn't looked at yet"""
+        return self.count() - read_state(self.directory)['attempted']
+
+
+def start_refit(corrections_dir=DEFAULT_CORRECTIONS_DIR, models_dir=MODELS_DIR, data_dir=DATA_DIR,
+                cache_dir=FEATURE_CACHE_DIR, extra_args=()):
+    """
+    Launch model/refit_head.py in the background at low priority and return
+    the Popen. Its output goes to corrections/refit.log. The script lowers
+    its own niceness on POSIX; on Windows the process is started below
+    normal priority. Relative directories are resolved like the app
+    resolves models/ (see model_registry.locate) and passed on absolute, so
+    the refit works on the same files whatever its working directory.
+    """
+    corrections_dir, models_dir, data_dir, cache_dir = (
+        os.path.abspath(locate(path)) for path in (corrections_dir, models_dir, data_dir, cache_dir)
+    )
+    flags = getattr(subprocess, 'BELOW_NORMAL_PRIORITY_CLASS', 0)
+    with open(os.path.join(corrections_dir, REFIT_LOG), 'a') as log:
+        return subprocess.Popen(
+            [sys.executable, REFIT_SCRIPT, '--corrections-dir', corrections_dir, '--models-dir', models_dir,
+             '--data-dir', data_dir, '--cache-dir', cache_dir, *extra_args],
+            stdout=log, stderr=subprocess.STDOUT, creationflags=flags
+        )
@@ -0,0 +1,400 @@
+"""
+Nearest-neighbour classification over stored backbone embeddings.
+
+An alternative to retraining: the pooled MobileNetV2 embedding of every
+labelled image is kept in an append-only index, and new images are
+classified by their most similar stored examples (k-NN) or by similarity to
+each class centroid. Adding an example or a whole new category is an O(1)
+append that running processes pick up on their next query.
+
+On-disk layout of an index directory:
+
+    meta.json        dim, class names, row count, extractor input size/alpha
+    embeddings.f16   (count, dim) float16 rows, L2-normalized, memory-mapped
+    labels.i32       (count,) int32 class ids
+    ivf.npz          optional k-means IVF partition (see build_ivf)
+
+Rows are appended to the data files first and `count` in meta.json is
+replaced atomically afterwards, so readers never see a torn row. Writers
+hold an OS lock on index.lock and take the row count from meta.json on
+disk, so several processes can append to the same index.
+
+NumPy converts float16 to float32 slowly, so indexes below `dense_limit_mb`
+also keep a float32 working copy in memory. It lives in a buffer whose
+capacity doubles as it fills, so an append only converts and copies the new
+rows. Larger indexes are scanned straight from the memory map.
+
+Large reference sets can use an inverted-file index: k-means splits the
+rows into `n_lists` cells and a query only scans the `nprobe` cells whose
+centroids are closest. Rows appended after the IVF was built are scanned
+exhaustively until it is rebuilt.
+
+    python embedding_index.py build --data-dir dataset
+    python embedding_index.py add new_photos/*.jpg --label textiles
+    python embedding_index.py ivf --lists 256
+    python app.py --backend knn
+"""
+
+import argparse
+import contextlib
+import json
+import os
+import sys
+import threading
+import numpy as np
+
+INDEX_DIR = 'embedding_index'
+META_FILE = 'meta.json'
+EMBEDDINGS_FILE = 'embeddings.f16'
+LABELS_FILE = 'labels.i32'
+IVF_FILE = 'ivf.npz'
+LOCK_FILE = 'index.lock'
+
+# Similarity -> probability sharpness for k-NN votes and centroid scores
+TEMPERATURE = 0.05
+
+
+def _normalize(vectors):
+    vectors = np.asarray(vectors, dtype=np.float32)
+    norms = np.linalg.norm(vectors, axis=-1, keepdims=True)
+    return vectors / np.maximum(norms, 1e-12)
+
+
+def _softmax(scores):
+    scores = scores - scores.max(axis=-1, keepdims=True)
+    weights = np.exp(scores)
+    return weights / weights.sum(axis=-1, keepdims=True)
+
+
+def spherical_kmeans(vectors, n_lists, iterations=20, seed=123):
+    """k-means on unit vectors using cosine similarity; returns unit centroids"""
+    rng = np.random.default_rng(seed)
+    centroids = vectors[rng.choice(len(vectors), n_lists, replace=False)].astype(np.float32)
+    for _ in range(iterations):
+        assignment = np.argmax(vectors @ centroids.T, axis=1)
+        sums = np.zeros_like(centroids)
+        np.add.at(sums, assignment, vectors)
+        empty = ~sums.any(axis=1)
+        # Re-seed empty cells with random rows so every list stays in use
+        sums[empty] = vectors[rng.choice(len(vectors), int(empty.sum()), replace=False)]
+        centroids = _normalize(sums)
+    return centroids
+
+
+class EmbeddingIndex:
+    """Append-only, memory-mapped store of labelled embeddings"""
+
+    def __init__(self, directory=INDEX_DIR, dense_limit_mb=512):
+        self.directory = directory
+        self.dense_limit_mb = dense_limit_mb
+        self._lock = threading.Lock()
+        self._meta_mtime = None
+        self._matrix = None
+        self._dense = None
+        self._dense_buffer = None
+        self._labels = None
+        self._centroid_sums = None
+        self._ivf = None
+        # Bumped on every reload: predictions from an older generation are stale
+        self.generation = 0
+        self.refresh()
+
+    @classmethod
+    def create(cls, directory, dim, input_size=(224, 224), alpha=1.0):
+        """Start an empty index for embeddings of size `dim`"""
+        os.makedirs(directory, exist_ok=True)
+        for name in (EMBEDDINGS_FILE, LABELS_FILE):
+            open(os.path.join(directory, name), 'wb').close()
+        meta = {'dim': dim, 'count': 0, 'class_names': [],
+                'input_size': list(input_size), 'alpha': alpha}
+        cls._write_meta(directory, meta)
+        return cls(directory)
+
+    @staticmethod
+    def _write_meta(directory, meta):
+        tmp_path = os.path.join(directory, META_FILE + '.tmp')
+        with open(tmp_path, 'w') as f:
+            json.dump(meta, f, indent=2)
+        os.replace(tmp_path, os.path.join(directory, META_FILE))
+
+    def _path(self, name):
+        return os.path.join(self.directory, name)
+
+    @contextlib.contextmanager
+    def _write_lock(self):
+        """
+        Exclusive OS lock on index.lock for writers in any process. The OS
+        drops it when its process exits, so a crashed writer never blocks
+        the next one.
+        """
+        with self._lock, open(self._path(LOCK_FILE), 'a') as f:
+            if os.name == 'nt':
+                import msvcrt
+                f.seek(0)
+                msvcrt.locking(f.fileno(), msvcrt.LK_LOCK, 1)
+            else:
+                import fcntl
+                fcntl.flock(f.fileno(), fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                if os.name == 'nt':
+                    f.seek(0)
+                    msvcrt.locking(f.fileno(), msvcrt.LK_UNLCK, 1)
+
+    def _read_meta(self):
+        with open(self._path(META_FILE)) as f:
+            return json.load(f)
+
+    def refresh(self, force=False):
+        """Re-map the data files if another process appended rows"""
+        mtime = os.stat(self._path(META_FILE)).st_mtime_ns
+        if mtime == self._meta_mtime and not force:
+            return
+        with self._lock:
+            self.meta = self._read_meta()
+            count, dim = self.meta['count'], self.meta['dim']
+            if count:
+                self._matrix = np.memmap(self._path(EMBEDDINGS_FILE), dtype=np.float16, mode='r',
+                                         shape=(count, dim))
+                self._labels = np.memmap(self._path(LABELS_FILE), dtype=np.int32, mode='r', shape=(count,))
+            else:
+                self._matrix = np.zeros((0, dim), dtype=np.float16)
+                self._labels = np.zeros(0, dtype=np.int32)
+            self._refresh_dense()
+            self._centroid_sums = None
+            self._ivf = None
+            if os.path.exists(self._path(IVF_FILE)):
+                with np.load(self._path(IVF_FILE)) as ivf:
+                    self._ivf = {name: ivf[name] for name in ivf.files}
+            self._meta_mtime = mtime
+            self.generation += 1
+
+    def _refresh_dense(self):
+        count, dim = self._matrix.shape
+        if count * dim * 4 > self.dense_limit_mb * 1e6:
+            self._dense = self._dense_buffer = None
+            return
+        buffer = self._dense_buffer
+        filled = len(self._dense) if self._dense is not None else 0
+        if buffer is None or filled > count or buffer.shape[1] != dim:
+            buffer, filled = None, 0
+        if buffer is None or count > len(buffer):
+            # Doubling keeps the copying amortized O(1) per appended row
+            limit_rows = int(self.dense_limit_mb * 1e6 // (dim * 4))
+            capacity = max(count, min(2 * len(buffer) if buffer is not None else 1024, limit_rows))
+            grown = np.empty((capacity, dim), dtype=np.float32)
+            if buffer is not None:
+                grown[:filled] = buffer[:filled]
+            buffer = grown
+        # Rows are append-only: only convert the new tail
+        buffer[filled:count] = self._matrix[filled:count]
+        self._dense_buffer = buffer
+        self._dense = buffer[:count]
+
+    def _rows(self, selection):
+        """float32 rows for a slice or sorted row ids"""
+        if self._dense is not None:
+            return self._dense[selection]
+        return np.asarray(self._matrix[selection], dtype=np.float32)
+
+    @property
+    def class_names(self):
+        return self.meta['class_names']
+
+    @property
+    def input_size(self):
+        return tuple(self.meta['input_size'])
+
+    def __len__(self):
+        return self.meta['count']
+
+    def add(self, embeddings, labels):
+        """
+        Append embeddings with their class names. Cost depends only on the
+        number of new rows, not on the size of the index. Safe to call from
+        several processes at once.
+        """
+        embeddings = _normalize(np.atleast_2d(embeddings)).astype(np.float16)
+        if embeddings.shape[1] != self.meta['dim']:
+            raise ValueError(f"Expected {self.meta['dim']}-d embeddings, got {embeddings.shape[1]}-d")
+
+        with self._write_lock():
+            # Another process may have appended since our last refresh
+            meta = self._read_meta()
+            ids = []
+            for label in labels:
+                if label not in meta['class_names']:
+                    meta['class_names'].append(label)
+                ids.append(meta['class_names'].index(label))
+
+            # Data first, then the row count: a crash leaves at most an ignored tail
+            for name, data in ((EMBEDDINGS_FILE, embeddings), (LABELS_FILE, np.asarray(ids, dtype=np.int32))):
+                with open(self._path(name), 'r+b') as f:
+                    f.seek(meta['count'] * data.itemsize * (data.shape[1] if data.ndim == 2 else 1))
+                    f.write(data.tobytes())
+                    f.truncate()
+                    f.flush()
+                    os.fsync(f.fileno())
+            meta['count'] += len(embeddings)
+            self._write_meta(self.directory, meta)
+        # Forced: a coarse filesystem clock may not have moved since the last write
+        self.refresh(force=True)
+
+    def _class_centroids(self):
+        """Unit class centroids, from per-class sums computed once per refresh"""
+        if self._centroid_sums is None:
+            sums = np.zeros((len(self.class_names), self.meta['dim']), dtype=np.float32)
+            for start in range(0, len(self), 65536):
+                block = self._rows(slice(start, start + 65536))
+                np.add.at(sums, self._labels[start:start + 65536], block)
+            self._centroid_sums = sums
+        return _normalize(self._centroid_sums)
+
+    def _exact_topk(self, queries, k, block_size=65536):
+        """Top-k (similarity, row) over all rows, scanning the matrix in blocks"""
+        best_sims = np.full((len(queries), 0), -np.inf, dtype=np.float32)
+        best_rows = np.zeros((len(queries), 0), dtype=np.int64)
+        for start in range(0, len(self), block_size):
+            block = self._rows(slice(start, start + block_size))
+            sims = np.concatenate([best_sims, queries @ block.T], axis=1)
+            rows = np.concatenate([best_rows, np.broadcast_to(
+                np.arange(start, start + len(block)), (len(queries), len(block))
+            )], axis=1)
+            keep = np.argpartition(-sims, min(k, sims.shape[1]) - 1, axis=1)[:, :k]
+            best_sims = np.take_along_axis(sims, keep, axis=1)
+            best_rows = np.take_along_axis(rows, keep, axis=1)
+        return best_sims, best_rows
+
+    def _ivf_topk(self, queries, k, nprobe):
+        """Top-k over the `nprobe` nearest IVF cells plus rows added since the build"""
+        ivf = self._ivf
+        cells = np.argsort(-(queries @ ivf['centroids'].T), axis=1)[:, :nprobe]
+        tail = np.arange(int(ivf['count']), len(self))
+        sims_out = np.full((len(queries), k), -np.inf, dtype=np.float32)
+        rows_out = np.zeros((len(queries), k), dtype=np.int64)
+        for i, query in enumerate(queries):
+            candidates = np.concatenate(
+                [ivf['order'][ivf['offsets'][c]:ivf['offsets'][c + 1]] for c in cells[i]] + [tail]
+            )
+            if not len(candidates):
+                continue
+            candidates.sort()  # sequential reads from the memory map
+            sims = self._rows(candidates) @ query
+            top = np.argpartition(-sims, min(k, len(sims)) - 1)[:k]
+            sims_out[i, :len(top)] = sims[top]
+            rows_out[i, :len(top)] = candidates[top]
+        return sims_out, rows_out
+
+    def search(self, embeddings, k=5, nprobe=8):
+        """
+        Return (similarities, rows) of the k most similar stored embeddings,
+        using the IVF partition if one has been built.
+        """
+        self.refresh()
+        queries = _normalize(np.atleast_2d(embeddings))
+        if self._ivf is not None:
+            return self._ivf_topk(queries, k, nprobe)
+        return self._exact_topk(queries, k)
+
+    def classify(self, embeddings, k=5, method='knn', nprobe=8):
+        """Return (N, num_classes) probabilities by k-NN vote or centroid similarity"""
+        self.refresh()
+        if not len(self):
+            raise ValueError(f"Embedding index '{self.directory}' is empty")
+        queries = _normalize(np.atleast_2d(embeddings))
+        num_classes = len(self.class_names)
+
+        if method == 'centroid':
+            return _softmax(queries @ self._class_centroids().T / TEMPERATURE)
+
+        sims, rows = self.search(queries, k, nprobe)
+        weights = np.where(np.isfinite(sims), np.exp((sims - sims.max(axis=1, keepdims=True)) / TEMPERATURE), 0)
+        probabilities = np.zeros((len(queries), num_classes), dtype=np.float32)
+        np.add.at(probabilities, (np.arange(len(queries))[:, None], self._labels[rows]), weights)
+        return probabilities / np.maximum(probabilities.sum(axis=1, keepdims=True), 1e-12)
+
+    def build_ivf(self, n_lists=256, iterations=20, sample_size=100_000, seed=123):
+        """Partition the current rows with k-means and save the inverted lists"""
+        self.refresh()
+        count = len(self)
+        n_lists = min(n_lists, count)
+        rng = np.random.default_rng(seed)
+        sample_rows = np.sort(rng.choice(count, min(sample_size, count), replace=False))
+        centroids = spherical_kmeans(self._rows(sample_rows), n_lists, iterations, seed)
+
+        assignment = np.empty(count, dtype=np.int32)
+        for start in range(0, count, 65536):
+            block = self._rows(slice(start, start + 65536))
+            assignment[start:start + len(block)] = np.argmax(block @ centroids.T, axis=1)
+        order = np.argsort(assignment, kind='stable')
+        offsets = np.concatenate([[0], np.cumsum(np.bincount(assignment, minlength=n_lists))])
+
+        tmp_path = self._path(IVF_FILE + '.tmp.npz')
+        np.savez(tmp_path, centroids=centroids, order=order, offsets=offsets, count=count)
+        os.replace(tmp_path, self._path(IVF_FILE))
+        # Touch meta so running readers pick the new partition up
+        with self._write_lock():
+            self._write_meta(self.directory, self._read_meta())
+        self.refresh(force=True)
+        return n_lists
+
+
+def _embed_paths(extractor, paths, batch_size=32):
+    from preprocessing import load_and_preprocess
+
+    for start in range(0, len(paths), batch_size):
+        chunk = paths[start:start + batch_size]
+        yield chunk, extractor.embed(np.stack([load_and_preprocess(p, extractor.input_size) for p in chunk]))
+
+
+def main(argv=None):
+    from inference import EmbeddingExtractor
+
+    parser = argparse.ArgumentParser(description="Manage the embedding nearest-neighbour index")
+    parser.add_argument('--index', default=INDEX_DIR, help="Index directory")
+    commands = parser.add_subparsers(dest='command', required=True)
+
+    build = commands.add_parser('build', help="Create the index from a dataset/<class>/ tree")
+    build.add_argument('--data-dir', default='dataset')
+    build.add_argument('--input-size', type=int, default=224)
+    build.add_argument('--alpha', type=float, default=1.0)
+
+    add = commands.add_parser('add', help="Append labelled images without retraining")
+    add.add_argument('images', nargs='+')
+    add.add_argument('--label', required=True)
+
+    ivf = commands.add_parser('ivf', help="Build an approximate k-means IVF index")
+    ivf.add_argument('--lists', type=int, default=256)
+    ivf.add_argument('--iterations', type=int, default=20)
+
+    args = parser.parse_args(argv)
+
+    if args.command == 'build':
+        from model.dataset_files import list_image_files
+
+        paths, labels, class_names = list_image_files(args.data_dir)
+        extractor = EmbeddingExtractor((args.input_size, args.input_size), args.alpha)
+        index = EmbeddingIndex.create(args.index, extractor.dim, extractor.input_size, args.alpha)
+        label_of = dict(zip(paths, (class_names[i] for i in labels)))
+        for chunk, embeddings in _embed_paths(extractor, paths):
+            index.add(embeddings, [label_of[p] for p in chunk])
+            print(f"\r  {len(index)}/{len(paths)} images", end='', file=sys.stderr)
+        print(f"\nIndexed {len(index)} images in {len(index.class_names)} classes", file=sys.stderr)
+
+    elif args.command == 'add':
+        index = EmbeddingIndex(args.index)
+        extractor = EmbeddingExtractor(index.input_size, index.meta['alpha'])
+        for chunk, embeddings in _embed_paths(extractor, args.images):
+            index.add(embeddings, [args.label] * len(chunk))
+        print(f"Added {len(args.images)} '{args.label}' images; index holds {len(index)}", file=sys.stderr)
+
+    elif args.command == 'ivf':
+        index = EmbeddingIndex(args.index)
+        n_lists = index.build_ivf(args.lists, args.iterations)
+        print(f"Built IVF with {n_lists} lists over {len(index)} rows", file=sys.stderr)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
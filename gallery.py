@@ -0,0 +1,361 @@
+"""
+Gallery mode for the GUI: classify a whole bin's worth of photos at once.
+
+GalleryWindow opens next to the main window and takes multiple files or a
+folder. Work happens off the Tk thread:
+
+    loader pool          -> thumbnail (from ThumbnailCache, else decoded)
+                            and model input from one reduced-scale decode
+    BatchInferenceWorker -> batches queued images through the live model
+    Tk loop              -> polls both with after() and fills in the grid
+
+The grid is virtualized: it is one Canvas whose scroll region covers every
+row, but only the rows in view are drawn, on a small pool of canvas items
+that is re-bound to other images as the view scrolls. Thousands of images
+cost one PhotoImage per visible cell, not a widget per image.
+"""
+
+import hashlib
+import io
+import math
+import os
+import queue
+import tkinter as tk
+from concurrent.futures import ThreadPoolExecutor
+from tkinter import filedialog
+from PIL import Image, ImageTk
+from inference import top_predictions
+from inference_worker import BatchInferenceWorker, Prediction
+from prediction_cache import image_key
+from preprocessing import IMAGE_EXTENSIONS, decode_image
+
+DEFAULT_THUMBNAIL_DIR = '.thumbnail_cache'
+THUMBNAIL_SIZE = (160, 160)
+CELL_WIDTH = 184
+CELL_HEIGHT = 224
+
+
+def gallery_files(paths):
+    """Expand folders (recursively) into sorted image files; files are kept as given"""
+    files = []
+    for path in paths:
+        if os.path.isdir(path):
+            found = []
+            for dirpath, _, filenames in os.walk(path):
+                found.extend(os.path.join(dirpath, name) for name in filenames
+                             if name.lower().endswith(IMAGE_EXTENSIONS))
+            files.extend(sorted(found))
+        else:
+            files.append(path)
+    return files
+
+
+class ThumbnailCache:
+    """On-disk JPEG thumbnails keyed by absolute path, mtime and thumbnail size"""
+
+    def __init__(self, cache_dir=DEFAULT_THUMBNAIL_DIR, size=THUMBNAIL_SIZE):
+        self.cache_dir = cache_dir
+        self.size = size
+
+    def _entry_path(self, path):
+        mtime_ns = os.stat(path).st_mtime_ns
+        key = hashlib.sha1(f"{os.path.abspath(path)}|{mtime_ns}|{self.size}".encode()).hexdigest()
+        return os.path.join(self.cache_dir, key[:2], f"{key}.jpg")
+
+    def get(self, path):
+        try:
+            with Image.open(self._entry_path(path)) as image:
+                image.load()
+                return image
+        except OSError:
+            return None
+
+    def put(self, path, image):
+        entry_path = self._entry_path(path)
+        os.makedirs(os.path.dirname(entry_path), exist_ok=True)
+        # Write then rename so a concurrent reader never sees a partial file
+        tmp_path = f"{entry_path}.{os.getpid()}.tmp"
+        image.convert('RGB').save(tmp_path, 'JPEG', quality=85)
+        os.replace(tmp_path, entry_path)
+
+
+class GalleryItem:
+    """One image in the grid; filled in as its thumbnail and result arrive"""
+
+    def __init__(self, path):
+        self.path = path
+        self.thumbnail = None
+        self.label = None
+        self.confidence = None
+        self.error = None
+
+
+class GalleryWindow:
+    def __init__(self, app, thumbnail_dir=DEFAULT_THUMBNAIL_DIR, loaders=4, batch_size=16):
+        self.app = app
+        self.handle = app.handle
+        self.cache = app.worker.cache
+        self.thumbnails = ThumbnailCache(thumbnail_dir)
+        self.worker = BatchInferenceWorker(self.handle, self.cache, batch_size)
+        self.loader = ThreadPoolExecutor(max_workers=loaders, thread_name_prefix='gallery-loader')
+        self._loaded = queue.Queue()
+
+        self.items = []
+        self.generation = 0
+        self.classified = 0
+        self._photos = {}
+        self._cells = []
+        self._render_pending = False
+        self._closed = False
+
+        self.window = tk.Toplevel(app.root)
+        self.window.title("Gallery • AI Waste Classifier")
+        self.window.geometry("1100x800")
+        self.window.configure(bg='#1a1a2e')
+        self.window.protocol("WM_DELETE_WINDOW", self.close)
+        self.setup_ui()
+        self.window.after(50, self.poll)
+
+    def setup_ui(self):
+        toolbar = tk.Frame(self.window, bg='#16213e')
+        toolbar.pack(fill=tk.X)
+
+        for text, command, bg, active in (
+            ("📁  Add Images", self.add_files, '#0077b6', '#005f8f'),
+            ("🗂️  Add Folder", self.add_folder, '#0077b6', '#005f8f'),
+            ("🗑️  Clear", self.clear, '#e63946', '#c92a35'),
+        ):
+            tk.Button(
+                toolbar, text=text, command=command, font=('Segoe UI', 11, 'bold'),
+                bg=bg, fg='white', activebackground=active, activeforeground='white',
+                padx=16, pady=8, cursor='hand2', relief=tk.FLAT, borderwidth=0
+            ).pack(side=tk.LEFT, padx=6, pady=8)
+
+        self.status_label = tk.Label(
+            toolbar, text="Add images or a folder to classify",
+            font=('Segoe UI', 10), bg='#16213e', fg='#a8dadc'
+        )
+        self.status_label.pack(side=tk.RIGHT, padx=12)
+
+        container = tk.Frame(self.window, bg='#1a1a2e')
+        container.pack(fill=tk.BOTH, expand=True)
+        self.canvas = tk.Canvas(container, bg='#1a1a2e', highlightthickness=0)
+        scrollbar = tk.Scrollbar(container, orient="vertical", command=self.canvas.yview)
+
+        # Every scroll re-binds the cell pool to the rows now in view
+        def _on_scroll(first, last):
+            scrollbar.set(first, last)
+            self.schedule_render()
+
+        self.canvas.configure(yscrollcommand=_on_scroll, yscrollincrement=CELL_HEIGHT // 4)
+        self.canvas.pack(side="left", fill="both", expand=True)
+        scrollbar.pack(side="right", fill="y")
+
+        self.canvas.bind("<Configure>", lambda e: self.layout())
+        self.canvas.bind("<Double-Button-1>", self._on_double_click)
+        # "break" keeps the main window's bind_all wheel handler from scrolling it too
+        self.canvas.bind("<MouseWheel>", lambda e: self._scroll(int(-1 * (e.delta / 120))))
+        self.canvas.bind("<Button-4>", lambda e: self._scroll(-1))
+        self.canvas.bind("<Button-5>", lambda e: self._scroll(1))
+
+    def _scroll(self, units):
+        self.canvas.yview_scroll(units, "units")
+        return "break"
+
+    def add_files(self):
+        paths = filedialog.askopenfilenames(
+            parent=self.window,
+            title="Select waste images",
+            filetypes=[("Image files", "*.jpg *.jpeg *.png *.bmp"), ("All files", "*.*")]
+        )
+        if paths:
+            self.add(paths)
+
+    def add_folder(self):
+        path = filedialog.askdirectory(parent=self.window, title="Select a folder of waste images")
+        if path:
+            self.add([path])
+
+    def add(self, paths):
+        """Append images to the grid and start loading and classifying them"""
+        files = gallery_files(paths)
+        start = len(self.items)
+        self.items.extend(GalleryItem(path) for path in files)
+        model_size = self.handle.current.backend.input_size
+        for index, path in enumerate(files, start):
+            self.loader.submit(self._load, self.generation, index, path, model_size)
+        self.layout()
+        self.update_status()
+
+    def clear(self):
+        """Empty the grid; work still queued for the old images is dropped"""
+        self.generation += 1
+        self.worker.cancel()
+        self.items = []
+        self.classified = 0
+        self._photos = {}
+        self.layout()
+        self.update_status()
+
+    def close(self):
+        self._closed = True
+        self.generation += 1
+        self.worker.stop()
+        self.loader.shutdown(wait=False)
+        self.window.destroy()
+        self.app.gallery = None
+
+    def _load(self, generation, index, path, model_size):
+        """Runs on a loader thread, so it must not touch any Tk widgets"""
+        if generation != self.generation:
+            return
+        try:
+            thumbnail = self.thumbnails.get(path)
+            with open(path, 'rb') as f:
+                data = f.read()
+
+            key = image_key(data) if self.cache is not None else None
+            loaded = self.handle.current
+            cached = self.cache.get(key, loaded.fingerprint) if key is not None else None
+            if cached is not None:
+                prediction = Prediction(cached[None], loaded.class_names, loaded.version)
+                if thumbnail is None:
+                    thumbnail = decode_image(io.BytesIO(data), THUMBNAIL_SIZE, THUMBNAIL_SIZE).display
+                    self.thumbnails.put(path, thumbnail)
+                self._loaded.put((generation, index, thumbnail, prediction))
+                return
+
+            # One reduced-scale decode yields both the thumbnail and the model input
+            decoded = decode_image(io.BytesIO(data), None if thumbnail else THUMBNAIL_SIZE, model_size)
+            if thumbnail is None:
+                thumbnail = decoded.display
+                self.thumbnails.put(path, thumbnail)
+            self._loaded.put((generation, index, thumbnail, None))
+            self.worker.submit((generation, index), decoded.model_array, key)
+        except Exception as e:
+            self._loaded.put((generation, index, None, e))
+
+    def poll(self):
+        """Move finished thumbnails and predictions into the grid"""
+        if self._closed:
+            return
+        changed = False
+        for _ in range(512):
+            try:
+                generation, index, thumbnail, result = self._loaded.get_nowait()
+            except queue.Empty:
+                break
+            if generation != self.generation:
+                continue
+            self.items[index].thumbnail = thumbnail
+            self._apply(self.items[index], result)
+            changed = True
+
+        for (generation, index), prediction, error in self.worker.poll():
+            if generation != self.generation:
+                continue
+            self._apply(self.items[index], error or prediction)
+            changed = True
+
+        if changed:
+            self.update_status()
+            self.schedule_render()
+        self.window.after(50, self.poll)
+
+    def _apply(self, item, result):
+        if isinstance(result, Exception):
+            item.error = str(result)
+            self.classified += 1
+        elif result is not None:
+            item.label, item.confidence = top_predictions(result.probabilities, result.class_names)[0]
+            self.classified += 1
+
+    def update_status(self):
+        errors = sum(1 for item in self.items if item.error)
+        self.status_label.config(
+            text=f"{len(self.items)} images • {self.classified} classified"
+                 + (f" • {errors} failed" if errors else "")
+        )
+
+    def columns(self):
+        return max(1, self.canvas.winfo_width() // CELL_WIDTH)
+
+    def layout(self):
+        """Size the scroll region for every row, then draw only the visible ones"""
+        columns = self.columns()
+        rows = math.ceil(len(self.items) / columns)
+        self.canvas.configure(scrollregion=(0, 0, columns * CELL_WIDTH, max(1, rows * CELL_HEIGHT)))
+        self.schedule_render()
+
+    def schedule_render(self):
+        """Coalesce scroll, resize and result updates into one redraw"""
+        if not self._render_pending:
+            self._render_pending = True
+            self.window.after_idle(self.render)
+
+    def render(self):
+        self._render_pending = False
+        if self._closed:
+            return
+        columns = self.columns()
+        top = int(self.canvas.canvasy(0))
+        first_row = top // CELL_HEIGHT
+        last_row = (top + self.canvas.winfo_height()) // CELL_HEIGHT
+        visible = range(first_row * columns, min(len(self.items), (last_row + 1) * columns))
+
+        while len(self._cells) < len(visible):
+            self._cells.append(self._create_cell())
+        for cell, index in zip(self._cells, visible):
+            self._bind_cell(cell, index, columns)
+        for cell in self._cells[len(visible):]:
+            for item_id in cell:
+                self.canvas.itemconfigure(item_id, state='hidden')
+
+        # Keep PhotoImages only for what is on screen
+        self._photos = {index: photo for index, photo in self._photos.items() if index in visible}
+
+    def _create_cell(self):
+        return (
+            self.canvas.create_rectangle(0, 0, 0, 0, fill='#0f3460', outline='#16213e'),
+            self.canvas.create_image(0, 0, anchor='center'),
+            self.canvas.create_text(0, 0, fill='#a8dadc', font=('Segoe UI', 9), width=CELL_WIDTH - 16),
+            self.canvas.create_text(0, 0, fill='#7f8c8d', font=('Segoe UI', 10, 'bold'), width=CELL_WIDTH - 16),
+        )
+
+    def _bind_cell(self, cell, index, columns):
+        rect, image, name, result = cell
+        item = self.items[index]
+        row, column = divmod(index, columns)
+        x, y = column * CELL_WIDTH, row * CELL_HEIGHT
+        center = x + CELL_WIDTH // 2
+
+        photo = self._photos.get(index)
+        if photo is None and item.thumbnail is not None:
+            photo = self._photos[index] = ImageTk.PhotoImage(item.thumbnail)
+
+        if item.error:
+            text, color = "⚠️ Failed", '#ffb703'
+        elif item.label is None:
+            text, color = "Classifying...", '#7f8c8d'
+        else:
+            is_biodegradable = 'biodegradable' in item.label.lower() and 'non' not in item.label.lower()
+            text = f"{'🌱' if is_biodegradable else '♻️'} {item.label.replace('_', ' ').upper()} {item.confidence:.0%}"
+            color = '#00ff88' if is_biodegradable else '#ff6b6b'
+
+        self.canvas.coords(rect, x + 4, y + 4, x + CELL_WIDTH - 4, y + CELL_HEIGHT - 4)
+        self.canvas.coords(image, center, y + 12 + THUMBNAIL_SIZE[1] // 2)
+        self.canvas.coords(name, center, y + THUMBNAIL_SIZE[1] + 28)
+        self.canvas.coords(result, center, y + THUMBNAIL_SIZE[1] + 48)
+        self.canvas.itemconfigure(image, image=photo or '')
+        self.canvas.itemconfigure(name, text=os.path.basename(item.path))
+        self.canvas.itemconfigure(result, text=text, fill=color)
+        for item_id in cell:
+            self.canvas.itemconfigure(item_id, state='normal')
+
+    def _on_double_click(self, event):
+        """Open the image under the pointer in the main window"""
+        column = int(self.canvas.canvasx(event.x)) // CELL_WIDTH
+        row = int(self.canvas.canvasy(event.y)) // CELL_HEIGHT
+        index = row * self.columns() + column
+        if column < self.columns() and 0 <= index < len(self.items):
+            self.app.open_image(self.items[index].path)
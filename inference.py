@@ -0,0 +1,300 @@
+"""
+Model loading and prediction helpers shared by the GUI and batch tools.
+
+Inference goes through a small backend abstraction so callers can pick the
+full Keras model, the inference-only SavedModel or a quantized TFLite
+export at startup. Every backend
+exposes `predict(batch)` taking a (N, H, W, 3) array of raw [0, 255] pixels
+and returning an (N, num_classes) array of probabilities, and `input_size`,
+the (width, height) images must be resized to. The input size comes from
+the metadata file saved next to the model at training time.
+
+Any backend can run as a confidence-gated cascade: a small fast model
+classifies every image and only those below a threshold chosen at training
+time are sent on to the full model.
+
+The TFLite interpreter memory-maps the .tflite file read-only instead of
+deserializing it, so loading is near-constant time and several processes
+serving the same version share one copy of the int8 weights in the page
+cache. With tflite_runtime installed it never imports TensorFlow.
+
+The 'knn' backend needs no trained head at all: it embeds images with the
+frozen ImageNet MobileNetV2 and classifies them against the labelled
+examples in an EmbeddingIndex (see embedding_index.py).
+"""
+
+import json
+import os
+import threading
+import time
+import numpy as np
+from metrics import METRICS
+from model.artifacts import (CLASS_NAMES_FILE, DEFAULT_METADATA, MODEL_FILE, cascade_config_path,
+                             fast_model_path, load_metadata, metadata_path, savedmodel_path, tflite_path)
+
+MODEL_PATH = MODEL_FILE
+CLASS_NAMES_PATH = CLASS_NAMES_FILE
+DEFAULT_CLASS_NAMES = ['biodegradable', 'non_biodegradable']
+
+
+def load_class_names(class_names_path=CLASS_NAMES_PATH):
+    """Read class names, falling back to the default labels"""
+    if os.path.exists(class_names_path):
+        with open(class_names_path, 'r') as f:
+            return [line.strip() for line in f.readlines()]
+    return list(DEFAULT_CLASS_NAMES)
+
+
+def _require_file(model_path):
+    if not os.path.exists(model_path):
+        raise FileNotFoundError(
+            f"Model file '{model_path}' not found! "
+            "Train it first with: python model/train_simple.py"
+        )
+
+
+class KerasBackend:
+    """Full Keras model loaded from the .h5 file"""
+
+    name = 'keras'
+
+    def __init__(self, model_path=MODEL_PATH):
+        import tensorflow as tf
+
+        _require_file(model_path)
+        self.model_path = model_path
+        self.model = tf.keras.models.load_model(model_path)
+
+    def predict(self, batch):
+        return self.model.predict(np.asarray(batch), verbose=0)
+
+
+class SavedModelBackend:
+    """Inference-only SavedModel without augmentation layers"""
+
+    name = 'savedmodel'
+
+    def __init__(self, export_dir):
+        import tensorflow as tf
+
+        _require_file(export_dir)
+        self.model_path = export_dir
+        self.module = tf.saved_model.load(export_dir)
+
+    def predict(self, batch):
+        images = np.asarray(batch, dtype=np.uint8)
+        return self.module.serve(images)['probabilities'].numpy()
+
+
+def _tflite_interpreter(model_path, num_threads):
+    # Prefer the standalone runtime so TFLite inference doesn't pull in TensorFlow
+    try:
+        from tflite_runtime.interpreter import Interpreter
+    except ImportError:
+        import tensorflow as tf
+        Interpreter = tf.lite.Interpreter
+    return Interpreter(model_path=model_path, num_threads=num_threads)
+
+
+class TFLiteBackend:
+    """Float16 or int8 post-training-quantized TFLite model"""
+
+    name = 'tflite'
+
+    def __init__(self, model_path, num_threads=None):
+        _require_file(model_path)
+        self.model_path = model_path
+        self.interpreter = _tflite_interpreter(model_path, num_threads or os.cpu_count())
+        self.input_detail = self.interpreter.get_input_details()[0]
+        self.output_detail = self.interpreter.get_output_details()[0]
+        self._batch_size = None
+
+    def _resize(self, batch_size):
+        if batch_size != self._batch_size:
+            shape = list(self.input_detail['shape'])
+            shape[0] = batch_size
+            self.interpreter.resize_tensor_input(self.input_detail['index'], shape)
+            self.interpreter.allocate_tensors()
+            self._batch_size = batch_size
+
+    def predict(self, batch):
+        batch = np.asarray(batch, dtype=np.float32)
+        self._resize(len(batch))
+
+        scale, zero_point = self.input_detail['quantization']
+        if scale:
+            batch = np.round(batch / scale + zero_point)
+        self.interpreter.set_tensor(self.input_detail['index'], batch.astype(self.input_detail['dtype']))
+        self.interpreter.invoke()
+
+        output = self.interpreter.get_tensor(self.output_detail['index'])
+        scale, zero_point = self.output_detail['quantization']
+        if scale:
+            output = (output.astype(np.float32) - zero_point) * scale
+        return output
+
+
+class CascadeBackend:
+    """
+    Runs the fast model on every image and the full model only on images
+    whose top fast-model probability is below `threshold`.
+    """
+
+    def __init__(self, fast, full, threshold):
+        self.fast = fast
+        self.full = full
+        self.threshold = threshold
+        self.name = f"cascade-{full.name}"
+        self.model_path = full.model_path
+        self.input_size = full.input_size
+        self._lock = threading.Lock()
+        self.images = 0
+        self.early_exits = 0
+        self.total_seconds = 0.0
+
+    def predict(self, batch):
+        batch = np.asarray(batch)
+        start = time.perf_counter()
+        with METRICS.timer('predict_fast'):
+            probabilities = np.array(self.fast.predict(batch), dtype=np.float32)
+        unsure = probabilities.max(axis=1) < self.threshold
+        if unsure.any():
+            with METRICS.timer('predict_full'):
+                probabilities[unsure] = self.full.predict(batch[unsure])
+        elapsed = time.perf_counter() - start
+
+        with self._lock:
+            self.images += len(batch)
+            self.early_exits += int(len(batch) - unsure.sum())
+            self.total_seconds += elapsed
+        return probabilities
+
+    def stats(self):
+        """Share of images answered by the fast model and mean latency per image"""
+        with self._lock:
+            images, early_exits, total_seconds = self.images, self.early_exits, self.total_seconds
+        return {
+            'threshold': self.threshold,
+            'images': images,
+            'early_exit_rate': early_exits / images if images else 0.0,
+            'avg_latency_ms': 1000 * total_seconds / images if images else 0.0,
+        }
+
+
+class EmbeddingExtractor:
+    """Frozen ImageNet MobileNetV2 mapping raw [0, 255] images to pooled embeddings"""
+
+    def __init__(self, input_size=(224, 224), alpha=1.0):
+        import tensorflow as tf
+
+        self.input_size = tuple(input_size)
+        width, height = self.input_size
+        self.model = tf.keras.applications.MobileNetV2(
+            input_shape=(height, width, 3), alpha=alpha, include_top=False,
+            weights='imagenet', pooling='avg'
+        )
+        self.dim = self.model.output_shape[-1]
+        self._embed = tf.function(
+            lambda images: self.model(tf.cast(images, tf.float32) * (1. / 127.5) - 1., training=False)
+        )
+
+    def embed(self, batch):
+        return self._embed(np.asarray(batch, dtype=np.uint8)).numpy()
+
+
+class EmbeddingBackend:
+    """Nearest-neighbour or class-centroid classification over an EmbeddingIndex"""
+
+    name = 'knn'
+
+    def __init__(self, index_dir, k=5, method='knn'):
+        from embedding_index import META_FILE, EmbeddingIndex
+
+        _require_file(os.path.join(index_dir, META_FILE))
+        self.index = EmbeddingIndex(index_dir)
+        self.extractor = EmbeddingExtractor(self.index.input_size, self.index.meta['alpha'])
+        self.input_size = self.extractor.input_size
+        self.model_path = os.path.join(index_dir, META_FILE)
+        self.k = k
+        self.method = method
+
+    @property
+    def class_names(self):
+        return self.index.class_names
+
+    @property
+    def fingerprint(self):
+        """Changes whenever the index takes in new rows or classes"""
+        self.index.refresh()
+        return f"{self.method}-k{self.k}-{self.index.generation}"
+
+    def predict(self, batch):
+        return self.index.classify(self.extractor.embed(batch), self.k, self.method)
+
+
+BACKENDS = ('keras', 'savedmodel', 'tflite-float16', 'tflite-int8', 'knn')
+
+
+def load_cascade(name='keras', model_path=MODEL_PATH):
+    """
+    Wrap backend `name` in a cascade. The fast stage uses the same backend
+    type, loaded from the exports of the model saved by --cascade training.
+    """
+    config_path = cascade_config_path(model_path)
+    if not os.path.exists(config_path):
+        raise FileNotFoundError(
+            f"No cascade found for '{model_path}'. "
+            "Train one with: python model/train_simple.py --cascade"
+        )
+    with open(config_path) as f:
+        threshold = json.load(f)['threshold']
+    fast = load_backend(name, fast_model_path(model_path))
+    full = load_backend(name, model_path)
+    return CascadeBackend(fast, full, threshold)
+
+
+def load_backend(name='keras', model_path=MODEL_PATH, cascade=False):
+    """
+    Create an inference backend by name. For SavedModel and TFLite
+    backends `model_path` is the Keras model the export was made from;
+    the matching export next to it is loaded. With `cascade`, the backend
+    is gated by the fast first-stage model trained alongside it. The
+    'knn' backend takes an index directory as
+    `model_path`, and otherwise uses embedding_index/.
+    """
+    if name == 'knn':
+        from embedding_index import INDEX_DIR
+        return EmbeddingBackend(model_path if os.path.isdir(model_path) else INDEX_DIR)
+    if cascade:
+        return load_cascade(name, model_path)
+    if name == 'keras':
+        backend = KerasBackend(model_path)
+    elif name == 'savedmodel':
+        backend = SavedModelBackend(savedmodel_path(model_path))
+    elif name.startswith('tflite-'):
+        variant = name.split('-', 1)[1]
+        backend = TFLiteBackend(tflite_path(model_path, variant))
+        backend.name = name
+    else:
+        raise ValueError(f"Unknown backend '{name}'. Choose from: {', '.join(BACKENDS)}")
+    backend.input_size = tuple(load_metadata(model_path)['input_size'])
+    return backend
+
+
+def predict_batch(model, batch):
+    """Run a backend on a (N, H, W, 3) batch and return probabilities"""
+    with METRICS.timer('predict'):
+        return model.predict(batch)
+
+
+def top_predictions(predictions, class_names):
+    """Return (class_name, confidence) for each row of probabilities"""
+    with METRICS.timer('postprocess'):
+        indices = np.argmax(predictions, axis=1)
+        results = [
+            (class_names[i], float(row[i]))
+            for i, row in zip(indices, predictions)
+        ]
+    for class_name, confidence in results:
+        METRICS.record_prediction(class_name, confidence)
+    return results
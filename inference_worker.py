@@ -0,0 +1,234 @@
+"""
+Background inference for the GUI.
+
+Tk is single-threaded, so running the model on the main thread freezes the
+window. InferenceWorker owns a daemon thread that runs predictions; the Tk
+loop submits requests and polls for finished results with `after()`.
+
+The worker reads the live model from a ModelHandle once per request, so
+a hot-swapped model is picked up between requests without interrupting
+one in flight. Each result reports the model version that produced it.
+
+If a PredictionCache is given, requests that carry the image's file path
+are looked up by content hash first and only run the model on a miss.
+
+Only the most recent request matters to the operator. Submitting a new
+request or calling `cancel()` makes any queued or in-flight request stale:
+queued ones are skipped and in-flight results are dropped by `poll()`.
+
+BatchInferenceWorker serves the gallery instead, where every image needs a
+result: requests are grouped into batches of whatever is queued, and
+`cancel()` drops everything submitted so far.
+"""
+
+import logging
+import queue
+import threading
+from collections import namedtuple
+import numpy as np
+from inference import predict_batch
+from prediction_cache import image_key
+from preprocessing import match_input_size
+
+logger = logging.getLogger('waste_classifier.worker')
+
+Prediction = namedtuple('Prediction', ['probabilities', 'class_names', 'version'])
+
+
+class InferenceWorker:
+    """Runs predictions for preprocessed images on a worker thread"""
+
+    def __init__(self, handle, cache=None):
+        self.handle = handle
+        self.cache = cache
+        self._requests = queue.Queue()
+        self._results = queue.Queue()
+        self._lock = threading.Lock()
+        self._latest_id = 0
+        self.warmed_up = threading.Event()
+        # Set if the warm-up prediction failed, e.g. a broken model or a shape mismatch
+        self.warm_up_error = None
+        self._thread = threading.Thread(target=self._run, name='inference-worker', daemon=True)
+        self._thread.start()
+
+    def submit(self, img_array, path=None):
+        """
+        Queue a preprocessed (H, W, 3) image for classification and return
+        its request id. `path` is the file the image came from, used as the
+        cache key source.
+        """
+        with self._lock:
+            self._latest_id += 1
+            request_id = self._latest_id
+        self._requests.put((request_id, (img_array, path)))
+        return request_id
+
+    def warm_up(self):
+        """
+        Run one prediction on a dummy tensor so graph tracing and memory
+        allocation happen before the operator's first real request. Once
+        `warmed_up` is set, `warm_up_error` holds the exception if it failed.
+        """
+        width, height = self.handle.current.backend.input_size
+        self._requests.put((None, np.zeros((1, height, width, 3), dtype=np.uint8)))
+
+    def cancel(self):
+        """Mark every queued and in-flight request as stale"""
+        with self._lock:
+            self._latest_id += 1
+
+    def is_current(self, request_id):
+        with self._lock:
+            return request_id == self._latest_id
+
+    def poll(self):
+        """
+        Return (request_id, prediction, error) for the latest request if it
+        has finished, else None. `prediction` is a Prediction whose
+        probabilities have shape (1, num_classes). Stale results are
+        discarded.
+        """
+        latest = None
+        while True:
+            try:
+                result = self._results.get_nowait()
+            except queue.Empty:
+                return latest
+            if self.is_current(result[0]):
+                latest = result
+
+    def stop(self):
+        self._requests.put(None)
+
+    def _run(self):
+        while True:
+            item = self._requests.get()
+            if item is None:
+                return
+            request_id, payload = item
+
+            # Warm-up: run and discard
+            if request_id is None:
+                try:
+                    predict_batch(self.handle.current.backend, payload)
+                except Exception as e:
+                    logger.exception("Warm-up prediction failed")
+                    self.warm_up_error = e
+                self.warmed_up.set()
+                continue
+
+            # Skip requests that were replaced while waiting in the queue
+            if not self.is_current(request_id):
+                continue
+
+            try:
+                self._results.put((request_id, self._predict(*payload), None))
+            except Exception as e:
+                self._results.put((request_id, None, e))
+
+    def _predict(self, img_array, path):
+        # One read of the handle: a swap mid-request can't mix two models
+        loaded = self.handle.current
+        # Taken before predicting: if the model changes meanwhile, the result isn't cached
+        fingerprint = loaded.fingerprint
+        key = None
+        if self.cache is not None and path is not None:
+            with open(path, 'rb') as f:
+                key = image_key(f.read())
+            cached = self.cache.get(key, fingerprint)
+            if cached is not None:
+                return Prediction(cached[None], loaded.class_names, loaded.version)
+
+        img_array = match_input_size(img_array, loaded.backend.input_size)
+        predictions = predict_batch(loaded.backend, np.expand_dims(img_array, axis=0))
+        if key is not None:
+            self.cache.put(key, predictions[0], fingerprint=fingerprint)
+        return Prediction(predictions, loaded.class_names, loaded.version)
+
+
+class BatchInferenceWorker:
+    """Runs many independent predictions in batches on a worker thread"""
+
+    def __init__(self, handle, cache=None, batch_size=16, max_queued=256):
+        self.handle = handle
+        self.cache = cache
+        self.batch_size = batch_size
+        # Bounded so loaders block instead of piling up decoded images
+        self._requests = queue.Queue(maxsize=max_queued)
+        self._results = queue.Queue()
+        self._lock = threading.Lock()
+        self._generation = 0
+        self._thread = threading.Thread(target=self._run, name='batch-inference-worker', daemon=True)
+        self._thread.start()
+
+    def submit(self, tag, img_array, key=None):
+        """
+        Queue a preprocessed (H, W, 3) image. `tag` comes back with its
+        result; `key` is its prediction cache key, if any. Blocks while
+        `max_queued` requests are waiting, until `cancel()` is called.
+        """
+        with self._lock:
+            generation = self._generation
+        while True:
+            try:
+                self._requests.put((generation, tag, img_array, key), timeout=0.1)
+                return
+            except queue.Full:
+                with self._lock:
+                    if generation != self._generation:
+                        return
+
+    def cancel(self):
+        """Drop every request submitted so far"""
+        with self._lock:
+            self._generation += 1
+
+    def poll(self, limit=256):
+        """Return up to `limit` finished (tag, prediction, error) tuples"""
+        results = []
+        while len(results) < limit:
+            try:
+                results.append(self._results.get_nowait())
+            except queue.Empty:
+                break
+        return results
+
+    def stop(self):
+        self.cancel()
+        self._requests.put(None)
+
+    def _run(self):
+        running = True
+        while running:
+            batch = [self._requests.get()]
+            while len(batch) < self.batch_size and batch[-1] is not None:
+                try:
+                    batch.append(self._requests.get_nowait())
+                except queue.Empty:
+                    break
+            if batch[-1] is None:
+                batch.pop()
+                running = False
+
+            with self._lock:
+                batch = [item for item in batch if item[0] == self._generation]
+            if batch:
+                self._predict(batch)
+
+    def _predict(self, batch):
+        loaded = self.handle.current
+        fingerprint = loaded.fingerprint
+        try:
+            size = loaded.backend.input_size
+            images = np.stack([match_input_size(img_array, size) for _, _, img_array, _ in batch])
+            predictions = predict_batch(loaded.backend, images)
+        except Exception as e:
+            for _, tag, _, _ in batch:
+                self._results.put((tag, None, e))
+            return
+
+        if self.cache is not None:
+            self.cache.put_many([(key, row) for (_, _, _, key), row in zip(batch, predictions)
+                                 if key is not None], fingerprint=fingerprint)
+        for (_, tag, _, _), row in zip(batch, predictions):
+            self._results.put((tag, Prediction(row[None], loaded.class_names, loaded.version), None))
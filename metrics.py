@@ -0,0 +1,270 @@
+"""
+Low-overhead inference instrumentation.
+
+Stage timings (file read, decode, resize, predict, post-processing) go into
+fixed-bucket histograms, and predictions are counted per class and per
+confidence bucket. Everything lives in the process-wide METRICS registry,
+which is disabled by default: `METRICS.timer()` then returns a shared no-op
+context manager, so instrumented code costs next to nothing.
+
+Snapshots can be exported through pluggable sinks:
+  - JsonLinesSink:        appends one JSON snapshot per flush
+  - PrometheusFileSink:   Prometheus text format, e.g. for node_exporter's
+                          textfile collector
+  - serve_prometheus():   a /metrics HTTP endpoint
+"""
+
+import bisect
+import json
+import os
+import threading
+import time
+from contextlib import contextmanager, nullcontext
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+# Latency buckets: 0.1 ms .. ~52 s, doubling
+LATENCY_BUCKETS = tuple(0.0001 * 2 ** i for i in range(20))
+CONFIDENCE_BUCKETS = (0.5, 0.6, 0.7, 0.8, 0.9, 0.95, 0.99, 1.0)
+
+_NOOP = nullcontext()
+
+
+class Histogram:
+    """Cumulative-bucket histogram with quantile estimates"""
+
+    def __init__(self, buckets=LATENCY_BUCKETS):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.count = 0
+        self.sum = 0.0
+        self._lock = threading.Lock()
+
+    def observe(self, value):
+        i = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            self.counts[i] += 1
+            self.count += 1
+            self.sum += value
+
+    def quantile(self, q):
+        """Estimate a quantile by linear interpolation inside its bucket"""
+        with self._lock:
+            counts, total = list(self.counts), self.count
+        if not total:
+            return None
+        rank = q * total
+        seen = 0
+        for i, n in enumerate(counts):
+            if seen + n >= rank and n:
+                lower = self.buckets[i - 1] if i > 0 else 0.0
+                upper = self.buckets[i] if i < len(self.buckets) else self.buckets[-1]
+                return lower + (upper - lower) * (rank - seen) / n
+            seen += n
+        return self.buckets[-1]
+
+    def snapshot(self):
+        return {
+            'count': self.count,
+            'sum': self.sum,
+            'p50': self.quantile(0.50),
+            'p95': self.quantile(0.95),
+            'p99': self.quantile(0.99),
+        }
+
+
+class Metrics:
+    """Registry of stage histograms and prediction counters"""
+
+    def __init__(self, enabled=False):
+        self.enabled = enabled
+        self.stages = {}
+        self.class_counts = {}
+        self.confidence_counts = {}
+        self._lock = threading.Lock()
+
+    def _histogram(self, stage):
+        histogram = self.stages.get(stage)
+        if histogram is None:
+            with self._lock:
+                histogram = self.stages.setdefault(stage, Histogram())
+        return histogram
+
+    def timer(self, stage):
+        """Context manager timing one stage; a no-op when disabled"""
+        if not self.enabled:
+            return _NOOP
+        return self._timed(stage)
+
+    @contextmanager
+    def _timed(self, stage):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self._histogram(stage).observe(time.perf_counter() - start)
+
+    def observe(self, stage, seconds):
+        if self.enabled:
+            self._histogram(stage).observe(seconds)
+
+    def record_prediction(self, class_name, confidence):
+        if not self.enabled:
+            return
+        i = min(bisect.bisect_left(CONFIDENCE_BUCKETS, confidence), len(CONFIDENCE_BUCKETS) - 1)
+        bucket = f"le_{CONFIDENCE_BUCKETS[i]}"
+        with self._lock:
+            self.class_counts[class_name] = self.class_counts.get(class_name, 0) + 1
+            self.confidence_counts[bucket] = self.confidence_counts.get(bucket, 0) + 1
+
+    def snapshot(self):
+        with self._lock:
+            stages = dict(self.stages)
+            class_counts = dict(self.class_counts)
+            confidence_counts = dict(self.confidence_counts)
+        return {
+            'timestamp': time.time(),
+            'stages': {name: h.snapshot() for name, h in stages.items()},
+            'predictions_by_class': class_counts,
+            'predictions_by_confidence': confidence_counts,
+        }
+
+    def prometheus_text(self):
+        """Render the registry in Prometheus text exposition format"""
+        with self._lock:
+            stages = dict(self.stages)
+            class_counts = dict(self.class_counts)
+            confidence_counts = dict(self.confidence_counts)
+
+        lines = [
+            '# HELP waste_classifier_stage_seconds Time spent per inference stage',
+            '# TYPE waste_classifier_stage_seconds histogram',
+        ]
+        for stage, h in sorted(stages.items()):
+            with h._lock:
+                counts, total, total_sum = list(h.counts), h.count, h.sum
+            cumulative = 0
+            for upper, n in zip(h.buckets, counts):
+                cumulative += n
+                lines.append(f'waste_classifier_stage_seconds_bucket{{stage="{stage}",le="{upper:g}"}} {cumulative}')
+            lines.append(f'waste_classifier_stage_seconds_bucket{{stage="{stage}",le="+Inf"}} {total}')
+            lines.append(f'waste_classifier_stage_seconds_sum{{stage="{stage}"}} {total_sum}')
+            lines.append(f'waste_classifier_stage_seconds_count{{stage="{stage}"}} {total}')
+
+        lines += [
+            '# HELP waste_classifier_predictions_total Predictions per class',
+            '# TYPE waste_classifier_predictions_total counter',
+        ]
+        for name, n in sorted(class_counts.items()):
+            lines.append(f'waste_classifier_predictions_total{{class="{name}"}} {n}')
+
+        lines += [
+            '# HELP waste_classifier_confidence_total Predictions per confidence bucket',
+            '# TYPE waste_classifier_confidence_total counter',
+        ]
+        for bucket, n in sorted(confidence_counts.items()):
+            lines.append(f'waste_classifier_confidence_total{{bucket="{bucket}"}} {n}')
+        return '\n'.join(lines) + '\n'
+
+
+METRICS = Metrics()
+
+
+class JsonLinesSink:
+    """Appends one JSON snapshot per flush"""
+
+    def __init__(self, path):
+        self.path = path
+
+    def flush(self, metrics):
+        with open(self.path, 'a') as f:
+            f.write(json.dumps(metrics.snapshot()) + '\n')
+
+
+class PrometheusFileSink:
+    """Rewrites a Prometheus text-format file atomically on each flush"""
+
+    def __init__(self, path):
+        self.path = path
+
+    def flush(self, metrics):
+        tmp_path = f"{self.path}.tmp"
+        with open(tmp_path, 'w') as f:
+            f.write(metrics.prometheus_text())
+        os.replace(tmp_path, self.path)
+
+
+class MetricsExporter:
+    """Flushes the registry to its sinks periodically and on stop()"""
+
+    def __init__(self, metrics, sinks, interval=10.0):
+        self.metrics = metrics
+        self.sinks = sinks
+        self.interval = interval
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name='metrics-exporter', daemon=True)
+        self._thread.start()
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            self.flush()
+
+    def flush(self):
+        for sink in self.sinks:
+            sink.flush(self.metrics)
+
+    def stop(self):
+        self._stop.set()
+        self.flush()
+
+
+def serve_prometheus(metrics, port, host='127.0.0.1'):
+    """Serve /metrics on a background thread; returns the server"""
+
+    class Handler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            if self.path.rstrip('/') != '/metrics':
+                self.send_error(404)
+                return
+            body = metrics.prometheus_text().encode()
+            self.send_response(200)
+            self.send_header('Content-Type', 'text/plain; version=0.0.4')
+            self.send_header('Content-Length', str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, format, *args):
+            pass
+
+    server = ThreadingHTTPServer((host, port), Handler)
+    threading.Thread(target=server.serve_forever, name='metrics-http', daemon=True).start()
+    return server
+
+
+def add_arguments(parser):
+    """Command-line flags shared by the GUI and batch tools"""
+    parser.add_argument('--log-level', default='WARNING',
+                        choices=['DEBUG', 'INFO', 'WARNING', 'ERROR'], help="Logging verbosity")
+    parser.add_argument('--metrics-jsonl', default=None, help="Append metric snapshots to this JSONL file")
+    parser.add_argument('--metrics-prom', default=None, help="Write Prometheus text-format metrics to this file")
+    parser.add_argument('--metrics-port', type=int, default=None, help="Serve Prometheus metrics on this port")
+    parser.add_argument('--metrics-interval', type=float, default=10.0, help="Seconds between metric flushes")
+
+
+def configure(args):
+    """
+    Set up logging and, if any sink was requested, enable METRICS.
+    Returns a MetricsExporter (or None) that the caller should stop() at exit.
+    """
+    import logging
+    logging.basicConfig(level=args.log_level, format='%(asctime)s %(levelname)s %(name)s: %(message)s')
+
+    sinks = []
+    if args.metrics_jsonl:
+        sinks.append(JsonLinesSink(args.metrics_jsonl))
+    if args.metrics_prom:
+        sinks.append(PrometheusFileSink(args.metrics_prom))
+    if sinks or args.metrics_port:
+        METRICS.enabled = True
+    if args.metrics_port:
+        serve_prometheus(METRICS, args.metrics_port)
+    return MetricsExporter(METRICS, sinks, args.metrics_interval) if sinks else None
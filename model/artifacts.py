@@ -0,0 +1,212 @@
+"""
+Model artifact layout and atomic, versioned publishing of trained models.
+
+This is the one place that knows where artifacts live. The training and
+export scripts in model/ import it directly; inference.py and
+model_registry.py at the repo root import it as `model.artifacts`. It only
+uses the standard library, so importing it never pulls in TensorFlow.
+
+Layout:
+
+    models/<version>/waste_classifier_model.h5
+    models/<version>/waste_classifier_model_metadata.json
+    models/<version>/class_names.txt
+    models/<version>/split.json          only if trained with --split-manifest
+    models/<version>/manifest.json
+    models/CURRENT          <- name of the live version
+
+Exports (TFLite, SavedModel, the cascade's fast model) sit next to the
+Keras model they were made from, named after it.
+
+A version is written into models/.staging-<version>/, renamed to
+models/<version>/ once complete, and only then is CURRENT replaced with
+os.replace. Readers therefore see either the old or the new model, never
+a partial one.
+
+Publishing writes manifest.json last: class names, input size, backbone,
+preprocessing and the size and sha256 of every artifact in the version.
+The model watcher checks what it loaded against it before a hot swap, and
+a refit knows from it which exports the version shipped with.
+"""
+
+import hashlib
+import json
+import os
+import time
+
+MODELS_DIR = 'models'
+POINTER_FILE = 'CURRENT'
+MODEL_FILE = 'waste_classifier_model.h5'
+CLASS_NAMES_FILE = 'class_names.txt'
+MANIFEST_FILE = 'manifest.json'
+MANIFEST_FORMAT = 1
+# Copy of the --split-manifest a version was trained on
+SPLIT_FILE = 'split.json'
+
+DATA_DIR = 'dataset'
+FEATURE_CACHE_DIR = '.feature_cache'
+
+# MobileNetV2 rescaling, built into every exported graph
+PREPROCESSING = {'input': 'RGB uint8 [0, 255]', 'scale': 1 / 127.5, 'offset': -1.0}
+
+# Models trained before metadata was recorded
+DEFAULT_METADATA = {'backbone': 'mobilenetv2', 'alpha': 1.0, 'input_size': [224, 224]}
+
+APP_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def tflite_path(model_path, variant):
+    """Path of a TFLite export written next to the Keras model"""
+    return f"{os.path.splitext(model_path)[0]}_{variant}.tflite"
+
+
+def savedmodel_path(model_path):
+    """Path of the inference-only SavedModel exported next to the Keras model"""
+    return f"{os.path.splitext(model_path)[0]}_savedmodel"
+
+
+def fast_model_path(model_path):
+    """Path of the cascade's first-stage model, saved next to the full model"""
+    return f"{os.path.splitext(model_path)[0]}_fast.h5"
+
+
+def cascade_config_path(model_path):
+    """Path of the cascade threshold and validation stats"""
+    return f"{os.path.splitext(model_path)[0]}_cascade.json"
+
+
+def metadata_path(model_path):
+    """Path of the input size / backbone metadata saved next to the model"""
+    return f"{os.path.splitext(model_path)[0]}_metadata.json"
+
+
+def load_metadata(model_path=MODEL_FILE):
+    """Read a model's metadata, falling back to the original 224px MobileNetV2"""
+    metadata = dict(DEFAULT_METADATA)
+    path = metadata_path(model_path)
+    if os.path.exists(path):
+        with open(path) as f:
+            metadata.update(json.load(f))
+    return metadata
+
+
+def save_metadata(model_path, input_size, alpha=1.0, backbone='mobilenetv2'):
+    """Record the input size and backbone next to the model so inference matches training"""
+    with open(metadata_path(model_path), 'w') as f:
+        json.dump({'backbone': backbone, 'alpha': alpha, 'input_size': list(input_size)}, f, indent=2)
+
+
+def locate(path):
+    """`path` if it exists, else the same relative path under the app directory"""
+    if os.path.isabs(path) or os.path.exists(path):
+        return path
+    candidate = os.path.join(APP_DIR, path)
+    return candidate if os.path.exists(candidate) else path
+
+
+def current_version(models_dir=MODELS_DIR):
+    """Version named by the pointer file, or None if nothing is published"""
+    try:
+        with open(os.path.join(locate(models_dir), POINTER_FILE)) as f:
+            return f.read().strip() or None
+    except FileNotFoundError:
+        return None
+
+
+def file_sha256(path):
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(1 << 20), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def read_manifest(version_dir):
+    """A version's manifest, or None for versions published without one"""
+    try:
+        with open(os.path.join(version_dir, MANIFEST_FILE)) as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return None
+
+
+def write_manifest(version_dir):
+    """Describe every file in a complete version directory in its manifest.json"""
+    metadata = load_metadata(os.path.join(version_dir, MODEL_FILE))
+    with open(os.path.join(version_dir, CLASS_NAMES_FILE)) as f:
+        class_names = [line.strip() for line in f if line.strip()]
+
+    artifacts = {}
+    for root, dirs, files in os.walk(version_dir):
+        dirs.sort()
+        for name in sorted(files):
+            path = os.path.join(root, name)
+            relative = os.path.relpath(path, version_dir).replace(os.sep, '/')
+            if relative != MANIFEST_FILE:
+                artifacts[relative] = {'size': os.path.getsize(path), 'sha256': file_sha256(path)}
+
+    manifest = {
+        'format': MANIFEST_FORMAT,
+        'class_names': class_names,
+        'input_size': list(metadata['input_size']),
+        'backbone': metadata['backbone'],
+        'alpha': metadata['alpha'],
+        'preprocessing': PREPROCESSING,
+        'artifacts': artifacts,
+    }
+    path = os.path.join(version_dir, MANIFEST_FILE)
+    with open(f"{path}.tmp", 'w') as f:
+        json.dump(manifest, f, indent=2)
+    os.replace(f"{path}.tmp", path)
+    return manifest
+
+
+def verify_artifact(path):
+    """
+    Check a model file or export directory against the manifest of the
+    version it belongs to; raise ValueError if it was modified or truncated.
+    Artifacts outside a version with a manifest are not checked.
+    """
+    path = os.path.abspath(path)
+    manifest = read_manifest(os.path.dirname(path))
+    if manifest is None:
+        return
+    name = os.path.basename(path)
+    for relative, expected in manifest['artifacts'].items():
+        if relative != name and not relative.startswith(f"{name}/"):
+            continue
+        file_path = os.path.join(os.path.dirname(path), *relative.split('/'))
+        if not os.path.exists(file_path) or os.path.getsize(file_path) != expected['size'] \
+                or file_sha256(file_path) != expected['sha256']:
+            raise ValueError(f"'{file_path}' doesn't match its version's {MANIFEST_FILE}: "
+                             "the model is corrupt or was changed after publishing")
+
+
+def new_version():
+    stamp = time.strftime('%Y%m%d-%H%M%S')
+    suffix = hashlib.sha1(f"{stamp}-{os.getpid()}-{time.perf_counter_ns()}".encode()).hexdigest()[:6]
+    return f"{stamp}-{suffix}"
+
+
+def begin_version(models_dir=MODELS_DIR):
+    """Create a staging directory and return (version, staging_dir)"""
+    version = new_version()
+    staging_dir = os.path.join(models_dir, f".staging-{version}")
+    os.makedirs(staging_dir)
+    return version, staging_dir
+
+
+def publish_version(models_dir, version, staging_dir):
+    """Move a completed staging directory into place and point CURRENT at it"""
+    write_manifest(staging_dir)
+    final_dir = os.path.join(models_dir, version)
+    os.replace(staging_dir, final_dir)
+
+    tmp_pointer = os.path.join(models_dir, f".{POINTER_FILE}.{version}.tmp")
+    with open(tmp_pointer, 'w') as f:
+        f.write(version + '\n')
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp_pointer, os.path.join(models_dir, POINTER_FILE))
+    print(f"Published model version {version} to {final_dir}")
+    return final_dir
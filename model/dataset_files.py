@@ -0,0 +1,51 @@
+"""
+Dataset file listing and train/validation splitting.
+Kept free of TensorFlow so lightweight tools can reuse the same split.
+"""
+
+import json
+import os
+import numpy as np
+
+IMAGE_EXTENSIONS = ('.jpg', '.jpeg', '.png', '.bmp', '.gif')
+
+
+def list_image_files(data_dir):
+    """Return (paths, labels, class_names) for a dataset/<class>/ tree"""
+    class_names = sorted(
+        d for d in os.listdir(data_dir) if os.path.isdir(os.path.join(data_dir, d))
+    )
+    paths, labels = [], []
+    for label, name in enumerate(class_names):
+        class_dir = os.path.join(data_dir, name)
+        for dirpath, _, filenames in sorted(os.walk(class_dir)):
+            for filename in sorted(filenames):
+                if filename.lower().endswith(IMAGE_EXTENSIONS):
+                    paths.append(os.path.join(dirpath, filename))
+                    labels.append(label)
+    return paths, np.array(labels, dtype=np.int32), class_names
+
+
+def split_files(paths, labels, validation_split=0.2, seed=123):
+    """Shuffle with a fixed seed and hold out the last fraction for validation"""
+    order = np.arange(len(paths))
+    np.random.RandomState(seed).shuffle(order)
+    num_val = int(validation_split * len(paths))
+    train_idx, val_idx = order[:len(order) - num_val], order[len(order) - num_val:]
+    return (
+        ([paths[i] for i in train_idx], labels[train_idx]),
+        ([paths[i] for i in val_idx], labels[val_idx]),
+    )
+
+
+def load_split_manifest(manifest_path, data_dir):
+    """Return ((train_paths, train_labels), (val_paths, val_labels), class_names) from model/dedup.py output"""
+    with open(manifest_path) as f:
+        manifest = json.load(f)
+
+    def split(name):
+        entries = manifest[name]
+        paths = [os.path.join(data_dir, *e['path'].split('/')) for e in entries]
+        return paths, np.array([e['label'] for e in entries], dtype=np.int32)
+
+    return split('train'), split('val'), manifest['class_names']
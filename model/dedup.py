@@ -0,0 +1,234 @@
+"""
+Near-duplicate detection and deduplicated train/val split manifests.
+
+Every image gets a 64-bit difference hash (dHash), kept in an incremental
+index next to its (size, mtime), so reruns only hash new or changed files.
+Images whose hashes are within --threshold bits of each other are grouped
+into clusters (single linkage), and a split manifest is written:
+
+  - each cluster keeps one image, the largest file (--keep-duplicates keeps all)
+  - a whole cluster goes to train or val, so copies never leak across the split
+  - clusters that contain more than one label are flagged and left out
+
+    python model/dedup.py --data-dir dataset --out split_manifest.json
+    python model/train_simple.py --split-manifest split_manifest.json
+
+A cluster's split depends only on a hash of its first relative path, like the
+shard assignment in shard_dataset.py, so adding images doesn't reshuffle it.
+"""
+
+import argparse
+import hashlib
+import json
+import os
+from concurrent.futures import ThreadPoolExecutor
+import numpy as np
+from PIL import Image
+from dataset_files import list_image_files
+
+DEFAULT_INDEX_PATH = '.dedup_index.json'
+INDEX_VERSION = 1
+MANIFEST_VERSION = 1
+
+_POPCOUNT8 = np.array([bin(i).count('1') for i in range(256)], dtype=np.uint8)
+
+
+def dhash(path, hash_size=8):
+    """64-bit difference hash: sign of horizontal gradients on a 9x8 grayscale thumbnail"""
+    with Image.open(path) as image:
+        # JPEGs decode straight to a reduced scale; the hash only needs a thumbnail
+        image.draft('L', (hash_size * 8, hash_size * 8))
+        small = image.convert('L').resize((hash_size + 1, hash_size), Image.Resampling.BOX)
+    pixels = np.asarray(small, dtype=np.int16)
+    bits = (pixels[:, 1:] > pixels[:, :-1]).flatten()
+    return int.from_bytes(np.packbits(bits).tobytes(), 'big')
+
+
+def popcount(x):
+    """Set bits per element of a uint64 array"""
+    if hasattr(np, 'bitwise_count'):
+        return np.bitwise_count(x)
+    x = np.ascontiguousarray(x)
+    return _POPCOUNT8[x.view(np.uint8)].reshape(x.shape + (8,)).sum(axis=-1)
+
+
+def near_duplicate_pairs(hashes, threshold=6, block=2048):
+    """
+    All (i, j), i < j, whose hashes differ in at most `threshold` bits.
+
+    Exact, without comparing every pair: the 64 bits are split into
+    threshold + 1 bands, and two hashes that close must agree exactly on at
+    least one band (pigeonhole). Only images sharing a band value are
+    compared, with a vectorized XOR + popcount.
+    """
+    hashes = np.asarray(hashes, dtype=np.uint64)
+    bands = min(threshold + 1, 64)
+    edges = np.linspace(0, 64, bands + 1).astype(int)
+    found = [np.empty((0, 2), dtype=np.int64)]
+    for lo, hi in zip(edges[:-1], edges[1:]):
+        mask = np.uint64((1 << (hi - lo)) - 1)
+        keys = (hashes >> np.uint64(lo)) & mask
+        order = np.argsort(keys, kind='stable')
+        starts = np.flatnonzero(np.diff(keys[order], prepend=~keys[order[:1]]))
+        ends = np.append(starts[1:], len(order))
+        for start, end in zip(starts, ends):
+            if end - start < 2:
+                continue
+            members = order[start:end]
+            for row in range(0, len(members), block):
+                rows = members[row:row + block]
+                distance = popcount(hashes[rows, None] ^ hashes[None, members])
+                i, j = np.nonzero(distance <= threshold)
+                keep = rows[i] < members[j]
+                found.append(np.stack([rows[i][keep], members[j][keep]], axis=1))
+    return np.unique(np.concatenate(found), axis=0)
+
+
+def clusters_from_pairs(count, pairs):
+    """Connected components of the duplicate graph, as sorted index lists (singletons omitted)"""
+    parent = list(range(count))
+
+    def find(i):
+        while parent[i] != i:
+            parent[i] = parent[parent[i]]
+            i = parent[i]
+        return i
+
+    for i, j in pairs:
+        root_i, root_j = find(int(i)), find(int(j))
+        if root_i != root_j:
+            parent[max(root_i, root_j)] = min(root_i, root_j)
+
+    groups = {}
+    for i in range(count):
+        groups.setdefault(find(i), []).append(i)
+    return [members for members in groups.values() if len(members) > 1]
+
+
+def _read_index(index_path):
+    if not os.path.exists(index_path):
+        return {}
+    with open(index_path) as f:
+        index = json.load(f)
+    return index['entries'] if index.get('version') == INDEX_VERSION else {}
+
+
+def update_hash_index(data_dir, index_path=DEFAULT_INDEX_PATH, workers=8):
+    """
+    Hash new or changed images and drop deleted ones.
+    Returns (relpaths, labels, class_names, hashes as uint64 array).
+    """
+    paths, labels, class_names = list_image_files(data_dir)
+    old = _read_index(index_path)
+
+    entries, pending = {}, []
+    for path in paths:
+        relpath = os.path.relpath(path, data_dir).replace(os.sep, '/')
+        stat = os.stat(path)
+        entry = old.get(relpath)
+        if entry and entry['size'] == stat.st_size and entry['mtime_ns'] == stat.st_mtime_ns:
+            entries[relpath] = entry
+        else:
+            entries[relpath] = {'size': stat.st_size, 'mtime_ns': stat.st_mtime_ns}
+            pending.append((relpath, path))
+
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        for (relpath, _), value in zip(pending, executor.map(lambda item: dhash(item[1]), pending)):
+            entries[relpath]['dhash'] = f"{value:016x}"
+
+    tmp_path = f"{index_path}.tmp"
+    with open(tmp_path, 'w') as f:
+        json.dump({'version': INDEX_VERSION, 'entries': entries}, f)
+    os.replace(tmp_path, index_path)
+    print(f"Hash index: {len(entries)} images, {len(pending)} hashed")
+
+    relpaths = list(entries)
+    hashes = np.array([int(entries[r]['dhash'], 16) for r in relpaths], dtype=np.uint64)
+    return relpaths, labels, class_names, hashes
+
+
+def _is_val(group_key, validation_split):
+    h = int(hashlib.sha1(group_key.encode()).hexdigest(), 16)
+    return (h % 1000) < validation_split * 1000
+
+
+def build_manifest(relpaths, labels, class_names, hashes, sizes, threshold=6,
+                   validation_split=0.2, keep_duplicates=False):
+    """Deduplicated, group-aware split manifest as a dict"""
+    pairs = near_duplicate_pairs(hashes, threshold)
+    clusters = clusters_from_pairs(len(relpaths), pairs)
+    clustered = {i for members in clusters for i in members}
+    groups = clusters + [[i] for i in range(len(relpaths)) if i not in clustered]
+
+    manifest = {
+        'version': MANIFEST_VERSION,
+        'class_names': class_names,
+        'threshold': threshold,
+        'validation_split': validation_split,
+        'train': [], 'val': [], 'duplicates': [], 'conflicts': [],
+    }
+    for members in groups:
+        member_labels = {int(labels[i]) for i in members}
+        if len(member_labels) > 1:
+            manifest['conflicts'].append(
+                [{'path': relpaths[i], 'label': class_names[labels[i]]} for i in members]
+            )
+            continue
+        if keep_duplicates:
+            kept = members
+        else:
+            kept = [min(members, key=lambda i: (-sizes[i], relpaths[i]))]
+        if len(members) > 1:
+            manifest['duplicates'].append({
+                'kept': [relpaths[i] for i in kept],
+                'dropped': [relpaths[i] for i in members if i not in kept],
+                'all': [relpaths[i] for i in members],
+            })
+        split = 'val' if _is_val(min(relpaths[i] for i in members), validation_split) else 'train'
+        manifest[split].extend({'path': relpaths[i], 'label': int(labels[i])} for i in kept)
+
+    for split in ('train', 'val'):
+        manifest[split].sort(key=lambda e: e['path'])
+    return manifest
+
+
+def write_manifest(manifest, path):
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, 'w') as f:
+        json.dump(manifest, f, indent=1)
+    os.replace(tmp_path, path)
+
+
+def print_report(manifest):
+    duplicates = manifest['duplicates']
+    dropped = sum(len(d['dropped']) for d in duplicates)
+    conflicted = sum(len(c) for c in manifest['conflicts'])
+    print(f"{len(duplicates)} near-duplicate clusters ({dropped} images dropped), "
+          f"{len(manifest['conflicts'])} clusters with conflicting labels ({conflicted} images left out)")
+    for cluster in manifest['conflicts']:
+        print("  conflict: " + ", ".join(f"{e['path']} [{e['label']}]" for e in cluster))
+    for duplicate in duplicates:
+        print("  duplicates: " + ", ".join(duplicate['all']))
+    print(f"Split: {len(manifest['train'])} train, {len(manifest['val'])} val")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Find near-duplicate images and write a deduplicated split manifest")
+    parser.add_argument('--data-dir', default='dataset')
+    parser.add_argument('--out', default='split_manifest.json', help="Split manifest to write")
+    parser.add_argument('--index', default=DEFAULT_INDEX_PATH, help="Incremental hash index")
+    parser.add_argument('--threshold', type=int, default=6,
+                        help="Max differing hash bits (out of 64) for two images to count as duplicates")
+    parser.add_argument('--validation-split', type=float, default=0.2)
+    parser.add_argument('--keep-duplicates', action='store_true',
+                        help="Keep every copy, only forcing each cluster into a single split")
+    parser.add_argument('--workers', type=int, default=8, help="Hashing threads")
+    args = parser.parse_args()
+
+    relpaths, labels, class_names, hashes = update_hash_index(args.data_dir, args.index, args.workers)
+    sizes = [os.path.getsize(os.path.join(args.data_dir, r)) for r in relpaths]
+    manifest = build_manifest(relpaths, labels, class_names, hashes, sizes, args.threshold,
+                              args.validation_split, args.keep_duplicates)
+    write_manifest(manifest, args.out)
+    print_report(manifest)
+    print(f"Wrote {args.out}")
@@ -0,0 +1,129 @@
+"""
+Data-parallel training across local worker processes.
+
+`python model/train_simple.py --workers 8` starts eight copies of the
+training script on this machine, wired together with TF_CONFIG into one
+MultiWorkerMirroredStrategy cluster on localhost. Each worker:
+
+  - pins its TensorFlow thread pools (intra-op defaults to cores / workers,
+    so the processes don't oversubscribe the CPU)
+  - reads its own slice of every global batch (tf.data auto-sharding)
+  - all-reduces gradients with the other workers after each step
+
+The global batch is the per-worker batch times the number of workers, and
+the learning rate is scaled linearly with it. Worker 0 is the chief: only
+it saves the model and writes the throughput log.
+"""
+
+import json
+import os
+import socket
+import subprocess
+import sys
+import time
+import tensorflow as tf
+from tensorflow import keras
+
+
+def _free_ports(count):
+    sockets = [socket.socket() for _ in range(count)]
+    for s in sockets:
+        s.bind(('localhost', 0))
+    ports = [s.getsockname()[1] for s in sockets]
+    for s in sockets:
+        s.close()
+    return ports
+
+
+def default_threads(num_workers):
+    """(intra_op, inter_op) thread counts that split this machine's cores evenly"""
+    cores = os.cpu_count() or 1
+    return max(1, cores // num_workers), 2
+
+
+def configure_threads(intra_op, inter_op):
+    """Must run before TensorFlow executes its first op"""
+    tf.config.threading.set_intra_op_parallelism_threads(intra_op)
+    tf.config.threading.set_inter_op_parallelism_threads(inter_op)
+
+
+def launch_local_workers(num_workers, argv, script=None):
+    """
+    Run `script argv --worker-index i` once per worker with a shared
+    localhost TF_CONFIG and wait for all of them. Raises if any worker fails.
+    """
+    script = script or os.path.abspath(sys.argv[0])
+    cluster = {'worker': [f"localhost:{port}" for port in _free_ports(num_workers)]}
+    processes = []
+    for index in range(num_workers):
+        env = dict(os.environ, TF_CONFIG=json.dumps({
+            'cluster': cluster, 'task': {'type': 'worker', 'index': index},
+        }))
+        # One CPU-only process per worker; GPUs would be shared otherwise
+        env.setdefault('CUDA_VISIBLE_DEVICES', '')
+        processes.append(subprocess.Popen(
+            [sys.executable, script] + list(argv) + ['--worker-index', str(index)], env=env
+        ))
+
+    failed = [i for i, process in enumerate(processes) if process.wait() != 0]
+    if failed:
+        for process in processes:
+            if process.poll() is None:
+                process.kill()
+        raise RuntimeError(f"Training workers {failed} failed")
+
+
+def worker_strategy():
+    """MultiWorkerMirroredStrategy for the cluster described by TF_CONFIG"""
+    options = tf.distribute.experimental.CommunicationOptions(
+        implementation=tf.distribute.experimental.CommunicationImplementation.RING
+    )
+    return tf.distribute.MultiWorkerMirroredStrategy(communication_options=options)
+
+
+def is_chief():
+    config = json.loads(os.environ.get('TF_CONFIG', '{}'))
+    return config.get('task', {}).get('index', 0) == 0
+
+
+def shard_by_data(dataset):
+    """
+    Split every batch across workers. image_dataset_from_directory has no
+    per-file structure tf.data can shard on, so shard by element.
+    """
+    options = tf.data.Options()
+    options.experimental_distribute.auto_shard_policy = tf.data.experimental.AutoShardPolicy.DATA
+    return dataset.with_options(options)
+
+
+class ThroughputLogger(keras.callbacks.Callback):
+    """Records global samples/sec per epoch and optionally writes them as JSON"""
+
+    def __init__(self, global_batch_size, num_workers=1, log_path=None):
+        super().__init__()
+        self.global_batch_size = global_batch_size
+        self.num_workers = num_workers
+        self.log_path = log_path
+        self.epochs = []
+
+    def on_epoch_begin(self, epoch, logs=None):
+        self._start = time.perf_counter()
+        self._steps = 0
+
+    def on_train_batch_end(self, batch, logs=None):
+        self._steps += 1
+
+    def on_epoch_end(self, epoch, logs=None):
+        elapsed = time.perf_counter() - self._start
+        samples_per_sec = self._steps * self.global_batch_size / elapsed
+        self.epochs.append({'epoch': epoch, 'seconds': elapsed, 'samples_per_sec': samples_per_sec})
+        print(f"  epoch time {elapsed:.1f}s, {samples_per_sec:.1f} samples/sec across {self.num_workers} worker(s)")
+
+    def on_train_end(self, logs=None):
+        if self.log_path and is_chief():
+            with open(self.log_path, 'w') as f:
+                json.dump({
+                    'workers': self.num_workers,
+                    'global_batch_size': self.global_batch_size,
+                    'epochs': self.epochs,
+                }, f, indent=2)
@@ -0,0 +1,132 @@
+"""
+Export trained models to lighter inference formats.
+
+    python model/export.py --tflite
+
+writes waste_classifier_model_float16.tflite and
+waste_classifier_model_int8.tflite next to the Keras model. The int8
+model is calibrated on a representative subset of dataset/.
+
+    python model/export.py --savedmodel
+
+writes waste_classifier_model_savedmodel/, an inference-only graph with the
+augmentation and Dropout layers removed and a `serve` function that takes
+uint8 images of any batch size.
+
+If a cascade first stage (waste_classifier_model_fast.h5) sits next to the
+model, it is exported the same way so cascades work with every backend.
+"""
+
+import argparse
+import os
+import random
+import tensorflow as tf
+from artifacts import MODEL_FILE, fast_model_path, savedmodel_path, tflite_path
+from dataset_files import list_image_files
+from simple_classifier import create_inference_model
+
+
+def representative_paths(data_dir, num_samples=100, seed=123):
+    """Sample images evenly across class folders for int8 calibration"""
+    all_paths, labels, class_names = list_image_files(data_dir)
+    per_class = {name: [] for name in class_names}
+    for path, label in zip(all_paths, labels):
+        per_class[class_names[label]].append(path)
+
+    rng = random.Random(seed)
+    quota = max(1, num_samples // max(1, len(per_class)))
+    paths = []
+    for files in per_class.values():
+        paths.extend(rng.sample(files, min(quota, len(files))))
+    return paths
+
+
+def _representative_dataset(paths, img_size):
+    def generator():
+        for path in paths:
+            img = tf.io.decode_image(tf.io.read_file(path), channels=3, expand_animations=False)
+            img = tf.image.resize(img, img_size)
+            yield [tf.expand_dims(tf.cast(img, tf.float32), 0)]
+    return generator
+
+
+def export_tflite(model, model_path, data_dir='dataset', num_calibration=100):
+    """
+    Write float16 and int8 post-training-quantized TFLite models.
+    Returns {variant: path}.
+    """
+    height, width = model.input_shape[1:3]
+    img_size = (height, width)
+    outputs = {}
+
+    converter = tf.lite.TFLiteConverter.from_keras_model(model)
+    converter.optimizations = [tf.lite.Optimize.DEFAULT]
+    converter.target_spec.supported_types = [tf.float16]
+    outputs['float16'] = converter.convert()
+
+    calibration = representative_paths(data_dir, num_calibration)
+    print(f"Calibrating int8 model on {len(calibration)} images...")
+    converter = tf.lite.TFLiteConverter.from_keras_model(model)
+    converter.optimizations = [tf.lite.Optimize.DEFAULT]
+    converter.representative_dataset = _representative_dataset(calibration, img_size)
+    converter.target_spec.supported_ops = [tf.lite.OpsSet.TFLITE_BUILTINS_INT8]
+    outputs['int8'] = converter.convert()
+
+    paths = {}
+    for variant, flatbuffer in outputs.items():
+        path = tflite_path(model_path, variant)
+        with open(path, 'wb') as f:
+            f.write(flatbuffer)
+        print(f"Saved {variant} TFLite model to {path} ({len(flatbuffer) / 1e6:.1f} MB)")
+        paths[variant] = path
+    return paths
+
+
+class InferenceModule(tf.Module):
+    """SavedModel wrapper exposing a single traced `serve` function"""
+
+    def __init__(self, model):
+        super().__init__()
+        self.model = model
+        height, width, channels = model.input_shape[1:]
+        self.serve = tf.function(
+            self._serve,
+            input_signature=[tf.TensorSpec([None, height, width, channels], tf.uint8, name='images')]
+        )
+
+    def _serve(self, images):
+        # MobileNetV2 rescaling to [-1, 1], fused into the input of the graph
+        x = tf.cast(images, tf.float32) * (1. / 127.5) - 1.
+        return {'probabilities': self.model(x, training=False)}
+
+
+def export_savedmodel(model, model_path):
+    """
+    Save an inference-only SavedModel next to the Keras model.
+    The Keras training model itself is left untouched.
+    """
+    export_dir = savedmodel_path(model_path)
+    module = InferenceModule(create_inference_model(model))
+    tf.saved_model.save(module, export_dir, signatures={'serving_default': module.serve})
+    print(f"Saved inference SavedModel to {export_dir}")
+    return export_dir
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Export the trained model for inference")
+    parser.add_argument('--model', default=MODEL_FILE)
+    parser.add_argument('--data-dir', default='dataset')
+    parser.add_argument('--tflite', action='store_true', help="Write float16 and int8 TFLite models")
+    parser.add_argument('--savedmodel', action='store_true', help="Write the inference-only SavedModel")
+    parser.add_argument('--calibration-images', type=int, default=100)
+    args = parser.parse_args()
+
+    model_paths = [args.model]
+    if os.path.exists(fast_model_path(args.model)):
+        model_paths.append(fast_model_path(args.model))
+    for model_path in model_paths:
+        model = tf.keras.models.load_model(model_path)
+        if args.tflite:
+            export_tflite(model, model_path, args.data_dir, args.calibration_images)
+        if args.savedmodel:
+            export_savedmodel(model, model_path)
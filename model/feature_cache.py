@@ -0,0 +1,118 @@
+"""
+On-disk cache of frozen-backbone embeddings.
+
+The MobileNetV2 base is frozen, so its output for a given image never
+changes. We compute the pooled embedding once per image (plus a fixed
+number of augmented views) and store it under
+
+    <cache_dir>/<model_version>/<sha256 of file bytes>.npy
+
+Each file holds an array of shape (1 + num_views, feature_dim): row 0 is
+the clean image, the remaining rows are augmented views. Changed images get
+a new hash, and a new backbone or view count gets a new version directory,
+so stale entries are never reused.
+"""
+
+import hashlib
+import os
+import numpy as np
+import tensorflow as tf
+from artifacts import FEATURE_CACHE_DIR as DEFAULT_CACHE_DIR
+from simple_classifier import create_augmentation, create_feature_extractor
+
+
+def model_version(input_shape=(224, 224, 3), num_views=4, alpha=1.0):
+    """Short identifier for the backbone + augmentation configuration"""
+    key = f"mobilenetv2|imagenet|{input_shape}|views={num_views}|tf={tf.__version__}"
+    if alpha != 1.0:
+        # Appended only for non-default widths so existing cache entries stay valid
+        key += f"|alpha={alpha}"
+    return hashlib.sha256(key.encode()).hexdigest()[:16]
+
+
+def file_hash(path):
+    with open(path, 'rb') as f:
+        return hashlib.sha256(f.read()).hexdigest()
+
+
+def decode_image(path, img_size=(224, 224)):
+    """Decode and resize exactly like image_dataset_from_directory"""
+    data = tf.io.read_file(path)
+    img = tf.io.decode_image(data, channels=3, expand_animations=False)
+    return tf.image.resize(img, img_size)
+
+
+class FeatureCache:
+    """Compute-once store of backbone embeddings keyed by content hash"""
+
+    def __init__(self, cache_dir=DEFAULT_CACHE_DIR, input_shape=(224, 224, 3), num_views=4, seed=123,
+                 alpha=1.0):
+        self.input_shape = input_shape
+        self.num_views = num_views
+        self.alpha = alpha
+        self.version = model_version(input_shape, num_views, alpha)
+        self.dir = os.path.join(cache_dir, self.version)
+        os.makedirs(self.dir, exist_ok=True)
+        self.seed = seed
+        self._extractor = None
+        self._augmentation = None
+
+    def _entry_path(self, digest):
+        return os.path.join(self.dir, f"{digest}.npy")
+
+    def _build_models(self):
+        if self._extractor is None:
+            tf.keras.utils.set_random_seed(self.seed)
+            self._extractor = create_feature_extractor(self.input_shape, self.alpha)
+            self._augmentation = create_augmentation()
+
+    def _compute(self, paths, batch_size):
+        """Return {path: (1 + num_views, feature_dim)} for uncached paths"""
+        self._build_models()
+        results = {}
+        for start in range(0, len(paths), batch_size):
+            chunk = paths[start:start + batch_size]
+            images = tf.stack([decode_image(p, self.input_shape[:2]) for p in chunk])
+
+            views = [self._extractor(images, training=False).numpy()]
+            for _ in range(self.num_views):
+                augmented = self._augmentation(images, training=True)
+                views.append(self._extractor(augmented, training=False).numpy())
+
+            stacked = np.stack(views, axis=1).astype(np.float32)
+            for path, features in zip(chunk, stacked):
+                results[path] = features
+        return results
+
+    def _save(self, digest, features):
+        # Write to a temp file then rename so a crash never leaves a torn entry
+        final_path = self._entry_path(digest)
+        tmp_path = f"{final_path}.{os.getpid()}.tmp"
+        with open(tmp_path, 'wb') as f:
+            np.save(f, features)
+        os.replace(tmp_path, final_path)
+
+    def features_for(self, paths, batch_size=32):
+        """
+        Return an array of shape (len(paths), 1 + num_views, feature_dim),
+        computing and caching embeddings only for new or changed images.
+        """
+        digests = [file_hash(p) for p in paths]
+        features = {}
+        missing = []
+        for path, digest in zip(paths, digests):
+            entry = self._entry_path(digest)
+            if os.path.exists(entry):
+                features[path] = np.load(entry)
+            else:
+                missing.append(path)
+
+        print(f"Feature cache: {len(paths) - len(missing)} cached, {len(missing)} to compute")
+        if missing:
+            computed = self._compute(missing, batch_size)
+            for path, digest in zip(paths, digests):
+                if path in computed:
+                    self._save(digest, computed[path])
+                    features[path] = computed[path]
+
+        return np.stack([features[p] for p in paths])
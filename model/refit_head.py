@@ -0,0 +1,258 @@
+"""
+Incremental refit of the classification head from operator corrections.
+
+Reads corrections/corrections.jsonl (written by corrections.py at the repo
+root), starts from the live model's head weights and refits only the Dense
+head on:
+
+  - the corrections added since the last published refit, weighted up
+  - a replay sample of older data (the dataset's training split plus
+    corrections already folded in), so the head doesn't forget it
+
+The MobileNetV2 backbone is frozen, so features come from the same on-disk
+FeatureCache that `train_simple.py --cached-features` uses; only images it
+hasn't seen go through the backbone. The refit head is scored against the
+current head on the validation split the live model was trained with (the
+version's split.json, else the default seeded split), and a new model
+version is published only if accuracy doesn't drop (by more than
+--tolerance). It ships with the same exports as the version it replaces.
+
+Meant to run in the background (the GUI starts it via corrections.start_refit):
+it lowers its own CPU priority and TensorFlow thread count.
+
+    python model/refit_head.py --corrections-dir corrections
+"""
+
+import argparse
+import json
+import os
+import shutil
+import time
+from contextlib import contextmanager
+import numpy as np
+
+# corrections.py at the repo root imports these
+CORRECTIONS_FILE = 'corrections.jsonl'
+STATE_FILE = 'refit_state.json'
+LOCK_FILE = 'refit.lock'
+
+
+def read_corrections(corrections_dir):
+    try:
+        with open(os.path.join(corrections_dir, CORRECTIONS_FILE), encoding='utf-8') as f:
+            return [json.loads(line) for line in f if line.strip()]
+    except FileNotFoundError:
+        return []
+
+
+def read_state(corrections_dir):
+    try:
+        with open(os.path.join(corrections_dir, STATE_FILE)) as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return {'consumed': 0, 'attempted': 0, 'history': []}
+
+
+def write_state(corrections_dir, state):
+    path = os.path.join(corrections_dir, STATE_FILE)
+    with open(f"{path}.tmp", 'w') as f:
+        json.dump(state, f, indent=2)
+    os.replace(f"{path}.tmp", path)
+
+
+@contextmanager
+def refit_lock(corrections_dir):
+    """
+    One refit at a time, through an OS lock on corrections/refit.lock. The
+    OS drops the lock when its process exits, so a crashed refit never
+    blocks the next one.
+    """
+    with open(os.path.join(corrections_dir, LOCK_FILE), 'a') as f:
+        try:
+            if os.name == 'nt':
+                import msvcrt
+                f.seek(0)
+                msvcrt.locking(f.fileno(), msvcrt.LK_NBLCK, 1)
+            else:
+                import fcntl
+                fcntl.flock(f.fileno(), fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except OSError:
+            raise SystemExit("A refit is already running")
+        try:
+            yield
+        finally:
+            if os.name == 'nt':
+                f.seek(0)
+                msvcrt.locking(f.fileno(), msvcrt.LK_UNLCK, 1)
+
+
+def labelled(records, corrections_dir, class_names):
+    """(paths, labels) for correction records, latest label per image"""
+    latest = {}
+    for record in records:
+        if record['label'] not in class_names:
+            print(f"Skipping correction with unknown label '{record['label']}'")
+            continue
+        latest[record['image']] = class_names.index(record['label'])
+    paths = [os.path.join(corrections_dir, *image.split('/')) for image in latest]
+    return paths, np.array(list(latest.values()), dtype=np.int32)
+
+
+def accuracy(head, features, labels):
+    return float((head.predict(features, verbose=0).argmax(axis=1) == labels).mean())
+
+
+def refit(corrections_dir, models_dir, data_dir, cache_dir, epochs=20, replay=256,
+          correction_weight=4.0, learning_rate=0.0005, tolerance=0.0, num_views=4, seed=123):
+    """Refit and maybe publish. Returns the new version, or None."""
+    from tensorflow import keras
+    from artifacts import (CLASS_NAMES_FILE, MANIFEST_FILE, MODEL_FILE, SPLIT_FILE, begin_version, current_version,
+                           load_metadata, publish_version, save_metadata, savedmodel_path, tflite_path)
+    from dataset_files import list_image_files, load_split_manifest, split_files
+    from export import export_savedmodel, export_tflite
+    from feature_cache import FeatureCache
+    from simple_classifier import compile_model, create_head_model, transfer_head_weights
+
+    records = read_corrections(corrections_dir)
+    state = read_state(corrections_dir)
+    if len(records) <= state['consumed']:
+        print("No new corrections")
+        return None
+
+    base_version = current_version(models_dir)
+    if base_version is None:
+        raise SystemExit(f"No published model in '{models_dir}' to refit")
+    base_dir = os.path.join(models_dir, base_version)
+    model_path = os.path.join(base_dir, MODEL_FILE)
+    with open(os.path.join(base_dir, CLASS_NAMES_FILE)) as f:
+        class_names = [line.strip() for line in f if line.strip()]
+    metadata = load_metadata(model_path)
+    input_size = tuple(metadata['input_size'])
+
+    new_paths, new_labels = labelled(records[state['consumed']:], corrections_dir, class_names)
+    old_paths, old_labels = labelled(records[:state['consumed']], corrections_dir, class_names)
+    if not new_paths:
+        print("No usable new corrections")
+        state['attempted'] = len(records)
+        write_state(corrections_dir, state)
+        return None
+    # Validate on the split the live model was trained with, never on its training images
+    split_path = os.path.join(base_dir, SPLIT_FILE)
+    if os.path.exists(split_path):
+        (train_paths, train_labels), (val_paths, val_labels), data_classes = \
+            load_split_manifest(split_path, data_dir)
+    else:
+        paths, labels, data_classes = list_image_files(data_dir)
+        (train_paths, train_labels), (val_paths, val_labels) = split_files(paths, labels)
+    if data_classes != class_names:
+        raise SystemExit(f"Classes in '{data_dir}' {data_classes} don't match model classes {class_names}")
+    if not val_paths:
+        raise SystemExit("Validation split is empty; can't check the refit before publishing")
+
+    rng = np.random.default_rng(seed)
+    pool_paths = list(train_paths) + old_paths
+    pool_labels = np.concatenate([train_labels, old_labels]).astype(np.int32)
+    chosen = rng.choice(len(pool_paths), min(replay, len(pool_paths)), replace=False)
+    replay_paths, replay_labels = [pool_paths[i] for i in chosen], pool_labels[chosen]
+    print(f"Refitting head of {base_version} on {len(new_paths)} new corrections "
+          f"+ {len(replay_paths)} replayed images")
+
+    cache = FeatureCache(cache_dir, input_shape=input_size + (3,), num_views=num_views,
+                         alpha=metadata['alpha'])
+    new_features = cache.features_for(new_paths)
+    replay_features = cache.features_for(replay_paths)
+    val_features = cache.features_for(val_paths)[:, 0]
+    feature_dim = val_features.shape[-1]
+
+    # Every view is a sample; corrections weigh more so a handful can move the head
+    x = np.concatenate([new_features.reshape(-1, feature_dim), replay_features.reshape(-1, feature_dim)])
+    y = np.concatenate([np.repeat(new_labels, new_features.shape[1]),
+                        np.repeat(replay_labels, replay_features.shape[1])])
+    weights = np.concatenate([np.full(len(new_labels) * new_features.shape[1], correction_weight),
+                              np.ones(len(replay_labels) * replay_features.shape[1])])
+
+    model = keras.models.load_model(model_path)
+    head = create_head_model(feature_dim, num_classes=len(class_names))
+    for name in ('head_dense', 'head_output'):
+        head.get_layer(name).set_weights(model.get_layer(name).get_weights())
+    compile_model(head, learning_rate)
+
+    before = accuracy(head, val_features, val_labels)
+    head.fit(x, y, sample_weight=weights, epochs=epochs, batch_size=32, shuffle=True, verbose=2)
+    after = accuracy(head, val_features, val_labels)
+
+    state['attempted'] = len(records)
+    entry = {
+        'time': time.strftime('%Y-%m-%dT%H:%M:%S'),
+        'base_version': base_version,
+        'new_corrections': len(new_paths),
+        'replayed': len(replay_paths),
+        'val_accuracy_before': before,
+        'val_accuracy_after': after,
+        'version': None,
+    }
+    print(f"Validation accuracy {before:.2%} -> {after:.2%}")
+    if after < before - tolerance:
+        print("Accuracy dropped; not publishing")
+        state['history'].append(entry)
+        write_state(corrections_dir, state)
+        return None
+
+    version, staging_dir = begin_version(models_dir)
+    save_path = os.path.join(staging_dir, MODEL_FILE)
+    transfer_head_weights(head, model)
+    model.save(save_path)
+    save_metadata(save_path, input_size, metadata['alpha'], metadata['backbone'])
+    shutil.copy2(os.path.join(base_dir, CLASS_NAMES_FILE), os.path.join(staging_dir, CLASS_NAMES_FILE))
+    # Ship the same exports as the base version, so every backend can load the
+    # new version: the full model's are redone from the refit model ...
+    if any(os.path.exists(tflite_path(model_path, variant)) for variant in ('float16', 'int8')):
+        export_tflite(model, save_path, data_dir)
+    if os.path.exists(savedmodel_path(model_path)):
+        export_savedmodel(model, save_path)
+    # ... and the rest (the cascade's unchanged first stage and its exports,
+    # the split) is carried over as is
+    for name in os.listdir(base_dir):
+        source, target = os.path.join(base_dir, name), os.path.join(staging_dir, name)
+        if name == MANIFEST_FILE or os.path.exists(target):
+            continue
+        if os.path.isdir(source):
+            shutil.copytree(source, target)
+        else:
+            shutil.copy2(source, target)
+    publish_version(models_dir, version, staging_dir)
+
+    entry['version'] = version
+    state['consumed'] = len(records)
+    state['history'].append(entry)
+    write_state(corrections_dir, state)
+    return version
+
+
+if __name__ == "__main__":
+    from artifacts import DATA_DIR, FEATURE_CACHE_DIR, MODELS_DIR
+
+    parser = argparse.ArgumentParser(description="Refit the classification head on operator corrections")
+    parser.add_argument('--corrections-dir', default='corrections')
+    parser.add_argument('--models-dir', default=MODELS_DIR)
+    parser.add_argument('--data-dir', default=DATA_DIR)
+    parser.add_argument('--cache-dir', default=FEATURE_CACHE_DIR, help="Backbone feature cache to reuse")
+    parser.add_argument('--epochs', type=int, default=20)
+    parser.add_argument('--replay', type=int, default=256, help="Older images replayed alongside the corrections")
+    parser.add_argument('--correction-weight', type=float, default=4.0,
+                        help="Sample weight of a correction relative to a replayed image")
+    parser.add_argument('--tolerance', type=float, default=0.0,
+                        help="Validation accuracy the refit may lose and still be published")
+    parser.add_argument('--threads', type=int, default=2, help="TensorFlow intra-op threads")
+    parser.add_argument('--nice', type=int, default=10, help="Added CPU niceness (POSIX)")
+    args = parser.parse_args()
+
+    # Stay out of the way of live classification
+    if hasattr(os, 'nice'):
+        os.nice(args.nice)
+    from distributed import configure_threads
+    configure_threads(args.threads, 1)
+
+    with refit_lock(args.corrections_dir):
+        refit(args.corrections_dir, args.models_dir, args.data_dir, args.cache_dir, epochs=args.epochs,
+              replay=args.replay, correction_weight=args.correction_weight, tolerance=args.tolerance)
@@ -0,0 +1,195 @@
+"""
+Sharded on-disk training dataset.
+
+Converts dataset/<class>/ into pre-resized uint8 TFRecord shards plus an
+index.json, so training can stream from disk at constant memory instead
+of holding the decoded dataset in RAM:
+
+    python model/shard_dataset.py --data-dir dataset --out shards
+    python model/train_simple.py --shards shards
+
+Each image is assigned to a split and shard by a hash of its relative
+path (or to the split given by a model/dedup.py manifest), so adding or
+deleting images only touches the shards they belong to.
+On rebuild, a shard is rewritten only if its list of (path, label, size,
+mtime) entries changed.
+"""
+
+import argparse
+import hashlib
+import json
+import os
+import tensorflow as tf
+from dataset_files import list_image_files, load_split_manifest
+
+INDEX_FILE = 'index.json'
+INDEX_VERSION = 1
+
+
+def _assign(relpath, num_shards, validation_split, split=None):
+    """Stable (split, shard, shards_in_split) for an image"""
+    h = int(hashlib.sha1(relpath.encode()).hexdigest(), 16)
+    if split is None:
+        split = 'val' if (h % 1000) < validation_split * 1000 else 'train'
+    count = num_shards if split == 'train' else max(1, num_shards // 4)
+    return split, (h // 1000) % count, count
+
+
+def _shard_name(split, shard, count):
+    return f"{split}-{shard:05d}-of-{count:05d}.tfrecord"
+
+
+def _decode_resize(path, label, img_size):
+    """Decode and resize exactly like image_dataset_from_directory"""
+    img = tf.io.decode_image(tf.io.read_file(path), channels=3, expand_animations=False)
+    img = tf.image.resize(img, img_size)
+    img = tf.cast(tf.clip_by_value(tf.round(img), 0, 255), tf.uint8)
+    return img, label
+
+
+def _write_shard(path, entries, data_dir, img_size):
+    files = [os.path.join(data_dir, e['path']) for e in entries]
+    labels = [e['label'] for e in entries]
+    ds = tf.data.Dataset.from_tensor_slices((files, labels)).map(
+        lambda path, label: _decode_resize(path, label, img_size),
+        num_parallel_calls=tf.data.AUTOTUNE
+    )
+
+    # Write to a temp file and rename so readers never see a partial shard
+    tmp_path = f"{path}.tmp"
+    with tf.io.TFRecordWriter(tmp_path) as writer:
+        for img, label in ds:
+            example = tf.train.Example(features=tf.train.Features(feature={
+                'image': tf.train.Feature(bytes_list=tf.train.BytesList(value=[img.numpy().tobytes()])),
+                'label': tf.train.Feature(int64_list=tf.train.Int64List(value=[int(label)])),
+            }))
+            writer.write(example.SerializeToString())
+    os.replace(tmp_path, path)
+
+
+def _read_index(shard_dir):
+    index_path = os.path.join(shard_dir, INDEX_FILE)
+    if not os.path.exists(index_path):
+        return None
+    with open(index_path) as f:
+        return json.load(f)
+
+
+def build_shards(data_dir, shard_dir, num_shards=16, img_size=(224, 224), validation_split=0.2,
+                 split_manifest=None):
+    """
+    Create or incrementally update the shards for `data_dir`.
+    With `split_manifest`, only the images it lists are written, in the
+    split it assigns. Returns the index dict.
+    """
+    os.makedirs(shard_dir, exist_ok=True)
+    if split_manifest:
+        (train_paths, train_labels), (val_paths, val_labels), class_names = \
+            load_split_manifest(split_manifest, data_dir)
+        paths, labels = train_paths + val_paths, list(train_labels) + list(val_labels)
+        splits = ['train'] * len(train_paths) + ['val'] * len(val_paths)
+    else:
+        paths, labels, class_names = list_image_files(data_dir)
+        splits = [None] * len(paths)
+
+    config = {
+        'version': INDEX_VERSION,
+        'img_size': list(img_size),
+        'num_shards': num_shards,
+        'validation_split': validation_split,
+        'class_names': class_names,
+    }
+
+    planned = {}
+    for path, label, split in zip(paths, labels, splits):
+        relpath = os.path.relpath(path, data_dir).replace(os.sep, '/')
+        split, shard, count = _assign(relpath, num_shards, validation_split, split)
+        stat = os.stat(path)
+        planned.setdefault(_shard_name(split, shard, count), []).append({
+            'path': relpath, 'label': int(label), 'size': stat.st_size, 'mtime_ns': stat.st_mtime_ns,
+        })
+
+    old = _read_index(shard_dir)
+    old_shards = old['shards'] if old and old.get('config') == config else {}
+
+    rebuilt = 0
+    shards = {}
+    for name in sorted(planned):
+        entries = sorted(planned[name], key=lambda e: e['path'])
+        shard_path = os.path.join(shard_dir, name)
+        if old_shards.get(name, {}).get('entries') != entries or not os.path.exists(shard_path):
+            _write_shard(shard_path, entries, data_dir, img_size)
+            rebuilt += 1
+        shards[name] = {'split': name.split('-')[0], 'count': len(entries), 'entries': entries}
+
+    # Shards that no longer have any images
+    for name in os.listdir(shard_dir):
+        if name.endswith('.tfrecord') and name not in shards:
+            os.remove(os.path.join(shard_dir, name))
+
+    index = {'config': config, 'shards': shards}
+    tmp_path = os.path.join(shard_dir, INDEX_FILE + '.tmp')
+    with open(tmp_path, 'w') as f:
+        json.dump(index, f)
+    os.replace(tmp_path, os.path.join(shard_dir, INDEX_FILE))
+
+    print(f"Shards: {len(shards)} total, {rebuilt} rebuilt, {len(paths)} images")
+    return index
+
+
+def load_sharded_dataset(shard_dir, batch_size=8, shuffle_buffer=1024, seed=123):
+    """
+    Stream (train_ds, val_ds, class_names) from shards with parallel reads,
+    shuffling and prefetching. Memory use is bounded by the shuffle buffer.
+    """
+    index = _read_index(shard_dir)
+    if index is None:
+        raise FileNotFoundError(f"No shard index in '{shard_dir}'. Run model/shard_dataset.py first.")
+
+    config = index['config']
+    height, width = config['img_size']
+    feature_spec = {
+        'image': tf.io.FixedLenFeature([], tf.string),
+        'label': tf.io.FixedLenFeature([], tf.int64),
+    }
+
+    def parse(record):
+        example = tf.io.parse_single_example(record, feature_spec)
+        img = tf.reshape(tf.io.decode_raw(example['image'], tf.uint8), (height, width, 3))
+        return tf.cast(img, tf.float32), tf.cast(example['label'], tf.int32)
+
+    def make(split, training):
+        files = sorted(
+            os.path.join(shard_dir, name)
+            for name, shard in index['shards'].items() if shard['split'] == split
+        )
+        ds = tf.data.Dataset.from_tensor_slices(tf.constant(files, dtype=tf.string))
+        if training:
+            ds = ds.shuffle(len(files), seed=seed, reshuffle_each_iteration=True)
+        ds = ds.interleave(
+            tf.data.TFRecordDataset,
+            cycle_length=tf.data.AUTOTUNE,
+            num_parallel_calls=tf.data.AUTOTUNE,
+            deterministic=not training
+        )
+        if training:
+            ds = ds.shuffle(shuffle_buffer, seed=seed, reshuffle_each_iteration=True)
+        ds = ds.map(parse, num_parallel_calls=tf.data.AUTOTUNE)
+        return ds.batch(batch_size).prefetch(tf.data.AUTOTUNE)
+
+    class_names = config['class_names']
+    print(f"Classes found: {class_names}")
+    return make('train', True), make('val', False), class_names
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Build sharded TFRecords from dataset/<class>/")
+    parser.add_argument('--data-dir', default='dataset')
+    parser.add_argument('--out', default='shards')
+    parser.add_argument('--num-shards', type=int, default=16)
+    parser.add_argument('--img-size', type=int, default=224)
+    parser.add_argument('--split-manifest', default=None, help="Use the split from model/dedup.py")
+    args = parser.parse_args()
+
+    build_shards(args.data_dir, args.out, args.num_shards, (args.img_size, args.img_size),
+                 split_manifest=args.split_manifest)
@@ -8,49 +8,152 @@ import tensorflow as tf
 from tensorflow import keras
 from tensorflow.keras import layers
 
-def create_simple_model(input_shape=(224, 224, 3), num_classes=2):
+
+def create_augmentation():
     """
-    Create a simple transfer learning model using MobileNetV2.
-    Works better with small datasets.
+    Random augmentation as model layers. Training now augments in the
+    tf.data pipeline instead (train_simple.augment_dataset, same ranges);
+    these layers remain for the feature cache and --augmentation model.
     """
-    # Load pre-trained MobileNetV2 (without top classification layer)
+    return keras.Sequential([
+        layers.RandomFlip("horizontal"),
+        layers.RandomRotation(0.2),
+        layers.RandomZoom(0.2),
+        layers.RandomContrast(0.2),
+    ], name='augmentation')
+
+
+def create_base_model(input_shape=(224, 224, 3), alpha=1.0):
+    """Frozen MobileNetV2 backbone (without top classification layer)"""
     base_model = keras.applications.MobileNetV2(
         input_shape=input_shape,
+        alpha=alpha,
         include_top=False,
         weights='imagenet'
     )
-    
-    # Freeze the base model
     base_model.trainable = False
-    
+    return base_model
+
+
+def add_classification_head(x, num_classes):
+    """Custom classification head on top of pooled backbone features"""
+    x = layers.Dropout(0.5)(x)
+    x = layers.Dense(64, activation='relu', name='head_dense')(x)
+    x = layers.Dropout(0.3)(x)
+    # Softmax stays in float32 under a mixed-precision policy
+    return layers.Dense(num_classes, activation='softmax', name='head_output', dtype='float32')(x)
+
+
+def compile_model(model, learning_rate=0.001, jit_compile=False):
+    model.compile(
+        optimizer=keras.optimizers.Adam(learning_rate=learning_rate),
+        loss='sparse_categorical_crossentropy',
+        metrics=['accuracy'],
+        jit_compile=jit_compile
+    )
+    return model
+
+
+def create_simple_model(input_shape=(224, 224, 3), num_classes=2, alpha=1.0, learning_rate=0.001,
+                        augment=True, jit_compile=False):
+    """
+    Create a simple transfer learning model using MobileNetV2.
+    Works better with small datasets. `alpha` is the MobileNetV2 width
+    multiplier; ImageNet weights exist for 96, 128, 160, 192 and 224 px
+    inputs and alpha 0.35, 0.5, 0.75, 1.0, 1.3 and 1.4.
+    With `augment=False` the augmentation layers are left out, for data
+    that is already augmented in the input pipeline. `jit_compile`
+    compiles the training step with XLA.
+    """
+    # Load pre-trained MobileNetV2 and freeze it
+    base_model = create_base_model(input_shape, alpha=alpha)
+
     # Build model with preprocessing layer
     inputs = layers.Input(shape=input_shape)
-    
+
     # Data augmentation
-    x = layers.RandomFlip("horizontal")(inputs)
-    x = layers.RandomRotation(0.2)(x)
-    x = layers.RandomZoom(0.2)(x)
-    x = layers.RandomContrast(0.2)(x)
-    
+    x = create_augmentation()(inputs) if augment else inputs
+
     # Rescale to [-1, 1] for MobileNetV2
     x = layers.Rescaling(scale=1./127.5, offset=-1)(x)
-    
+
     # Pre-trained base
     x = base_model(x, training=False)
-    
+
     # Custom classification head
     x = layers.GlobalAveragePooling2D()(x)
-    x = layers.Dropout(0.5)(x)
-    x = layers.Dense(64, activation='relu')(x)
-    x = layers.Dropout(0.3)(x)
-    outputs = layers.Dense(num_classes, activation='softmax')(x)
-    
+    outputs = add_classification_head(x, num_classes)
+
     model = keras.Model(inputs, outputs)
-    
-    model.compile(
-        optimizer=keras.optimizers.Adam(learning_rate=0.001),
-        loss='sparse_categorical_crossentropy',
-        metrics=['accuracy']
+    return compile_model(model, learning_rate, jit_compile)
+
+
+def create_fast_model(input_shape=(224, 224, 3), num_classes=2, stage_size=(96, 96), alpha=0.35,
+                      augment=True, jit_compile=False):
+    """
+    First stage of the confidence cascade: a MobileNetV2 with width 0.35
+    at 96x96, roughly 20x cheaper than the full model. It takes the same
+    224x224 input as the full model and downsamples in the graph, so both
+    stages share one preprocessing path.
+    """
+    base_model = create_base_model(stage_size + (3,), alpha=alpha)
+
+    inputs = layers.Input(shape=input_shape)
+    x = layers.Resizing(*stage_size, name='stage_resize')(inputs)
+    if augment:
+        x = create_augmentation()(x)
+    x = layers.Rescaling(scale=1./127.5, offset=-1)(x)
+    x = base_model(x, training=False)
+    x = layers.GlobalAveragePooling2D()(x)
+    outputs = add_classification_head(x, num_classes)
+
+    model = keras.Model(inputs, outputs, name='waste_classifier_fast')
+    return compile_model(model, jit_compile=jit_compile)
+
+
+def create_inference_model(model):
+    """
+    Rebuild a trained model without augmentation, Dropout or Rescaling.
+    The result expects inputs already scaled to [-1, 1] and shares its
+    weights with `model`.
+    """
+    skip = (
+        layers.InputLayer, layers.Dropout, layers.Rescaling,
+        layers.RandomFlip, layers.RandomRotation, layers.RandomZoom, layers.RandomContrast,
     )
-    
+    input_shape = model.input_shape[1:]
+    inputs = layers.Input(shape=input_shape, name='normalized_images')
+    x = inputs
+    for layer in model.layers:
+        if isinstance(layer, skip) or layer.name == 'augmentation':
+            continue
+        x = layer(x, training=False) if isinstance(layer, keras.Model) else layer(x)
+    return keras.Model(inputs, x, name='waste_classifier_inference')
+
+
+def create_feature_extractor(input_shape=(224, 224, 3), alpha=1.0):
+    """
+    Backbone-only model mapping raw [0, 255] images to pooled
+    MobileNetV2 embeddings. Used to precompute training features.
+    """
+    base_model = create_base_model(input_shape, alpha=alpha)
+    inputs = layers.Input(shape=input_shape)
+    x = layers.Rescaling(scale=1./127.5, offset=-1)(inputs)
+    x = base_model(x, training=False)
+    outputs = layers.GlobalAveragePooling2D()(x)
+    return keras.Model(inputs, outputs, name='feature_extractor')
+
+
+def create_head_model(feature_dim, num_classes=2):
+    """Classification head alone, trained on cached backbone features"""
+    inputs = layers.Input(shape=(feature_dim,))
+    outputs = add_classification_head(inputs, num_classes)
+    model = keras.Model(inputs, outputs, name='classification_head')
+    return compile_model(model)
+
+
+def transfer_head_weights(head_model, model):
+    """Copy trained head weights into a full model built by create_simple_model"""
+    for name in ('head_dense', 'head_output'):
+        model.get_layer(name).set_weights(head_model.get_layer(name).get_weights())
     return model
@@ -0,0 +1,149 @@
+"""
+Backbone / input resolution sweep.
+
+Trains one model per (input size, MobileNetV2 width) pair, then measures
+validation accuracy, CPU latency and model size for each and writes a
+report marking the Pareto front (no other configuration is both faster and
+at least as accurate):
+
+    python model/sweep.py --sizes 96 128 160 224 --alphas 0.35 0.5 1.0 --min-accuracy 0.9
+
+Each model is saved under <out>/<size>px_a<alpha>/ with its metadata and
+class names, so the chosen one can be used directly with --model.
+"""
+
+import argparse
+import json
+import os
+import time
+import numpy as np
+import tensorflow as tf
+from train_simple import load_dataset, predict_dataset, train
+from artifacts import MODEL_FILE
+
+
+def measure_latency(model, input_size, runs=50, batch_size=32):
+    """Single-image latency percentiles and batched throughput on random pixels"""
+    infer = tf.function(lambda x: model(x, training=False))
+    rng = np.random.default_rng(0)
+    single = tf.constant(rng.integers(0, 256, (1, input_size, input_size, 3)), dtype=tf.float32)
+    batch = tf.constant(rng.integers(0, 256, (batch_size, input_size, input_size, 3)), dtype=tf.float32)
+
+    # Trace both shapes before timing
+    infer(single)
+    infer(batch)
+
+    latencies = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        infer(single).numpy()
+        latencies.append(time.perf_counter() - start)
+
+    start = time.perf_counter()
+    for _ in range(5):
+        infer(batch).numpy()
+    throughput = 5 * batch_size / (time.perf_counter() - start)
+
+    latencies_ms = np.array(latencies) * 1000
+    return {
+        'p50_ms': round(float(np.percentile(latencies_ms, 50)), 3),
+        'p95_ms': round(float(np.percentile(latencies_ms, 95)), 3),
+        'throughput_img_s': round(throughput, 1),
+    }
+
+
+def pareto_front(results):
+    """Mark results no other result beats on both latency and accuracy"""
+    for result in results:
+        result['pareto'] = not any(
+            other['latency']['p50_ms'] <= result['latency']['p50_ms']
+            and other['accuracy'] >= result['accuracy']
+            and (other['latency']['p50_ms'] < result['latency']['p50_ms'] or other['accuracy'] > result['accuracy'])
+            for other in results
+        )
+    return results
+
+
+def cheapest_meeting(results, min_accuracy):
+    """Fastest configuration whose validation accuracy reaches the bar, or None"""
+    eligible = [r for r in results if r['accuracy'] >= min_accuracy]
+    return min(eligible, key=lambda r: r['latency']['p50_ms']) if eligible else None
+
+
+def write_markdown(results, recommended, min_accuracy, path):
+    lines = [
+        "# Backbone / resolution sweep",
+        "",
+        "| input | alpha | accuracy | p50 ms | p95 ms | img/s | size MB | params | Pareto |",
+        "|------:|------:|---------:|-------:|-------:|------:|--------:|-------:|:------:|",
+    ]
+    for r in sorted(results, key=lambda r: r['latency']['p50_ms']):
+        lines.append(
+            f"| {r['input_size']} | {r['alpha']} | {r['accuracy']:.2%} | {r['latency']['p50_ms']} "
+            f"| {r['latency']['p95_ms']} | {r['latency']['throughput_img_s']} | {r['model_size_mb']} "
+            f"| {r['params']:,} | {'✓' if r['pareto'] else ''} |"
+        )
+    lines.append("")
+    if recommended:
+        lines.append(
+            f"Cheapest model with accuracy ≥ {min_accuracy:.0%}: **{recommended['input_size']}px, "
+            f"alpha {recommended['alpha']}** (`{recommended['model_path']}`)"
+        )
+    else:
+        lines.append(f"No configuration reached {min_accuracy:.0%} validation accuracy.")
+    with open(path, 'w', encoding='utf-8') as f:
+        f.write('\n'.join(lines) + '\n')
+
+
+def run_sweep(data_dir, out_dir, sizes, alphas, epochs, runs, split_manifest=None):
+    results = []
+    for input_size in sizes:
+        for alpha in alphas:
+            config_dir = os.path.join(out_dir, f"{input_size}px_a{alpha}")
+            os.makedirs(config_dir, exist_ok=True)
+            model_path = os.path.join(config_dir, MODEL_FILE)
+            print(f"\n=== {input_size}px, alpha {alpha} ===")
+
+            model, _ = train(data_dir, epochs=epochs, save_path=model_path, input_size=input_size, alpha=alpha,
+                             split_manifest=split_manifest)
+            _, val_ds, _ = load_dataset(data_dir, (input_size, input_size), split_manifest=split_manifest)
+            probabilities, labels = predict_dataset(model, val_ds)
+
+            results.append({
+                'input_size': input_size,
+                'alpha': alpha,
+                'model_path': model_path,
+                'accuracy': float((probabilities.argmax(axis=1) == labels).mean()),
+                'latency': measure_latency(model, input_size, runs),
+                'model_size_mb': round(os.path.getsize(model_path) / 1e6, 2),
+                'params': int(model.count_params()),
+            })
+            tf.keras.backend.clear_session()
+    return pareto_front(results)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Sweep input size and backbone width")
+    parser.add_argument('--data-dir', default='dataset')
+    parser.add_argument('--out', default='sweep', help="Directory for the trained models and the report")
+    parser.add_argument('--sizes', type=int, nargs='+', default=[96, 128, 160, 224])
+    parser.add_argument('--alphas', type=float, nargs='+', default=[0.35, 0.5, 1.0])
+    parser.add_argument('--epochs', type=int, default=20)
+    parser.add_argument('--split-manifest', default=None, help="Use the deduplicated split from model/dedup.py")
+    parser.add_argument('--runs', type=int, default=50, help="Single-image latency samples per model")
+    parser.add_argument('--min-accuracy', type=float, default=0.9,
+                        help="Accuracy bar for the recommendation")
+    parser.add_argument('--gpu', action='store_true', help="Measure on GPU instead of CPU")
+    args = parser.parse_args()
+
+    if not args.gpu:
+        tf.config.set_visible_devices([], 'GPU')
+
+    results = run_sweep(args.data_dir, args.out, args.sizes, args.alphas, args.epochs, args.runs,
+                        args.split_manifest)
+    recommended = cheapest_meeting(results, args.min_accuracy)
+
+    with open(os.path.join(args.out, 'report.json'), 'w') as f:
+        json.dump({'min_accuracy': args.min_accuracy, 'recommended': recommended, 'results': results}, f, indent=2)
+    write_markdown(results, recommended, args.min_accuracy, os.path.join(args.out, 'report.md'))
+    print(f"\nReport written to {os.path.join(args.out, 'report.md')}")
@@ -3,59 +3,173 @@ Training script using transfer learning (MobileNetV2).
 Works better with small datasets.
 """
 
+import argparse
+import json
 import os
+import shutil
+import sys
+import time
+from contextlib import contextmanager, nullcontext
+import numpy as np
 import tensorflow as tf
 from tensorflow import keras
-from simple_classifier import create_simple_model
-
-def load_dataset(data_dir):
-    """Load images with heavy augmentation for small datasets"""
-    img_size = (224, 224)
-    batch_size = 8  # Smaller batch for small dataset
-    
-    # Load training data
-    train_ds = keras.utils.image_dataset_from_directory(
-        data_dir,
-        validation_split=0.2,
-        subset="training",
-        seed=123,
-        image_size=img_size,
-        batch_size=batch_size
+from simple_classifier import create_simple_model, create_fast_model, create_head_model, transfer_head_weights
+from feature_cache import DEFAULT_CACHE_DIR, FeatureCache
+from export import export_savedmodel, export_tflite
+from dataset_files import list_image_files, load_split_manifest, split_files
+from shard_dataset import build_shards, load_sharded_dataset
+from artifacts import (CLASS_NAMES_FILE, MODEL_FILE, MODELS_DIR, SPLIT_FILE, begin_version, cascade_config_path,
+                       fast_model_path, publish_version, save_metadata)
+from distributed import (ThroughputLogger, configure_threads, default_threads, is_chief,
+                         launch_local_workers, shard_by_data, worker_strategy)
+
+def augment_images(images, seed, rotation=0.2, zoom=0.2, contrast=0.2):
+    """
+    Random horizontal flip, rotation (up to `rotation` turns), zoom and
+    contrast for a float batch in [0, 255] - the ranges of the in-model
+    augmentation layers. Stateless: the same `seed` gives the same batch.
+    """
+    flip_seed, rotation_seed, zoom_seed, contrast_seed = tf.unstack(
+        tf.random.experimental.stateless_split(tf.reshape(seed, [2]), num=4)
     )
-    
-    # Load validation data
-    val_ds = keras.utils.image_dataset_from_directory(
-        data_dir,
-        validation_split=0.2,
-        subset="validation",
-        seed=123,
-        image_size=img_size,
-        batch_size=batch_size
+    shape = tf.shape(images)
+    n = shape[0]
+    cx = (tf.cast(shape[2], tf.float32) - 1) / 2
+    cy = (tf.cast(shape[1], tf.float32) - 1) / 2
+
+    flip = tf.random.stateless_uniform([n], flip_seed) < 0.5
+    images = tf.where(flip[:, None, None, None], tf.reverse(images, axis=[2]), images)
+
+    # Rotation and zoom about the centre, in a single resampling pass
+    angle = tf.random.stateless_uniform([n], rotation_seed, -rotation, rotation) * 2 * np.pi
+    scale = 1 + tf.random.stateless_uniform([n], zoom_seed, -zoom, zoom)
+    a0, a1 = scale * tf.cos(angle), -scale * tf.sin(angle)
+    b0, b1 = scale * tf.sin(angle), scale * tf.cos(angle)
+    zeros = tf.zeros([n])
+    transforms = tf.stack([a0, a1, cx - a0 * cx - a1 * cy,
+                           b0, b1, cy - b0 * cx - b1 * cy, zeros, zeros], axis=1)
+    images = tf.raw_ops.ImageProjectiveTransformV3(
+        images=images, transforms=transforms, output_shape=shape[1:3], fill_value=0.0,
+        interpolation='BILINEAR', fill_mode='REFLECT'
     )
+
+    factor = tf.random.stateless_uniform([n, 1, 1, 1], contrast_seed, 1 - contrast, 1 + contrast)
+    mean = tf.reduce_mean(images, axis=[1, 2], keepdims=True)
+    return tf.clip_by_value((images - mean) * factor + mean, 0.0, 255.0)
+
+def augment_dataset(ds, seed=123):
+    """
+    Augment batches as a parallel tf.data stage, so augmentation overlaps
+    the training step instead of running inside it. Each batch draws its
+    seed from a seeded random stream: runs are reproducible and every
+    epoch sees fresh augmentations.
+    """
+    seeds = tf.data.Dataset.random(seed=seed, rerandomize_each_iteration=True).batch(2)
+    return tf.data.Dataset.zip((seeds, ds)).map(
+        lambda batch_seed, batch: (augment_images(batch[0], batch_seed), batch[1]),
+        num_parallel_calls=tf.data.AUTOTUNE,
+        deterministic=True
+    )
+
+def load_files_dataset(paths, labels, img_size=(224, 224), batch_size=8, shuffle=False, seed=123):
+    """Decode and resize a list of files like image_dataset_from_directory"""
+    def decode(path, label):
+        img = tf.io.decode_image(tf.io.read_file(path), channels=3, expand_animations=False)
+        img.set_shape([None, None, 3])
+        return tf.image.resize(img, img_size), label
     
-    class_names = train_ds.class_names
-    print(f"Classes found: {class_names}")
-    
-    # Cache and prefetch for performance
-    train_ds = train_ds.cache().prefetch(buffer_size=tf.data.AUTOTUNE)
-    val_ds = val_ds.cache().prefetch(buffer_size=tf.data.AUTOTUNE)
-    
-    return train_ds, val_ds, class_names
+    ds = tf.data.Dataset.from_tensor_slices((paths, labels))
+    ds = ds.map(decode, num_parallel_calls=tf.data.AUTOTUNE).cache()
+    if shuffle:
+        ds = ds.shuffle(max(1, len(paths)), seed=seed, reshuffle_each_iteration=True)
+    return ds.batch(batch_size)
 
-def train(data_dir, epochs=50, save_path='waste_classifier_model.h5'):
+def load_dataset(data_dir, img_size=(224, 224), batch_size=8, split_manifest=None, augment=False, seed=123):
     """
-    Train using transfer learning.
-    More epochs needed for small datasets.
+    Load images with heavy augmentation for small datasets.
+    With `split_manifest` (from model/dedup.py), train and validate on the
+    deduplicated, group-aware split it lists instead of a random 80/20 split.
+    With `augment`, training batches go through augment_dataset after the
+    cache, so the cache holds clean images and augmentation runs in parallel.
     """
-    print("Loading dataset...")
-    train_ds, val_ds, class_names = load_dataset(data_dir)
+    if split_manifest:
+        (train_paths, train_labels), (val_paths, val_labels), class_names = \
+            load_split_manifest(split_manifest, data_dir)
+        print(f"Classes found: {class_names}")
+        print(f"Split manifest: {len(train_paths)} train, {len(val_paths)} val images")
+        train_ds = load_files_dataset(train_paths, train_labels, img_size, batch_size, shuffle=True, seed=seed)
+        val_ds = load_files_dataset(val_paths, val_labels, img_size, batch_size)
+    else:
+        # Load training data
+        train_ds = keras.utils.image_dataset_from_directory(
+            data_dir,
+            validation_split=0.2,
+            subset="training",
+            seed=123,
+            image_size=img_size,
+            batch_size=batch_size
+        )
+        
+        # Load validation data
+        val_ds = keras.utils.image_dataset_from_directory(
+            data_dir,
+            validation_split=0.2,
+            subset="validation",
+            seed=123,
+            image_size=img_size,
+            batch_size=batch_size
+        )
+        
+        class_names = train_ds.class_names
+        print(f"Classes found: {class_names}")
+        
+        # Cache decoded images for performance
+        train_ds = train_ds.cache()
+        val_ds = val_ds.cache()
     
-    print("\nCreating transfer learning model (MobileNetV2)...")
-    model = create_simple_model(num_classes=len(class_names))
-    model.summary()
+    if augment:
+        train_ds = augment_dataset(train_ds, seed)
     
-    # Callbacks
-    callbacks = [
+    return (train_ds.prefetch(buffer_size=tf.data.AUTOTUNE),
+            val_ds.prefetch(buffer_size=tf.data.AUTOTUNE),
+            class_names)
+
+def mixed_precision_policy():
+    """bfloat16 on CPU, where float16 is emulated and slower; float16 on GPU"""
+    return 'mixed_float16' if tf.config.list_physical_devices('GPU') else 'mixed_bfloat16'
+
+@contextmanager
+def float32_policy():
+    """Build models in float32 regardless of the global mixed-precision policy"""
+    previous = keras.mixed_precision.global_policy()
+    keras.mixed_precision.set_global_policy('float32')
+    try:
+        yield
+    finally:
+        keras.mixed_precision.set_global_policy(previous)
+
+def float32_copy(model, build):
+    """
+    Rebuild a mixed-precision model in float32 and copy its weights (the
+    variables are float32 already), so saved models infer in float32.
+    """
+    if model.compute_dtype == 'float32':
+        return model
+    with float32_policy():
+        copy = build()
+    copy.set_weights(model.get_weights())
+    return copy
+
+def save_class_names(class_names, save_path=MODEL_FILE):
+    """Write class_names.txt next to the saved model"""
+    path = os.path.join(os.path.dirname(save_path), CLASS_NAMES_FILE)
+    with open(path, 'w') as f:
+        for name in class_names:
+            f.write(f"{name}\n")
+
+
+def create_callbacks():
+    return [
         keras.callbacks.EarlyStopping(
             monitor='val_loss',
             patience=10,
@@ -69,6 +183,58 @@ def train(data_dir, epochs=50, save_path='waste_classifier_model.h5'):
             verbose=1
         )
     ]
+
+
+def train(data_dir, epochs=50, save_path=MODEL_FILE, shard_dir=None,
+          input_size=224, alpha=1.0, batch_size=8, strategy=None, throughput_log=None,
+          split_manifest=None, augmentation='pipeline', jit_compile=False):
+    """
+    Train using transfer learning.
+    More epochs needed for small datasets.
+    With `shard_dir`, the dataset is converted to (or incrementally updated
+    in) sharded TFRecords and streamed from disk instead of cached in RAM.
+    `input_size` (square, in pixels) and `alpha` (MobileNetV2 width) are
+    saved in the model metadata so inference resizes to match.
+    With a multi-worker `strategy`, `batch_size` is per worker: the global
+    batch and the learning rate are scaled by the number of workers.
+    `split_manifest` replaces the random split with one from model/dedup.py.
+    `augmentation` is 'pipeline' (parallel tf.data stage), 'model' (the
+    former in-model layers) or 'none'; `jit_compile` enables XLA.
+    """
+    img_size = (input_size, input_size)
+    num_workers = strategy.num_replicas_in_sync if strategy else 1
+    global_batch_size = batch_size * num_workers
+    chief = strategy is None or is_chief()
+
+    print("Loading dataset...")
+    if shard_dir:
+        # Under a strategy the launcher has already built the shards once
+        if strategy is None:
+            build_shards(data_dir, shard_dir, img_size=img_size, split_manifest=split_manifest)
+        train_ds, val_ds, class_names = load_sharded_dataset(shard_dir, global_batch_size)
+        if augmentation == 'pipeline':
+            train_ds = augment_dataset(train_ds).prefetch(tf.data.AUTOTUNE)
+    else:
+        train_ds, val_ds, class_names = load_dataset(data_dir, img_size, global_batch_size, split_manifest,
+                                                     augment=augmentation == 'pipeline')
+    if strategy is not None:
+        # Shard by element: the val split has only num_shards // 4 TFRecord
+        # files, too few for per-file sharding across every worker
+        train_ds, val_ds = shard_by_data(train_ds), shard_by_data(val_ds)
+    
+    print(f"\nCreating transfer learning model (MobileNetV2 alpha={alpha} @ {input_size}px, "
+          f"{keras.mixed_precision.global_policy().name}{', XLA' if jit_compile else ''})...")
+    def build():
+        return create_simple_model(img_size + (3,), num_classes=len(class_names), alpha=alpha,
+                                   learning_rate=0.001 * num_workers, augment=augmentation == 'model',
+                                   jit_compile=jit_compile)
+    with strategy.scope() if strategy else nullcontext():
+        model = build()
+    if chief:
+        model.summary()
+    
+    # Callbacks
+    callbacks = create_callbacks() + [ThroughputLogger(global_batch_size, num_workers, throughput_log)]
     
     print("\nTraining model...")
     print("Note: With only 6 images, accuracy will be limited!")
@@ -79,16 +245,19 @@ def train(data_dir, epochs=50, save_path='waste_classifier_model.h5'):
         validation_data=val_ds,
         epochs=epochs,
         callbacks=callbacks,
-        verbose=1
+        verbose=1 if chief else 0
     )
     
+    if not chief:
+        return model, history
+    
     print(f"\nSaving model to {save_path}...")
+    model = float32_copy(model, build)
     model.save(save_path)
+    save_metadata(save_path, img_size, alpha)
     
     # Save class names
-    with open('class_names.txt', 'w') as f:
-        for name in class_names:
-            f.write(f"{name}\n")
+    save_class_names(class_names, save_path)
     
     print("\n" + "="*60)
     print("Training complete!")
@@ -101,10 +270,258 @@ def train(data_dir, epochs=50, save_path='waste_classifier_model.h5'):
     
     return model, history
 
+def train_cached(data_dir, epochs=50, save_path=MODEL_FILE,
+                 num_views=4, cache_dir=None, batch_size=32, input_size=224, alpha=1.0,
+                 split_manifest=None):
+    """
+    Train only the classification head on cached backbone embeddings.
+    The backbone runs once per new or changed image; retraining after
+    that takes seconds.
+    """
+    print("Loading dataset...")
+    if split_manifest:
+        (train_paths, train_labels), (val_paths, val_labels), class_names = \
+            load_split_manifest(split_manifest, data_dir)
+        print(f"Classes found: {class_names}")
+    else:
+        paths, labels, class_names = list_image_files(data_dir)
+        print(f"Classes found: {class_names}")
+        (train_paths, train_labels), (val_paths, val_labels) = split_files(paths, labels)
+
+    img_size = (input_size, input_size)
+    cache = FeatureCache(cache_dir or DEFAULT_CACHE_DIR, input_shape=img_size + (3,),
+                         num_views=num_views, alpha=alpha)
+    train_features = cache.features_for(train_paths)
+    val_features = cache.features_for(val_paths)
+
+    # Every view (clean + augmented) is a training sample; validate on clean views only
+    feature_dim = train_features.shape[-1]
+    x_train = train_features.reshape(-1, feature_dim)
+    y_train = np.repeat(train_labels, train_features.shape[1])
+    x_val = val_features[:, 0]
+
+    print("\nTraining classification head on cached features...")
+    head = create_head_model(feature_dim, num_classes=len(class_names))
+    history = head.fit(
+        x_train, y_train,
+        validation_data=(x_val, val_labels),
+        epochs=epochs,
+        batch_size=batch_size,
+        shuffle=True,
+        callbacks=create_callbacks(),
+        verbose=1
+    )
+
+    # Assemble the full model so the app can load it unchanged
+    with float32_policy():
+        model = create_simple_model(img_size + (3,), num_classes=len(class_names), alpha=alpha, augment=False)
+    transfer_head_weights(head, model)
+
+    print(f"\nSaving model to {save_path}...")
+    model.save(save_path)
+    save_metadata(save_path, img_size, alpha)
+    save_class_names(class_names, save_path)
+
+    print(f"Final training accuracy: {history.history['accuracy'][-1]:.2%}")
+    print(f"Final validation accuracy: {history.history['val_accuracy'][-1]:.2%}")
+    return model, history
+
+def predict_dataset(model, dataset):
+    """Return (probabilities, labels) for every batch of a labelled dataset"""
+    probabilities, labels = [], []
+    for images, batch_labels in dataset:
+        probabilities.append(model.predict(images, verbose=0))
+        labels.append(batch_labels.numpy())
+    return np.concatenate(probabilities), np.concatenate(labels)
+
+
+def seconds_per_image(model, images, repeats=5):
+    """Best-of-N batch predict time divided by the batch size"""
+    model.predict(images, verbose=0)
+    best = float('inf')
+    for _ in range(repeats):
+        start = time.perf_counter()
+        model.predict(images, verbose=0)
+        best = min(best, time.perf_counter() - start)
+    return best / len(images)
+
+
+def choose_cascade_threshold(fast_probs, full_probs, labels, max_accuracy_drop=0.005):
+    """
+    Pick the lowest fast-model confidence threshold (i.e. the most early
+    exits) whose cascade accuracy stays within `max_accuracy_drop` of the
+    full model on the validation split. Returns (threshold, early_exit_rate,
+    cascade_accuracy).
+    """
+    confidence = fast_probs.max(axis=1)
+    fast_correct = fast_probs.argmax(axis=1) == labels
+    full_correct = full_probs.argmax(axis=1) == labels
+    target = full_correct.mean() - max_accuracy_drop
+
+    # Exiting the k most confident images early: fast answers those, full the rest
+    order = np.argsort(-confidence, kind='stable')
+    confidence = confidence[order]
+    fast_hits = np.concatenate([[0], np.cumsum(fast_correct[order])])
+    full_hits = np.concatenate([[0], np.cumsum(full_correct[order])])
+    accuracy = (fast_hits + full_hits[-1] - full_hits) / len(labels)
+
+    # Nothing exits early unless some threshold meets the target (max prob <= 1.0)
+    best = (1.01, 0.0, float(full_correct.mean()))
+    for k in range(1, len(labels) + 1):
+        # A threshold can only split between distinct confidence values
+        if k < len(labels) and confidence[k] == confidence[k - 1]:
+            continue
+        if accuracy[k] >= target:
+            best = (float(confidence[k - 1]), k / len(labels), float(accuracy[k]))
+    return best
+
+
+def train_cascade(data_dir, full_model, save_path, epochs=50, shard_dir=None, max_accuracy_drop=0.005,
+                  split_manifest=None, augmentation='pipeline', jit_compile=False):
+    """
+    Train the cheap first-stage model, pick its confidence threshold on
+    the validation split and save both next to the full model.
+    """
+    # The first stage takes the same input as the full model and downsamples in-graph
+    input_shape = full_model.input_shape[1:]
+    if shard_dir:
+        train_ds, val_ds, class_names = load_sharded_dataset(shard_dir)
+        if augmentation == 'pipeline':
+            train_ds = augment_dataset(train_ds).prefetch(tf.data.AUTOTUNE)
+    else:
+        train_ds, val_ds, class_names = load_dataset(data_dir, input_shape[:2], split_manifest=split_manifest,
+                                                     augment=augmentation == 'pipeline')
+
+    print("\nTraining cascade first stage (MobileNetV2 alpha=0.35 @ 96x96)...")
+    def build():
+        return create_fast_model(input_shape, num_classes=len(class_names), augment=augmentation == 'model',
+                                 jit_compile=jit_compile)
+    fast_model = build()
+    fast_model.fit(train_ds, validation_data=val_ds, epochs=epochs,
+                   callbacks=create_callbacks(), verbose=1)
+    # Threshold and latency are measured on the float32 model that gets deployed
+    fast_model = float32_copy(fast_model, build)
+
+    fast_probs, labels = predict_dataset(fast_model, val_ds)
+    full_probs, _ = predict_dataset(full_model, val_ds)
+    threshold, early_exit_rate, accuracy = choose_cascade_threshold(
+        fast_probs, full_probs, labels, max_accuracy_drop
+    )
+
+    sample = next(iter(val_ds))[0]
+    fast_seconds = seconds_per_image(fast_model, sample)
+    full_seconds = seconds_per_image(full_model, sample)
+    config = {
+        'threshold': threshold,
+        'max_accuracy_drop': max_accuracy_drop,
+        'validation_images': int(len(labels)),
+        'early_exit_rate': early_exit_rate,
+        'cascade_accuracy': accuracy,
+        'full_accuracy': float((full_probs.argmax(axis=1) == labels).mean()),
+        'fast_accuracy': float((fast_probs.argmax(axis=1) == labels).mean()),
+        'fast_ms_per_image': 1000 * fast_seconds,
+        'full_ms_per_image': 1000 * full_seconds,
+        # Every image pays for the fast stage; only the unsure ones for both
+        'expected_ms_per_image': 1000 * (fast_seconds + (1 - early_exit_rate) * full_seconds),
+    }
+
+    fast_model.save(fast_model_path(save_path))
+    save_metadata(fast_model_path(save_path), input_shape[:2], alpha=0.35)
+    with open(cascade_config_path(save_path), 'w') as f:
+        json.dump(config, f, indent=2)
+
+    print(f"Cascade threshold {threshold:.3f}: {early_exit_rate:.1%} of validation images exit early, "
+          f"accuracy {accuracy:.2%} vs {config['full_accuracy']:.2%} for the full model")
+    print(f"Expected latency {config['expected_ms_per_image']:.2f} ms/image "
+          f"vs {config['full_ms_per_image']:.2f} ms/image for the full model")
+    return fast_model, config
+
+def build_extras(args, model, save_path):
+    """Cascade first stage and TFLite / SavedModel exports requested on the command line"""
+    exports = [(model, save_path)]
+    if args.cascade:
+        fast_model, _ = train_cascade(args.data_dir, model, save_path, epochs=args.epochs,
+                                      shard_dir=args.shards, max_accuracy_drop=args.cascade_max_drop,
+                                      split_manifest=args.split_manifest, augmentation=args.augmentation,
+                                      jit_compile=args.xla)
+        exports.append((fast_model, fast_model_path(save_path)))
+
+    for export_model, export_path in exports:
+        if args.export_tflite:
+            export_tflite(export_model, export_path, args.data_dir)
+        if args.export_savedmodel:
+            export_savedmodel(export_model, export_path)
+
 if __name__ == "__main__":
-    DATA_DIR = "dataset"
+    parser = argparse.ArgumentParser(description="Train the waste classifier")
+    parser.add_argument('--data-dir', default="dataset")
+    parser.add_argument('--epochs', type=int, default=50)
+    parser.add_argument('--models-dir', default=MODELS_DIR,
+                        help="Publish the model as a new version in this directory")
+    parser.add_argument('--save-path', default=None,
+                        help="Write a single unversioned model file here instead of publishing a version")
+    parser.add_argument('--input-size', type=int, default=224,
+                        help="Square model input size in pixels (96, 128, 160, 192 or 224)")
+    parser.add_argument('--alpha', type=float, default=1.0,
+                        help="MobileNetV2 width multiplier (0.35, 0.5, 0.75, 1.0, 1.3 or 1.4)")
+    parser.add_argument('--cached-features', action='store_true',
+                        help="Cache backbone embeddings on disk and train only the head")
+    parser.add_argument('--views', type=int, default=4,
+                        help="Augmented views cached per image (with --cached-features)")
+    parser.add_argument('--cache-dir', default=None,
+                        help="Feature cache directory (with --cached-features)")
+    parser.add_argument('--shards', default=None,
+                        help="Stream training data from sharded TFRecords in this directory (built/updated automatically)")
+    parser.add_argument('--split-manifest', default=None,
+                        help="Train/validate on the deduplicated split written by model/dedup.py")
+    parser.add_argument('--augmentation', choices=['pipeline', 'model', 'none'], default='pipeline',
+                        help="Augment in a parallel tf.data stage (default), with in-model layers, or not at all")
+    parser.add_argument('--mixed-precision', action='store_true',
+                        help="Train with mixed precision (bfloat16 on CPU, float16 on GPU); models are saved in float32")
+    parser.add_argument('--xla', action='store_true', help="JIT-compile the training step with XLA")
+    parser.add_argument('--cascade', action='store_true',
+                        help="Also train a cheap first-stage model for confidence-gated cascade inference")
+    parser.add_argument('--cascade-max-drop', type=float, default=0.005,
+                        help="Validation accuracy the cascade may lose vs the full model when picking its threshold")
+    parser.add_argument('--export-tflite', action='store_true',
+                        help="Also write float16 and int8 quantized TFLite models")
+    parser.add_argument('--no-export-savedmodel', dest='export_savedmodel', action='store_false',
+                        help="Skip the inference-only SavedModel written next to the Keras model")
+    parser.add_argument('--workers', type=int, default=1,
+                        help="Local training processes for data-parallel training (MultiWorkerMirroredStrategy)")
+    parser.add_argument('--batch-size', type=int, default=8,
+                        help="Per-worker batch size; the global batch is this times --workers")
+    parser.add_argument('--intra-op-threads', type=int, default=None,
+                        help="TensorFlow intra-op threads per process (default with --workers: cores / workers)")
+    parser.add_argument('--inter-op-threads', type=int, default=None,
+                        help="TensorFlow inter-op threads per process (default with --workers: 2)")
+    parser.add_argument('--throughput-log', default=None,
+                        help="Write samples/sec per epoch as JSON")
+    parser.add_argument('--worker-index', type=int, default=None, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    DATA_DIR = args.data_dir
+    
+    if args.workers > 1 or args.intra_op_threads or args.inter_op_threads:
+        intra_op, inter_op = default_threads(args.workers)
+        configure_threads(args.intra_op_threads or intra_op, args.inter_op_threads or inter_op)
+    
+    if args.mixed_precision:
+        keras.mixed_precision.set_global_policy(mixed_precision_policy())
     
-    if not os.path.exists(DATA_DIR):
+    if args.workers > 1 and args.cached_features:
+        parser.error("--workers trains the full model; it can't be combined with --cached-features")
+    
+    if args.worker_index is not None:
+        # Started by launch_local_workers below, which passes --save-path and publishes
+        model, history = train(DATA_DIR, epochs=args.epochs, save_path=args.save_path,
+                               shard_dir=args.shards, input_size=args.input_size, alpha=args.alpha,
+                               batch_size=args.batch_size, strategy=worker_strategy(),
+                               throughput_log=args.throughput_log, split_manifest=args.split_manifest,
+                               augmentation=args.augmentation, jit_compile=args.xla)
+        if is_chief():
+            build_extras(args, model, args.save_path)
+    elif not os.path.exists(DATA_DIR):
         print(f"Error: Dataset directory '{DATA_DIR}' not found!")
         print("\nPlease organize your dataset as:")
         print("dataset/")
@@ -130,4 +547,37 @@ if __name__ == "__main__":
             print("   Recommended: 100+ images per class")
             print("   Current dataset may not train well.\n")
         
-        model, history = train(DATA_DIR, epochs=50)
+        # Everything is written into a staging directory and published at the end,
+        # so running apps never pick up a half-written model
+        if args.save_path:
+            save_path = args.save_path
+        else:
+            os.makedirs(args.models_dir, exist_ok=True)
+            version, staging_dir = begin_version(args.models_dir)
+            save_path = os.path.join(staging_dir, MODEL_FILE)
+        
+        if args.workers > 1:
+            if args.shards:
+                build_shards(DATA_DIR, args.shards, img_size=(args.input_size, args.input_size),
+                             split_manifest=args.split_manifest)
+            print(f"\nStarting {args.workers} training workers...")
+            launch_local_workers(args.workers, sys.argv[1:] + ['--save-path', save_path])
+        else:
+            if args.cached_features:
+                model, history = train_cached(DATA_DIR, epochs=args.epochs, save_path=save_path,
+                                              num_views=args.views, cache_dir=args.cache_dir,
+                                              input_size=args.input_size, alpha=args.alpha,
+                                              split_manifest=args.split_manifest)
+            else:
+                model, history = train(DATA_DIR, epochs=args.epochs, save_path=save_path,
+                                       shard_dir=args.shards, input_size=args.input_size, alpha=args.alpha,
+                                       batch_size=args.batch_size, throughput_log=args.throughput_log,
+                                       split_manifest=args.split_manifest, augmentation=args.augmentation,
+                                       jit_compile=args.xla)
+            build_extras(args, model, save_path)
+        
+        if not args.save_path:
+            if args.split_manifest:
+                # A later head refit validates on the same split
+                shutil.copy2(args.split_manifest, os.path.join(staging_dir, SPLIT_FILE))
+            publish_version(args.models_dir, version, staging_dir)
@@ -0,0 +1,174 @@
+"""
+Versioned model artifacts and zero-downtime hot-swapping.
+
+Training publishes each model as a directory plus a pointer file:
+
+    models/
+      20261017-153000-1a2b3c/
+        waste_classifier_model.h5
+        class_names.txt
+        manifest.json          class names, input size, sha256 of every file
+      CURRENT                  <- contains "20261017-153000-1a2b3c"
+
+The version directory is fully written under a temporary name and renamed
+into place before CURRENT is atomically replaced, so a reader never sees a
+half-written model. The layout and the writer side live in
+model/artifacts.py.
+
+Long-running processes hold a ModelHandle. A ModelWatcher polls CURRENT,
+loads new versions on a background thread, validates them with a canary
+prediction and then swaps `handle.current` in a single assignment. Callers
+read `handle.current` once per request or batch, so in-flight work finishes
+on the model it started with and nothing stalls during the load.
+
+Relative paths that don't exist in the working directory are looked up
+next to this file, so the app and tools find models/ from any directory.
+"""
+
+import logging
+import os
+import threading
+import numpy as np
+from inference import MODEL_PATH, CLASS_NAMES_PATH, load_backend, load_class_names, predict_batch
+from model.artifacts import CLASS_NAMES_FILE, MODEL_FILE, MODELS_DIR, current_version, locate, verify_artifact
+from prediction_cache import model_fingerprint
+
+logger = logging.getLogger('waste_classifier.models')
+
+
+class LoadedModel:
+    """
+    A loaded model with its version, class names and cache fingerprint.
+    Backends that can learn new classes while loaded (the k-NN index)
+    report them live, so read `class_names` and `fingerprint` on every use
+    rather than keeping a copy.
+    """
+
+    def __init__(self, version, backend, class_names, fingerprint):
+        self.version = version
+        self.backend = backend
+        self._class_names = class_names
+        self._fingerprint = fingerprint
+
+    @property
+    def class_names(self):
+        return getattr(self.backend, 'class_names', None) or self._class_names
+
+    @property
+    def fingerprint(self):
+        live = getattr(self.backend, 'fingerprint', None)
+        return f"{self._fingerprint}-{live}" if live else self._fingerprint
+
+
+def resolve_artifacts(models_dir=MODELS_DIR, version=None):
+    """
+    Return (version, model_path, class_names_path). Uses the given or
+    current published version, falling back to the legacy top-level files.
+    """
+    version = version or current_version(models_dir)
+    if version is None:
+        return None, locate(MODEL_PATH), locate(CLASS_NAMES_PATH)
+    version_dir = os.path.join(locate(models_dir), version)
+    return version, os.path.join(version_dir, MODEL_FILE), os.path.join(version_dir, CLASS_NAMES_FILE)
+
+
+def load_version(backend_name='keras', models_dir=MODELS_DIR, version=None,
+                 model_path=None, class_names_path=None, cascade=False):
+    """
+    Load a model as a LoadedModel. An explicit `model_path` bypasses the
+    registry (version is then None). With `cascade`, the backend is gated
+    by the version's fast first-stage model.
+    """
+    if model_path:
+        class_names_path = class_names_path or CLASS_NAMES_PATH
+    else:
+        version, model_path, class_names_path = resolve_artifacts(models_dir, version)
+
+    backend = load_backend(backend_name, model_path, cascade=cascade)
+    # The k-NN backend carries its own labels
+    class_names = getattr(backend, 'class_names', None) or load_class_names(class_names_path)
+    fingerprint = model_fingerprint(backend.model_path, class_names_path, extra=backend.name)
+    return LoadedModel(version, backend, class_names, fingerprint)
+
+
+def _artifact_paths(backend):
+    """Model files a backend was loaded from; a cascade has two"""
+    if hasattr(backend, 'fast'):
+        return _artifact_paths(backend.fast) + _artifact_paths(backend.full)
+    return [backend.model_path]
+
+
+def canary_check(loaded):
+    """
+    Run one prediction on a dummy image and check the output is a valid
+    probability vector over the model's classes. This also traces the
+    graph, so the first real request after a swap isn't slow. The files
+    behind the backend are first checked against the version's manifest.
+    """
+    for path in _artifact_paths(loaded.backend):
+        verify_artifact(path)
+    width, height = loaded.backend.input_size
+    dummy = np.full((1, height, width, 3), 127, dtype=np.uint8)
+    probabilities = np.asarray(predict_batch(loaded.backend, dummy))
+    if probabilities.shape != (1, len(loaded.class_names)):
+        raise ValueError(
+            f"Model outputs shape {probabilities.shape}, expected (1, {len(loaded.class_names)})"
+        )
+    if not np.all(np.isfinite(probabilities)) or abs(float(probabilities.sum()) - 1.0) > 1e-3:
+        raise ValueError("Model output is not a probability distribution")
+
+
+class ModelHandle:
+    """Holder of the live model; `current` is swapped atomically"""
+
+    def __init__(self, loaded):
+        self.current = loaded
+        self._listeners = []
+
+    def add_listener(self, callback):
+        """callback(new, old) runs on the watcher thread after each swap"""
+        self._listeners.append(callback)
+
+    def swap(self, loaded):
+        old, self.current = self.current, loaded
+        logger.info("Switched model %s -> %s", old.version, loaded.version)
+        for callback in self._listeners:
+            callback(loaded, old)
+
+
+class ModelWatcher:
+    """Polls the pointer file and hot-swaps validated new versions"""
+
+    def __init__(self, handle, backend_name='keras', models_dir=MODELS_DIR, interval=5.0, cascade=False):
+        self.handle = handle
+        self.backend_name = backend_name
+        self.cascade = cascade
+        self.models_dir = models_dir
+        self.interval = interval
+        self._failed = set()
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name='model-watcher', daemon=True)
+        self._thread.start()
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            self.check()
+
+    def check(self):
+        version = current_version(self.models_dir)
+        if version is None or version == self.handle.current.version or version in self._failed:
+            return
+        logger.info("New model version %s published, loading in background", version)
+        try:
+            loaded = load_version(self.backend_name, self.models_dir, version, cascade=self.cascade)
+            canary_check(loaded)
+        except Exception:
+            # Keep serving the old model; don't retry a broken version every poll
+            logger.exception("Model version %s failed validation, keeping %s",
+                             version, self.handle.current.version)
+            self._failed.add(version)
+            return
+        self.handle.swap(loaded)
+
+    def stop(self):
+        self._stop.set()
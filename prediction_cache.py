@@ -0,0 +1,173 @@
+"""
+Content-addressed prediction cache.
+
+Predictions are keyed by a hash of the image file bytes, scoped to a model
+fingerprint built from the weights file and class_names.txt. Retraining
+changes the fingerprint, so old predictions are never served for a new
+model; stale rows are pruned from the on-disk store when it is opened.
+
+Two tiers:
+  - an in-memory LRU with a configurable entry limit
+  - an optional SQLite file that survives restarts
+"""
+
+import hashlib
+import os
+import sqlite3
+import threading
+from collections import OrderedDict
+import numpy as np
+
+
+def image_key(data):
+    """Hash of raw image file bytes"""
+    return hashlib.blake2b(data, digest_size=16).hexdigest()
+
+
+def _hash_path(digest, path):
+    if os.path.isdir(path):
+        # SavedModel exports are directories; hash every file in a stable order
+        for dirpath, dirnames, filenames in os.walk(path):
+            dirnames.sort()
+            for name in sorted(filenames):
+                file_path = os.path.join(dirpath, name)
+                digest.update(os.path.relpath(file_path, path).encode())
+                _hash_path(digest, file_path)
+        return
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(1 << 20), b''):
+            digest.update(chunk)
+
+
+def model_fingerprint(model_path, class_names_path=None, extra=''):
+    """Identify a model by its weights file hash and class names"""
+    digest = hashlib.sha256()
+    _hash_path(digest, model_path)
+    if class_names_path and os.path.exists(class_names_path):
+        _hash_path(digest, class_names_path)
+    digest.update(extra.encode())
+    return digest.hexdigest()[:32]
+
+
+class PredictionCache:
+    """In-memory LRU of prediction vectors, optionally backed by SQLite"""
+
+    def __init__(self, fingerprint, max_entries=4096, db_path=None):
+        self.fingerprint = fingerprint
+        self.max_entries = max_entries
+        self._memory = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+        self._db = None
+        if db_path:
+            self._db = sqlite3.connect(db_path, check_same_thread=False)
+            self._db.execute('PRAGMA journal_mode=WAL')
+            self._db.execute(
+                'CREATE TABLE IF NOT EXISTS predictions ('
+                'fingerprint TEXT NOT NULL, key TEXT NOT NULL, probabilities BLOB NOT NULL, '
+                'PRIMARY KEY (fingerprint, key))'
+            )
+            self._prune()
+
+    def _prune(self):
+        """Drop rows produced by any other model"""
+        with self._db:
+            self._db.execute('DELETE FROM predictions WHERE fingerprint != ?', (self.fingerprint,))
+
+    def reset(self, fingerprint):
+        """Switch to a new model: forget every cached prediction"""
+        with self._lock:
+            self.fingerprint = fingerprint
+            self._memory.clear()
+            if self._db is not None:
+                self._prune()
+
+    def get(self, key, fingerprint=None):
+        """
+        Return the cached probability vector for an image key, or None. If
+        `fingerprint` is given and differs (the model changed, e.g. its
+        embedding index grew), the cache is reset to it first.
+        """
+        if fingerprint is not None and fingerprint != self.fingerprint:
+            self.reset(fingerprint)
+        with self._lock:
+            probabilities = self._memory.get(key)
+            if probabilities is not None:
+                self._memory.move_to_end(key)
+                self.hits += 1
+                return probabilities
+
+            if self._db is not None:
+                row = self._db.execute(
+                    'SELECT probabilities FROM predictions WHERE fingerprint = ? AND key = ?',
+                    (self.fingerprint, key)
+                ).fetchone()
+                if row is not None:
+                    probabilities = np.frombuffer(row[0], dtype=np.float32)
+                    self._remember(key, probabilities)
+                    self.hits += 1
+                    self.disk_hits += 1
+                    return probabilities
+
+            self.misses += 1
+            return None
+
+    def put(self, key, probabilities, fingerprint=None):
+        """
+        Store a prediction. If `fingerprint` is given and no longer matches
+        (the model was swapped meanwhile), the prediction is dropped.
+        """
+        probabilities = np.asarray(probabilities, dtype=np.float32)
+        with self._lock:
+            if fingerprint is not None and fingerprint != self.fingerprint:
+                return
+            self._remember(key, probabilities)
+            if self._db is not None:
+                with self._db:
+                    self._db.execute(
+                        'INSERT OR REPLACE INTO predictions VALUES (?, ?, ?)',
+                        (self.fingerprint, key, probabilities.tobytes())
+                    )
+
+    def put_many(self, items, fingerprint=None):
+        """Store several (key, probabilities) pairs in one transaction"""
+        items = [(key, np.asarray(p, dtype=np.float32)) for key, p in items]
+        with self._lock:
+            if fingerprint is not None and fingerprint != self.fingerprint:
+                return
+            for key, probabilities in items:
+                self._remember(key, probabilities)
+            if self._db is not None:
+                with self._db:
+                    self._db.executemany(
+                        'INSERT OR REPLACE INTO predictions VALUES (?, ?, ?)',
+                        [(self.fingerprint, key, p.tobytes()) for key, p in items]
+                    )
+
+    def _remember(self, key, probabilities):
+        self._memory[key] = probabilities
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.max_entries:
+            self._memory.popitem(last=False)
+            self.evictions += 1
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'hits': self.hits,
+                'disk_hits': self.disk_hits,
+                'misses': self.misses,
+                'evictions': self.evictions,
+                'hit_rate': self.hits / lookups if lookups else 0.0,
+                'entries': len(self._memory),
+            }
+
+    def close(self):
+        if self._db is not None:
+            self._db.close()
+            self._db = None
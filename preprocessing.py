@@ -0,0 +1,128 @@
+"""
+Image loading and preprocessing shared by the GUI and the batch tools.
+Keeping this in one place guarantees every entry point feeds the
+model exactly the same pixels.
+
+Camera images are often 24-50 MP, far more than the 700x500 display and
+224x224 model input need. `decode_image` asks the JPEG decoder for a
+reduced-scale decode (DCT scaling via `Image.draft`, or `Image.reduce` for
+other formats), applies EXIF orientation and produces both the display
+thumbnail and the model array from that single decode, so the
+full-resolution buffer is never materialized or kept around.
+"""
+
+import io
+import os
+from collections import namedtuple
+import numpy as np
+from PIL import Image, ImageOps
+from metrics import METRICS
+
+MODEL_INPUT_SIZE = (224, 224)
+DISPLAY_SIZE = (700, 500)
+IMAGE_EXTENSIONS = ('.jpg', '.jpeg', '.png', '.bmp')
+
+# Image.reduce doesn't support palette or bilevel images
+_REDUCIBLE_MODES = ('L', 'LA', 'RGB', 'RGBA', 'RGBX', 'I', 'F')
+
+# EXIF orientations that swap width and height
+_TRANSPOSED_ORIENTATIONS = (5, 6, 7, 8)
+
+DecodedImage = namedtuple('DecodedImage', ['display', 'model_array', 'original_size'])
+
+
+def to_rgb(image):
+    """
+    8-bit RGB copy of any PIL image: grayscale, LA, palette (with or
+    without transparency), CMYK, 16-bit and float images all become
+    (H, W, 3) uint8 arrays, so a batch of mixed files can be stacked.
+    """
+    return image if image.mode == 'RGB' else image.convert('RGB')
+
+
+def preprocess_image(image, size=MODEL_INPUT_SIZE):
+    """Resize a PIL image and return a (H, W, 3) array for the model"""
+    with METRICS.timer('resize'):
+        img_array = np.array(to_rgb(image).resize(size))
+    return img_array
+
+
+def match_input_size(img_array, size=MODEL_INPUT_SIZE):
+    """
+    Resize an already preprocessed array if it was made for a different
+    model input size, e.g. when a model with another resolution was
+    swapped in after the image was decoded.
+    """
+    if img_array.shape[1::-1] == tuple(size):
+        return img_array
+    return preprocess_image(Image.fromarray(img_array), size)
+
+
+def display_size_for(size, max_size=DISPLAY_SIZE):
+    """Scale (width, height) to fit within max_size, keeping aspect ratio"""
+    width, height = size
+    scale = min(max_size[0] / width, max_size[1] / height)
+    return int(width * scale), int(height * scale)
+
+
+def _decode_reduced(image, min_size):
+    """
+    Decode `image` at the smallest scale that is still at least `min_size`
+    (in stored orientation). Returns the decoded image.
+    """
+    if image.format == 'JPEG':
+        # Must run before load(): libjpeg scales by 1/2, 1/4 or 1/8 while decoding
+        image.draft(image.mode, min_size)
+        image.load()
+        return image
+
+    factor = min(image.width // max(1, min_size[0]), image.height // max(1, min_size[1]))
+    if factor >= 2 and image.mode in _REDUCIBLE_MODES:
+        return image.reduce(factor)
+    image.load()
+    return image
+
+
+def decode_image(source, display_size=DISPLAY_SIZE, model_size=MODEL_INPUT_SIZE):
+    """
+    Decode an image file (path or file object) once at reduced resolution.
+    Returns a DecodedImage with the display thumbnail (None if display_size
+    is None), the model input array and the original, EXIF-oriented size.
+    """
+    if isinstance(source, (str, os.PathLike)):
+        with METRICS.timer('file_read'):
+            with open(source, 'rb') as f:
+                source = io.BytesIO(f.read())
+
+    with METRICS.timer('decode'), Image.open(source) as image:
+        orientation = image.getexif().get(0x0112, 1)
+        transposed = orientation in _TRANSPOSED_ORIENTATIONS
+        stored_size = image.size
+        original_size = stored_size[::-1] if transposed else stored_size
+
+        # Smallest decode that still covers both outputs
+        target = model_size
+        if display_size:
+            shown = display_size_for(original_size, display_size)
+            target = (max(target[0], shown[0]), max(target[1], shown[1]))
+        if transposed:
+            target = target[::-1]
+
+        decoded = _decode_reduced(image, target)
+        oriented = to_rgb(ImageOps.exif_transpose(decoded))
+
+    model_array = preprocess_image(oriented, model_size)
+    display = None
+    if display_size:
+        display = oriented.resize(display_size_for(original_size, display_size), Image.Resampling.LANCZOS)
+    return DecodedImage(display, model_array, original_size)
+
+
+def load_and_preprocess(path, size=MODEL_INPUT_SIZE):
+    """Open an image file and preprocess it for the model"""
+    return decode_image(path, display_size=None, model_size=size).model_array
+
+
+def preprocess_bytes(data, size=MODEL_INPUT_SIZE):
+    """Decode in-memory image file bytes and preprocess them for the model"""
+    return decode_image(io.BytesIO(data), display_size=None, model_size=size).model_array
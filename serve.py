@@ -0,0 +1,313 @@
+"""
+Local HTTP inference service with dynamic micro-batching.
+
+Loads the model once and classifies images POSTed by kiosks and conveyor
+cameras. Concurrent requests are gathered into micro-batches (up to
+--max-batch-size images, waiting at most --max-wait-ms for stragglers)
+before each predict call. The request queue is bounded; when it is full
+the server answers 503 immediately instead of letting latency grow.
+
+When serving a published version from models/, newly published versions
+are loaded in the background and swapped in between batches.
+
+    python serve.py --port 8080
+    curl --data-binary @dataset/biodegradable/banana.jpg http://127.0.0.1:8080/classify
+
+Endpoints:
+    POST /classify   raw image bytes -> {"label", "confidence", "probabilities", "model_version"}
+    GET  /health     model and queue status
+"""
+
+import argparse
+import asyncio
+import json
+import logging
+import os
+import sys
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+
+import metrics
+from inference import BACKENDS, CLASS_NAMES_PATH, predict_batch, top_predictions
+from model_registry import MODELS_DIR, ModelHandle, ModelWatcher, load_version
+from preprocessing import match_input_size, preprocess_bytes
+
+logger = logging.getLogger('waste_classifier.serve')
+
+STATUS_TEXT = {
+    200: 'OK', 400: 'Bad Request', 404: 'Not Found', 405: 'Method Not Allowed',
+    413: 'Payload Too Large', 500: 'Internal Server Error', 503: 'Service Unavailable',
+}
+
+
+class QueueFullError(Exception):
+    pass
+
+
+class InvalidImageError(Exception):
+    """An image that can't be fed to the live model; fails only its own request"""
+
+
+class MicroBatcher:
+    """Collects single-image requests into batched predict calls"""
+
+    def __init__(self, handle, max_batch_size=32, max_wait_ms=5.0, queue_size=256):
+        self.handle = handle
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait_ms / 1000
+        self.queue = asyncio.Queue(maxsize=queue_size)
+        # One thread: batches run back to back while the event loop keeps accepting
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix='predict')
+        self.batches = 0
+        self.images = 0
+
+    async def submit(self, img_array):
+        """Queue one preprocessed image and wait for (probabilities, loaded model)"""
+        future = asyncio.get_running_loop().create_future()
+        try:
+            self.queue.put_nowait((img_array, future))
+        except asyncio.QueueFull:
+            raise QueueFullError()
+        return await future
+
+    async def _collect(self):
+        """Wait for one request, then gather more until full or max_wait passes"""
+        batch = [await self.queue.get()]
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + self.max_wait
+        while len(batch) < self.max_batch_size:
+            try:
+                batch.append(self.queue.get_nowait())
+                continue
+            except asyncio.QueueEmpty:
+                pass
+            timeout = deadline - loop.time()
+            if timeout <= 0:
+                break
+            try:
+                batch.append(await asyncio.wait_for(self.queue.get(), timeout))
+            except asyncio.TimeoutError:
+                break
+        return batch
+
+    @staticmethod
+    def _prepare(batch, input_size):
+        """Resize each image for the model; a bad one fails its own future, not the batch"""
+        prepared = []
+        for img_array, future in batch:
+            try:
+                img_array = match_input_size(img_array, input_size)
+                if img_array.shape != (input_size[1], input_size[0], 3):
+                    raise ValueError(f"expected a {input_size[0]}x{input_size[1]} RGB image, "
+                                     f"got an array of shape {img_array.shape}")
+            except Exception as e:
+                if not future.done():
+                    future.set_exception(InvalidImageError(str(e)))
+                continue
+            prepared.append((img_array, future))
+        return prepared
+
+    async def run(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            batch = [(a, f) for a, f in await self._collect() if not f.cancelled()]
+            if not batch:
+                continue
+            # The whole batch runs on whichever model is live when it starts
+            loaded = self.handle.current
+            batch = self._prepare(batch, loaded.backend.input_size)
+            if not batch:
+                continue
+            images = np.stack([a for a, _ in batch])
+            try:
+                predictions = await loop.run_in_executor(self._executor, predict_batch, loaded.backend, images)
+            except Exception as e:
+                for _, future in batch:
+                    if not future.done():
+                        future.set_exception(e)
+                continue
+
+            self.batches += 1
+            self.images += len(batch)
+            for (_, future), row in zip(batch, predictions):
+                if not future.done():
+                    future.set_result((row, loaded))
+
+
+class InferenceServer:
+    def __init__(self, handle, batcher, decode_workers=None, max_body_bytes=32 << 20):
+        self.handle = handle
+        self.batcher = batcher
+        self.max_body_bytes = max_body_bytes
+        self._decode_executor = ThreadPoolExecutor(max_workers=decode_workers, thread_name_prefix='decode')
+
+    async def classify(self, body):
+        # Shed load before spending time decoding
+        if self.batcher.queue.full():
+            return 503, {'error': "Server busy, retry later"}
+        loop = asyncio.get_running_loop()
+        try:
+            img_array = await loop.run_in_executor(
+                self._decode_executor, preprocess_bytes, body, self.handle.current.backend.input_size
+            )
+        except Exception as e:
+            return 400, {'error': f"Could not decode image: {e}"}
+        try:
+            probabilities, loaded = await self.batcher.submit(img_array)
+        except QueueFullError:
+            return 503, {'error': "Server busy, retry later"}
+        except InvalidImageError as e:
+            return 400, {'error': f"Could not classify image: {e}"}
+
+        label, confidence = top_predictions(probabilities[None], loaded.class_names)[0]
+        return 200, {
+            'label': label,
+            'confidence': confidence,
+            'probabilities': dict(zip(loaded.class_names, map(float, probabilities))),
+            'model_version': loaded.version,
+        }
+
+    async def route(self, method, path, body):
+        path = path.split('?', 1)[0].rstrip('/')
+        if path == '/classify':
+            if method != 'POST':
+                return 405, {'error': "Use POST with the image bytes as the body"}
+            return await self.classify(body)
+        if path == '/health':
+            loaded = self.handle.current
+            health = {
+                'status': 'ok',
+                'backend': loaded.backend.name,
+                'model_version': loaded.version,
+                'queue_depth': self.batcher.queue.qsize(),
+                'batches': self.batcher.batches,
+                'images': self.batcher.images,
+            }
+            if hasattr(loaded.backend, 'stats'):
+                health['cascade'] = loaded.backend.stats()
+            return 200, health
+        return 404, {'error': f"No route for {path}"}
+
+    async def handle_connection(self, reader, writer):
+        """Minimal HTTP/1.1 handling with keep-alive"""
+        try:
+            while True:
+                request_line = await reader.readline()
+                if not request_line:
+                    break
+                method, path, version = request_line.decode('latin-1').split()
+
+                headers = {}
+                while True:
+                    line = await reader.readline()
+                    if line in (b'\r\n', b'\n', b''):
+                        break
+                    name, value = line.decode('latin-1').split(':', 1)
+                    headers[name.strip().lower()] = value.strip()
+
+                length = int(headers.get('content-length', 0))
+                if length > self.max_body_bytes:
+                    await self._respond(writer, 413, {'error': "Image too large"}, keep_alive=False)
+                    break
+                body = await reader.readexactly(length) if length else b''
+
+                try:
+                    status, payload = await self.route(method, path, body)
+                except Exception as e:
+                    logger.exception("Request failed")
+                    status, payload = 500, {'error': str(e)}
+
+                keep_alive = version == 'HTTP/1.1' and headers.get('connection', '').lower() != 'close'
+                await self._respond(writer, status, payload, keep_alive)
+                if not keep_alive:
+                    break
+        except (asyncio.IncompleteReadError, ConnectionError, ValueError):
+            pass
+        finally:
+            writer.close()
+
+    @staticmethod
+    async def _respond(writer, status, payload, keep_alive):
+        body = json.dumps(payload).encode()
+        head = [
+            f"HTTP/1.1 {status} {STATUS_TEXT.get(status, '')}",
+            "Content-Type: application/json",
+            f"Content-Length: {len(body)}",
+            f"Connection: {'keep-alive' if keep_alive else 'close'}",
+        ]
+        if status == 503:
+            head.append("Retry-After: 1")
+        writer.write(('\r\n'.join(head) + '\r\n\r\n').encode('latin-1') + body)
+        await writer.drain()
+
+
+async def serve(args):
+    loaded = load_version(args.backend, args.models_dir, model_path=args.model,
+                          class_names_path=args.class_names, cascade=args.cascade)
+
+    # Trace the graph before accepting traffic
+    width, height = loaded.backend.input_size
+    predict_batch(loaded.backend, np.zeros((1, height, width, 3), dtype=np.uint8))
+
+    handle = ModelHandle(loaded)
+    watcher = None
+    if args.model is None:
+        # Also picks up the first version published while serving the legacy model
+        watcher = ModelWatcher(handle, args.backend, args.models_dir, args.watch_interval, args.cascade)
+    else:
+        logger.info("Serving --model %s: versions published to %s are not hot-swapped in",
+                    args.model, args.models_dir)
+
+    batcher = MicroBatcher(handle, args.max_batch_size, args.max_wait_ms, args.queue_size)
+    server = InferenceServer(handle, batcher, args.decode_workers)
+    batch_task = asyncio.create_task(batcher.run())
+
+    tcp_server = await asyncio.start_server(server.handle_connection, args.host, args.port)
+    print(f"Serving {args.backend} model {loaded.version or loaded.backend.model_path} "
+          f"on http://{args.host}:{args.port} "
+          f"(max batch {args.max_batch_size}, max wait {args.max_wait_ms} ms)", file=sys.stderr)
+    try:
+        async with tcp_server:
+            await tcp_server.serve_forever()
+    finally:
+        batch_task.cancel()
+        if watcher is not None:
+            watcher.stop()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Local HTTP inference service with micro-batching")
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8080)
+    parser.add_argument('--backend', choices=BACKENDS, default='keras')
+    parser.add_argument('--model', default=None,
+                        help="Serve this model file instead of the published version in --models-dir")
+    parser.add_argument('--class-names', default=CLASS_NAMES_PATH, help="Class names for --model")
+    parser.add_argument('--models-dir', default=MODELS_DIR)
+    parser.add_argument('--watch-interval', type=float, default=5.0,
+                        help="Seconds between checks for a newly published model")
+    parser.add_argument('--cascade', action='store_true',
+                        help="Run the fast first-stage model and use the full model only when it is unsure")
+    parser.add_argument('--max-batch-size', type=int, default=32)
+    parser.add_argument('--max-wait-ms', type=float, default=5.0,
+                        help="How long the first request in a batch waits for others")
+    parser.add_argument('--queue-size', type=int, default=256,
+                        help="Pending requests before the server answers 503")
+    parser.add_argument('--decode-workers', type=int, default=os.cpu_count(),
+                        help="Threads decoding uploaded images")
+    metrics.add_arguments(parser)
+    args = parser.parse_args(argv)
+    exporter = metrics.configure(args)
+
+    try:
+        asyncio.run(serve(args))
+    except KeyboardInterrupt:
+        pass
+    finally:
+        if exporter is not None:
+            exporter.stop()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,13 @@
+"""
+Shared pytest setup. Puts the repo root and model/ on sys.path, like
+benchmarks/common.py, so tests import modules the same way the scripts do.
+None of the tests need TensorFlow.
+"""
+
+import os
+import sys
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+for _path in (REPO_ROOT, os.path.join(REPO_ROOT, 'model')):
+    if _path not in sys.path:
+        sys.path.insert(0, _path)
@@ -0,0 +1,61 @@
+import json
+import os
+
+import pytest
+
+from model.artifacts import (CLASS_NAMES_FILE, MANIFEST_FILE, MODEL_FILE, begin_version, metadata_path,
+                             publish_version, read_manifest, save_metadata, savedmodel_path, tflite_path,
+                             verify_artifact)
+
+
+def publish(models_dir):
+    version, staging_dir = begin_version(models_dir)
+    model_path = os.path.join(staging_dir, MODEL_FILE)
+    with open(model_path, 'wb') as f:
+        f.write(b'weights')
+    save_metadata(model_path, (160, 160), alpha=0.5)
+    with open(os.path.join(staging_dir, CLASS_NAMES_FILE), 'w') as f:
+        f.write('paper\nplastic\n')
+    with open(tflite_path(model_path, 'int8'), 'wb') as f:
+        f.write(b'flatbuffer')
+    os.makedirs(os.path.join(savedmodel_path(model_path), 'variables'))
+    with open(os.path.join(savedmodel_path(model_path), 'variables', 'variables.index'), 'wb') as f:
+        f.write(b'index')
+    return version, publish_version(models_dir, version, staging_dir)
+
+
+def test_publish_writes_manifest(tmp_path):
+    version, version_dir = publish(str(tmp_path))
+    manifest = read_manifest(version_dir)
+    assert manifest['class_names'] == ['paper', 'plastic']
+    assert manifest['input_size'] == [160, 160] and manifest['alpha'] == 0.5
+    assert manifest['preprocessing']['offset'] == -1.0
+    assert set(manifest['artifacts']) == {
+        MODEL_FILE, CLASS_NAMES_FILE, os.path.basename(metadata_path(MODEL_FILE)),
+        os.path.basename(tflite_path(MODEL_FILE, 'int8')),
+        os.path.basename(savedmodel_path(MODEL_FILE)) + '/variables/variables.index',
+    }
+    with open(os.path.join(version_dir, MANIFEST_FILE)) as f:
+        assert json.load(f) == manifest
+
+
+def test_verify_artifact_detects_changes(tmp_path):
+    _, version_dir = publish(str(tmp_path))
+    model_path = os.path.join(version_dir, MODEL_FILE)
+    for path in (model_path, tflite_path(model_path, 'int8'), savedmodel_path(model_path)):
+        verify_artifact(path)
+
+    with open(tflite_path(model_path, 'int8'), 'wb') as f:
+        f.write(b'flatbuffeR')
+    with pytest.raises(ValueError):
+        verify_artifact(tflite_path(model_path, 'int8'))
+
+    os.remove(os.path.join(savedmodel_path(model_path), 'variables', 'variables.index'))
+    with pytest.raises(ValueError):
+        verify_artifact(savedmodel_path(model_path))
+
+
+def test_unpublished_models_are_not_checked(tmp_path):
+    model_path = tmp_path / MODEL_FILE
+    model_path.write_bytes(b'weights')
+    verify_artifact(str(model_path))
@@ -0,0 +1,74 @@
+import csv
+import json
+
+import numpy as np
+import pytest
+from PIL import Image
+
+from classify_batch import ResultWriter, classify_paths, read_completed
+from prediction_cache import PredictionCache
+
+
+class BrightnessModel:
+    """'light' for bright images, 'dark' otherwise; counts what it sees"""
+
+    input_size = (8, 8)
+
+    def __init__(self):
+        self.images = 0
+
+    def predict(self, batch):
+        self.images += len(batch)
+        light = batch.reshape(len(batch), -1).mean(axis=1) / 255
+        return np.stack([1 - light, light], axis=1)
+
+
+def test_resume_truncates_a_torn_csv_row(tmp_path):
+    output = tmp_path / 'results.csv'
+    output.write_bytes(b'path,label,confidence,error\r\na.jpg,dark,0.9,\r\nb.jpg,light,0.8,\r\nc.jp')
+
+    assert read_completed(str(output), 'csv') == {'a.jpg', 'b.jpg'}
+    assert output.read_bytes().endswith(b'b.jpg,light,0.8,\r\n')
+
+    writer = ResultWriter(str(output), 'csv')
+    writer.write([{'path': 'c.jpg', 'label': 'dark', 'confidence': 0.7, 'error': ''}])
+    writer.close()
+    with open(output, newline='') as f:
+        assert [row['path'] for row in csv.DictReader(f)] == ['a.jpg', 'b.jpg', 'c.jpg']
+
+
+@pytest.mark.parametrize('tail', [b'{"path": "c.jpg", "lab', b''])
+def test_resume_jsonl(tmp_path, tail):
+    output = tmp_path / 'results.jsonl'
+    rows = [json.dumps({'path': p, 'label': 'dark'}).encode() + b'\n' for p in ('a.jpg', 'b.jpg')]
+    output.write_bytes(b''.join(rows) + tail)
+
+    assert read_completed(str(output), 'jsonl') == {'a.jpg', 'b.jpg'}
+    assert output.read_bytes() == b''.join(rows)
+
+
+def test_missing_output_means_nothing_done(tmp_path):
+    assert read_completed(str(tmp_path / 'results.csv'), 'csv') == set()
+
+
+def test_classify_paths_writes_every_image_and_uses_the_cache(tmp_path):
+    paths = []
+    for name, value in (('dark.png', 10), ('light.png', 250)):
+        Image.new('L', (32, 24), value).save(tmp_path / name)
+        paths.append(str(tmp_path / name))
+    broken = tmp_path / 'broken.jpg'
+    broken.write_bytes(b'not an image')
+    paths.append(str(broken))
+
+    output = tmp_path / 'results.jsonl'
+    model, cache = BrightnessModel(), PredictionCache('brightness')
+    for _ in range(2):
+        writer = ResultWriter(str(output), 'jsonl')
+        classify_paths(model, ['dark', 'light'], paths, writer, batch_size=2, workers=2, cache=cache)
+        writer.close()
+
+    rows = [json.loads(line) for line in output.read_text().splitlines()]
+    assert [(r['path'], r['label']) for r in rows[:3]] == [(paths[0], 'dark'), (paths[1], 'light'), (paths[2], '')]
+    assert rows[2]['error'] and rows[:2] == rows[3:5]
+    # The second pass was answered from the cache
+    assert model.images == 2
@@ -0,0 +1,62 @@
+import os
+
+import numpy as np
+import pytest
+
+from corrections import CorrectionStore
+from model.refit_head import labelled, read_corrections, read_state, refit_lock, write_state
+
+
+def write_image(path, content):
+    with open(path, 'wb') as f:
+        f.write(content)
+    return str(path)
+
+
+def test_add_copies_image_once_and_logs_every_correction(tmp_path):
+    store = CorrectionStore(str(tmp_path / 'corrections'))
+    assert not os.path.exists(store.directory) and store.count() == 0 and store.pending() == 0
+    first = write_image(tmp_path / 'a.JPG', b'same bytes')
+    copy = write_image(tmp_path / 'b.jpg', b'same bytes')
+
+    record = store.add(first, 'paper', predicted='plastic', model_version='v1')
+    store.add(copy, 'plastic')
+
+    assert record['image'].startswith('images/') and record['image'].endswith('.jpg')
+    assert os.listdir(tmp_path / 'corrections' / 'images') == [record['image'].split('/')[1]]
+    assert [r['label'] for r in read_corrections(store.directory)] == ['paper', 'plastic']
+    assert store.count() == 2
+
+
+def test_pending_counts_corrections_the_refit_has_not_seen(tmp_path):
+    store = CorrectionStore(str(tmp_path))
+    for i in range(3):
+        store.add(write_image(tmp_path / f'{i}.png', bytes([i])), 'paper')
+    assert store.pending() == 3
+
+    state = read_state(store.directory)
+    state['attempted'] = 2
+    write_state(store.directory, state)
+    assert store.pending() == 1
+
+
+def test_latest_label_wins(tmp_path):
+    store = CorrectionStore(str(tmp_path))
+    image = write_image(tmp_path / 'x.png', b'x')
+    store.add(image, 'paper')
+    store.add(image, 'glass')
+    store.add(image, 'plastic')
+
+    paths, labels = labelled(read_corrections(store.directory), store.directory, ['paper', 'plastic'])
+    assert len(paths) == 1 and os.path.exists(paths[0])
+    np.testing.assert_array_equal(labels, [1])
+
+
+def test_refit_lock_allows_one_refit_at_a_time(tmp_path):
+    with refit_lock(str(tmp_path)):
+        with pytest.raises(SystemExit):
+            with refit_lock(str(tmp_path)):
+                pass
+    # Released on exit, also when the lock file is left behind
+    with refit_lock(str(tmp_path)):
+        pass
@@ -0,0 +1,122 @@
+import itertools
+
+import numpy as np
+from PIL import Image
+
+from dedup import build_manifest, clusters_from_pairs, dhash, near_duplicate_pairs, popcount
+
+FAR = 0xFFFF_FFFF_FFFF_FFFF
+
+
+def brute_force_pairs(hashes, threshold):
+    return [
+        [i, j] for i, j in itertools.combinations(range(len(hashes)), 2)
+        if bin(int(hashes[i]) ^ int(hashes[j])).count('1') <= threshold
+    ]
+
+
+def test_pairs_respect_threshold():
+    hashes = [0, 0b111, FAR]
+    assert near_duplicate_pairs(hashes, threshold=3).tolist() == [[0, 1]]
+    assert near_duplicate_pairs(hashes, threshold=2).tolist() == []
+
+
+def test_pairs_match_brute_force():
+    rng = np.random.default_rng(0)
+    bases = rng.integers(0, 2 ** 63, size=20, dtype=np.uint64)
+    hashes = []
+    for base in bases:
+        for _ in range(3):
+            flips = rng.choice(64, size=rng.integers(0, 9), replace=False)
+            hashes.append(int(base) ^ sum(1 << int(bit) for bit in flips))
+    for threshold in (0, 3, 6, 10):
+        found = near_duplicate_pairs(hashes, threshold=threshold, block=4).tolist()
+        assert found == brute_force_pairs(hashes, threshold)
+
+
+def test_popcount():
+    values = np.array([0, 1, 0b1011, FAR], dtype=np.uint64)
+    assert popcount(values).tolist() == [0, 1, 3, 64]
+
+
+def test_clusters_are_transitive():
+    # 0-1 and 1-2 are within 4 bits, 0-2 is not: single linkage still joins them
+    hashes = [0, 0b1111, 0b1111_1111, FAR]
+    pairs = near_duplicate_pairs(hashes, threshold=4)
+    assert pairs.tolist() == [[0, 1], [1, 2]]
+    assert clusters_from_pairs(len(hashes), pairs) == [[0, 1, 2]]
+
+
+def manifest(relpaths, labels, hashes, sizes, **kwargs):
+    return build_manifest(relpaths, labels, ['glass', 'paper'], np.array(hashes, dtype=np.uint64),
+                          sizes, threshold=2, **kwargs)
+
+
+def all_paths(result):
+    return sorted(entry['path'] for split in ('train', 'val') for entry in result[split])
+
+
+def test_manifest_keeps_largest_file_per_cluster():
+    result = manifest(['paper/a.jpg', 'paper/b.jpg', 'glass/c.jpg'], [1, 1, 0],
+                      [0, 0b1, FAR], [100, 300, 50])
+    assert all_paths(result) == ['glass/c.jpg', 'paper/b.jpg']
+    assert result['duplicates'] == [{
+        'kept': ['paper/b.jpg'], 'dropped': ['paper/a.jpg'], 'all': ['paper/a.jpg', 'paper/b.jpg'],
+    }]
+
+
+def test_manifest_keep_duplicates():
+    result = manifest(['paper/a.jpg', 'paper/b.jpg'], [1, 1], [0, 0b1], [100, 300],
+                      keep_duplicates=True)
+    assert all_paths(result) == ['paper/a.jpg', 'paper/b.jpg']
+
+
+def test_manifest_leaves_out_mixed_label_clusters():
+    result = manifest(['glass/a.jpg', 'paper/a.jpg', 'paper/b.jpg'], [0, 1, 1],
+                      [0, 0b1, FAR], [100, 100, 100])
+    assert all_paths(result) == ['paper/b.jpg']
+    assert result['conflicts'] == [[
+        {'path': 'glass/a.jpg', 'label': 'glass'}, {'path': 'paper/a.jpg', 'label': 'paper'},
+    ]]
+
+
+def test_clusters_are_never_split_across_train_and_val():
+    bases = np.random.default_rng(0).integers(0, 2 ** 63, size=40, dtype=np.uint64)
+    relpaths, labels, hashes = [], [], []
+    for cluster, base in enumerate(bases):
+        base = int(base) & ~0b11
+        for copy in range(3):
+            relpaths.append(f"paper/{cluster:02d}_{copy}.jpg")
+            labels.append(1)
+            hashes.append(base | copy)
+    result = manifest(relpaths, labels, hashes, [100] * len(relpaths),
+                      validation_split=0.5, keep_duplicates=True)
+
+    assert len(result['duplicates']) == 40
+    split_of = {entry['path']: split for split in ('train', 'val') for entry in result[split]}
+    assert len(split_of) == len(relpaths)
+    for cluster in range(40):
+        assert len({split_of[f"paper/{cluster:02d}_{copy}.jpg"] for copy in range(3)}) == 1
+    assert result['train'] and result['val']
+
+
+def test_split_is_stable_when_images_are_added():
+    first = manifest(['paper/a.jpg', 'paper/b.jpg'], [1, 1], [0, FAR], [100, 100])
+    second = manifest(['paper/a.jpg', 'paper/b.jpg', 'paper/c.jpg'], [1, 1, 1],
+                      [0, FAR, 0xFF00_FF00], [100, 100, 100])
+    for split in ('train', 'val'):
+        before = {entry['path'] for entry in first[split]}
+        after = {entry['path'] for entry in second[split]}
+        assert before <= after
+
+
+def test_dhash_survives_resizing_and_recompression(tmp_path):
+    gradient = np.tile(np.arange(0, 256, 2, dtype=np.uint8), (96, 1))
+    pixels = np.stack([gradient, gradient[:, ::-1], gradient], axis=-1)
+    Image.fromarray(pixels).save(tmp_path / 'original.png')
+    Image.fromarray(pixels).resize((64, 48)).save(tmp_path / 'small.jpg', quality=70)
+    Image.fromarray(pixels[:, ::-1]).save(tmp_path / 'mirrored.png')
+
+    original = dhash(tmp_path / 'original.png')
+    assert bin(original ^ dhash(tmp_path / 'small.jpg')).count('1') <= 6
+    assert bin(original ^ dhash(tmp_path / 'mirrored.png')).count('1') > 6
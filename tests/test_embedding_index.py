@@ -0,0 +1,97 @@
+import numpy as np
+import pytest
+
+import inference
+from embedding_index import EmbeddingIndex
+from inference import top_predictions
+from model_registry import load_version
+from prediction_cache import PredictionCache
+
+
+class PixelExtractor:
+    """Stands in for MobileNetV2: the first `dim` pixel values are the embedding"""
+
+    dim = 4
+
+    def __init__(self, input_size=(2, 2), alpha=1.0):
+        self.input_size = tuple(input_size)
+
+    def embed(self, batch):
+        return np.asarray(batch, dtype=np.float32).reshape(len(batch), -1)[:, :self.dim]
+
+
+def image(*embedding):
+    pixels = np.zeros((1, 2, 2, 3), dtype=np.uint8)
+    pixels.reshape(-1)[:len(embedding)] = embedding
+    return pixels
+
+
+@pytest.fixture
+def index_dir(tmp_path):
+    index = EmbeddingIndex.create(str(tmp_path / 'index'), PixelExtractor.dim, input_size=(2, 2))
+    index.add([[1, 0, 0, 0], [0, 1, 0, 0]], ['paper', 'plastic'])
+    return index.directory
+
+
+def test_add_appends_rows_and_classes(index_dir):
+    index = EmbeddingIndex(index_dir)
+    index.add([[0, 0, 1, 0], [0.9, 0.1, 0, 0]], ['glass', 'paper'])
+    assert len(index) == 4
+    assert index.class_names == ['paper', 'plastic', 'glass']
+    with pytest.raises(ValueError):
+        index.add([[1, 0, 0]], ['paper'])
+
+
+def test_refresh_picks_up_rows_added_by_another_process(index_dir):
+    reader, writer = EmbeddingIndex(index_dir), EmbeddingIndex(index_dir)
+    generation = reader.generation
+    writer.add([[0, 0, 1, 0]], ['glass'])
+
+    reader.refresh()
+    assert len(reader) == 3 and reader.class_names[-1] == 'glass'
+    assert reader.generation > generation
+    probabilities = reader.classify([[0, 0, 1, 0]], k=1)
+    assert probabilities.shape == (1, 3) and probabilities[0].argmax() == 2
+
+
+def test_stale_writer_appends_after_rows_on_disk(index_dir):
+    first, second = EmbeddingIndex(index_dir), EmbeddingIndex(index_dir)
+    first.add([[0, 0, 1, 0]], ['glass'])
+    # `second` still has count 2 in memory; its rows must go after the glass row
+    second.add([[0, 0, 0, 1]], ['metal'])
+
+    index = EmbeddingIndex(index_dir)
+    assert len(index) == 4
+    assert index.class_names == ['paper', 'plastic', 'glass', 'metal']
+    assert [index.class_names[i] for i in index._labels] == ['paper', 'plastic', 'glass', 'metal']
+    assert index.classify([[0, 0, 1, 0]], k=1)[0].argmax() == 2
+
+
+def test_dense_copy_grows_without_reconverting(index_dir):
+    index = EmbeddingIndex(index_dir)
+    buffer = index._dense_buffer
+    for i in range(20):
+        index.add([[1, i, 0, 0]], ['paper'])
+    assert index._dense_buffer is buffer
+    assert np.allclose(index._dense, np.asarray(index._matrix, dtype=np.float32))
+
+
+def test_new_class_is_served_by_a_loaded_model(index_dir, monkeypatch):
+    monkeypatch.setattr(inference, 'EmbeddingExtractor', PixelExtractor)
+    loaded = load_version('knn', model_path=index_dir)
+    query = image(0, 0, 100, 0)
+
+    before = loaded.fingerprint
+    cache = PredictionCache(before)
+    cache.put('query', loaded.backend.predict(query)[0], fingerprint=before)
+    assert loaded.class_names == ['paper', 'plastic']
+
+    # Another process (e.g. `embedding_index.py add`) teaches the index a new class
+    EmbeddingIndex(index_dir).add([[0, 0, 1, 0]], ['glass'])
+
+    probabilities = loaded.backend.predict(query)
+    assert probabilities.shape == (1, 3)
+    assert loaded.class_names == ['paper', 'plastic', 'glass']
+    assert top_predictions(probabilities, loaded.class_names)[0][0] == 'glass'
+    assert loaded.fingerprint != before
+    assert cache.get('query', loaded.fingerprint) is None
@@ -0,0 +1,39 @@
+import numpy as np
+
+from inference_worker import InferenceWorker
+from model_registry import LoadedModel, ModelHandle
+
+
+class FixedBackend:
+    """Accepts only 2x2 images, like a model traced for one input size"""
+
+    name = 'fixed'
+    model_path = 'fixed.h5'
+
+    def __init__(self, input_size=(2, 2)):
+        self.input_size = input_size
+
+    def predict(self, batch):
+        if batch.shape[1:] != (2, 2, 3):
+            raise ValueError(f"unexpected input shape {batch.shape}")
+        return np.tile([0.25, 0.75], (len(batch), 1))
+
+
+def start_worker(backend):
+    worker = InferenceWorker(ModelHandle(LoadedModel(None, backend, ['paper', 'plastic'], 'test')))
+    worker.warm_up()
+    assert worker.warmed_up.wait(5)
+    return worker
+
+
+def test_warm_up_succeeds():
+    worker = start_worker(FixedBackend())
+    assert worker.warm_up_error is None
+    worker.stop()
+
+
+def test_warm_up_failure_is_reported():
+    # Advertises an input size the model can't take
+    worker = start_worker(FixedBackend(input_size=(3, 3)))
+    assert isinstance(worker.warm_up_error, ValueError)
+    worker.stop()
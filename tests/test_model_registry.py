@@ -0,0 +1,86 @@
+import os
+
+import numpy as np
+import pytest
+
+import model_registry
+from model.artifacts import CLASS_NAMES_FILE, MODEL_FILE, begin_version, publish_version
+from model_registry import (ModelHandle, ModelWatcher, current_version, load_version, locate,
+                            resolve_artifacts)
+
+
+class UniformBackend:
+    """Predicts equal probabilities for the classes in class_names.txt"""
+
+    name = 'fake'
+    input_size = (4, 4)
+
+    def __init__(self, model_path):
+        with open(os.path.join(os.path.dirname(model_path), CLASS_NAMES_FILE)) as f:
+            self.num_classes = len(f.read().split())
+        self.model_path = model_path
+
+    def predict(self, batch):
+        return np.full((len(batch), self.num_classes), 1 / self.num_classes)
+
+
+@pytest.fixture
+def fake_backends(monkeypatch):
+    monkeypatch.setattr(model_registry, 'load_backend',
+                        lambda name, model_path, cascade=False: UniformBackend(model_path))
+
+
+def publish(models_dir, weights=b'weights', class_names=('paper', 'plastic')):
+    version, staging_dir = begin_version(models_dir)
+    with open(os.path.join(staging_dir, MODEL_FILE), 'wb') as f:
+        f.write(weights)
+    with open(os.path.join(staging_dir, CLASS_NAMES_FILE), 'w') as f:
+        f.write(''.join(f"{name}\n" for name in class_names))
+    publish_version(models_dir, version, staging_dir)
+    return version
+
+
+def test_publish_moves_the_pointer(tmp_path):
+    models_dir = str(tmp_path)
+    assert current_version(models_dir) is None
+    first = publish(models_dir)
+    second = publish(models_dir, b'retrained')
+
+    assert first != second and current_version(models_dir) == second
+    assert sorted(os.listdir(models_dir)) == sorted(['CURRENT', first, second])
+    version, model_path, class_names_path = resolve_artifacts(models_dir)
+    assert version == second and model_path == os.path.join(models_dir, second, MODEL_FILE)
+    assert resolve_artifacts(models_dir, first)[1] == os.path.join(models_dir, first, MODEL_FILE)
+
+
+def test_locate_falls_back_to_the_app_directory(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    assert locate('model_registry.py') == os.path.abspath(model_registry.__file__)
+    assert locate('missing.txt') == 'missing.txt'
+    (tmp_path / 'model_registry.py').write_text('')
+    assert locate('model_registry.py') == 'model_registry.py'
+
+
+def test_watcher_swaps_in_new_versions_and_skips_broken_ones(tmp_path, fake_backends):
+    models_dir = str(tmp_path)
+    publish(models_dir)
+    handle = ModelHandle(load_version('fake', models_dir))
+    swaps = []
+    handle.add_listener(lambda new, old: swaps.append((old.version, new.version)))
+    watcher = ModelWatcher(handle, 'fake', models_dir, interval=3600)
+    try:
+        old = handle.current
+        new = publish(models_dir, b'retrained', ('paper', 'plastic', 'glass'))
+        watcher.check()
+        assert handle.current.version == new and handle.current.class_names[-1] == 'glass'
+        assert handle.current.fingerprint != old.fingerprint
+        assert swaps == [(old.version, new)]
+
+        # Modified after publishing: the manifest check rejects it
+        broken = publish(models_dir, b'more weights')
+        with open(os.path.join(models_dir, broken, MODEL_FILE), 'ab') as f:
+            f.write(b'!')
+        watcher.check()
+        assert handle.current.version == new and broken in watcher._failed
+    finally:
+        watcher.stop()
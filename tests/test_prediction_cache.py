@@ -0,0 +1,72 @@
+import numpy as np
+
+from prediction_cache import PredictionCache, image_key, model_fingerprint
+
+
+def test_image_key_depends_only_on_content():
+    assert image_key(b'abc') == image_key(bytes(b'abc'))
+    assert image_key(b'abc') != image_key(b'abd')
+
+
+def test_lru_evicts_least_recently_used():
+    cache = PredictionCache('m', max_entries=2)
+    cache.put('a', [0.9, 0.1])
+    cache.put('b', [0.2, 0.8])
+    assert cache.get('a') is not None
+    cache.put('c', [0.5, 0.5])
+
+    assert cache.get('b') is None
+    np.testing.assert_allclose(cache.get('a'), [0.9, 0.1])
+    stats = cache.stats()
+    assert stats['evictions'] == 1 and stats['entries'] == 2
+    assert stats['hits'] == 2 and stats['misses'] == 1
+
+
+def test_put_for_a_swapped_out_model_is_dropped():
+    cache = PredictionCache('new')
+    cache.put('a', [1.0, 0.0], fingerprint='old')
+    cache.put_many([('b', [1.0, 0.0])], fingerprint='old')
+    assert cache.get('a') is None and cache.get('b') is None
+
+
+def test_get_with_another_fingerprint_resets():
+    cache = PredictionCache('old')
+    cache.put('a', [1.0, 0.0])
+    assert cache.get('a', 'new') is None
+    assert cache.fingerprint == 'new'
+
+
+def test_sqlite_tier_survives_restart_for_the_same_model_only(tmp_path):
+    db = str(tmp_path / 'cache.db')
+    cache = PredictionCache('m1', db_path=db)
+    cache.put_many([('a', [0.3, 0.7]), ('b', [0.6, 0.4])])
+    cache.close()
+
+    cache = PredictionCache('m1', db_path=db)
+    np.testing.assert_allclose(cache.get('a'), [0.3, 0.7])
+    assert cache.stats()['disk_hits'] == 1
+    cache.close()
+
+    # Opening with another model prunes the old rows for good
+    PredictionCache('m2', db_path=db).close()
+    cache = PredictionCache('m1', db_path=db)
+    assert cache.get('b') is None
+    cache.close()
+
+
+def test_model_fingerprint_tracks_weights_and_class_names(tmp_path):
+    weights, names = tmp_path / 'model.h5', tmp_path / 'class_names.txt'
+    weights.write_bytes(b'weights')
+    names.write_text('paper\nplastic\n')
+    savedmodel = tmp_path / 'export'
+    (savedmodel / 'variables').mkdir(parents=True)
+    (savedmodel / 'variables' / 'data').write_bytes(b'v')
+
+    base = model_fingerprint(str(weights), str(names), extra='keras')
+    assert model_fingerprint(str(weights), str(names), extra='tflite') != base
+    names.write_text('paper\nglass\n')
+    assert model_fingerprint(str(weights), str(names), extra='keras') != base
+
+    exported = model_fingerprint(str(savedmodel))
+    (savedmodel / 'variables' / 'data').write_bytes(b'w')
+    assert model_fingerprint(str(savedmodel)) != exported
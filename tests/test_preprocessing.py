@@ -0,0 +1,36 @@
+import numpy as np
+import pytest
+from PIL import Image
+
+from preprocessing import decode_image, load_and_preprocess, match_input_size
+
+
+@pytest.mark.parametrize('mode, ext', [
+    ('L', 'png'), ('LA', 'png'), ('P', 'png'), ('RGBA', 'png'),
+    ('CMYK', 'jpg'), ('I;16', 'tiff'), ('F', 'tiff'), ('1', 'png'),
+])
+def test_every_mode_becomes_rgb_uint8(tmp_path, mode, ext):
+    path = tmp_path / f"image.{ext}"
+    image = Image.new(mode, (300, 200))
+    if mode == 'P':
+        image.info['transparency'] = 0
+    image.save(path)
+
+    array = load_and_preprocess(str(path), (96, 64))
+    assert array.shape == (64, 96, 3)
+    assert array.dtype == np.uint8
+    assert decode_image(str(path)).display.mode == 'RGB'
+
+
+def test_mixed_modes_stack_into_one_batch(tmp_path):
+    arrays = []
+    for mode in ('L', 'LA', 'RGBA', 'RGB'):
+        path = tmp_path / f"{mode}.png"
+        Image.new(mode, (50, 40)).save(path)
+        arrays.append(load_and_preprocess(str(path)))
+    assert np.stack(arrays).shape == (4, 224, 224, 3)
+
+
+def test_match_input_size_accepts_grayscale_arrays():
+    resized = match_input_size(np.zeros((32, 32), dtype=np.uint8), (16, 16))
+    assert resized.shape == (16, 16, 3)
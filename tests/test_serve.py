@@ -0,0 +1,77 @@
+import asyncio
+from collections import namedtuple
+
+import numpy as np
+import pytest
+
+from model_registry import LoadedModel, ModelHandle
+from serve import InferenceServer, InvalidImageError, MicroBatcher
+
+
+class CountingBackend:
+    """Predicts the mean pixel value as the first class probability"""
+
+    name = 'fake'
+    input_size = (8, 8)
+
+    def __init__(self):
+        self.batch_sizes = []
+
+    def predict(self, batch):
+        self.batch_sizes.append(len(batch))
+        first = batch.reshape(len(batch), -1).mean(axis=1) / 255
+        return np.stack([first, 1 - first], axis=1)
+
+
+def make_handle():
+    return ModelHandle(LoadedModel('v1', CountingBackend(), ['a', 'b'], 'fingerprint'))
+
+
+async def with_batcher(handle, body):
+    batcher = MicroBatcher(handle, max_batch_size=8, max_wait_ms=20)
+    task = asyncio.create_task(batcher.run())
+    try:
+        return await body(batcher)
+    finally:
+        task.cancel()
+
+
+def test_bad_image_fails_alone_and_batcher_keeps_running():
+    handle = make_handle()
+    good = np.full((8, 8, 3), 255, dtype=np.uint8)
+    bad = np.zeros((8, 8, 2), dtype=np.uint8)
+
+    async def body(batcher):
+        results = await asyncio.gather(
+            batcher.submit(good), batcher.submit(bad), batcher.submit(good), return_exceptions=True
+        )
+        # A later request is still served by the same run() task
+        after = await asyncio.wait_for(batcher.submit(good), 1)
+        return results, after, batcher
+
+    (first, failed, third), after, batcher = asyncio.run(with_batcher(handle, body))
+    assert isinstance(failed, InvalidImageError)
+    assert first[0][0] == pytest.approx(1.0) and third[0][0] == pytest.approx(1.0)
+    assert after[1].version == 'v1'
+    assert batcher.images == 3
+
+
+def test_resizes_images_made_for_another_input_size():
+    handle = make_handle()
+
+    async def body(batcher):
+        return await batcher.submit(np.zeros((16, 16, 3), dtype=np.uint8))
+
+    probabilities, loaded = asyncio.run(with_batcher(handle, body))
+    assert probabilities[1] == pytest.approx(1.0)
+
+
+def test_server_answers_400_for_invalid_image():
+    handle = make_handle()
+
+    async def body(batcher):
+        server = InferenceServer(handle, batcher)
+        return await server.route('POST', '/classify', b'not an image')
+
+    status, payload = asyncio.run(with_batcher(handle, body))
+    assert status == 400